@@ -0,0 +1,298 @@
+"""
+Per-step metrics for experiment CSV logs.
+
+Streams each log in chunks (memory stays bounded however long the run) and
+reports for every step:
+
+    time to stable    from the first reading of the step to the first
+                      "Stable - Holding" row
+    overshoot         largest excursion past the target in the direction of
+                      approach (°C, 0 if the target was never crossed)
+    mean / std        of the readings while holding
+    drift             least-squares slope of the readings while holding (°C/h)
+    hold              time spent holding and the share of holding readings
+                      within ``--window`` of the target
+
+Files are analysed in parallel in a process pool:
+
+    python analyze_logs.py logs/*.csv
+    python analyze_logs.py logs/ --window 0.05 --csv summary.csv
+"""
+import argparse
+import csv
+import glob
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from csv_logger import LOG_HEADER
+
+# Rows parsed per chunk
+CHUNK_ROWS = 50000
+
+SUMMARY_FIELDS = ["file", "step", "target", "readings", "time_to_stable", "overshoot",
+                  "hold_mean", "hold_std", "drift_per_hour", "hold_duration", "hold_compliance"]
+
+
+class StepStats:
+    """Running metrics for one step, updated one chunk of readings at a time."""
+
+    def __init__(self, step: int, target: float, stability_window: float):
+        self.step = step
+        self.target = target
+        self.stability_window = stability_window
+        self.readings = 0
+        self.start_time = None
+        self.first_actual = None
+        self.max_actual = -math.inf
+        self.min_actual = math.inf
+        self.stable_time = None
+        # Holding readings: count, mean, sum of squared deviations (Chan et al. merge)
+        self.hold_count = 0
+        self.hold_mean = 0.0
+        self.hold_m2 = 0.0
+        self.hold_within = 0
+        self.hold_first = None
+        self.hold_last = None
+        # Regression sums, time in hours since the first holding reading
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def update(self, times: np.ndarray, actual: np.ndarray, holding: np.ndarray):
+        if not len(times):
+            return
+        if self.start_time is None:
+            self.start_time = float(times[0])
+            self.first_actual = float(actual[0])
+        self.readings += len(times)
+        self.max_actual = max(self.max_actual, float(actual.max()))
+        self.min_actual = min(self.min_actual, float(actual.min()))
+        if not holding.any():
+            return
+        if self.stable_time is None:
+            self.stable_time = float(times[np.argmax(holding)])
+
+        held_times = times[holding]
+        held = actual[holding]
+        if self.hold_first is None:
+            self.hold_first = float(held_times[0])
+        self.hold_last = float(held_times[-1])
+
+        count = len(held)
+        mean = float(held.mean())
+        m2 = float(((held - mean) ** 2).sum())
+        total = self.hold_count + count
+        delta = mean - self.hold_mean
+        self.hold_m2 += m2 + delta * delta * self.hold_count * count / total
+        self.hold_mean += delta * count / total
+        self.hold_count = total
+        self.hold_within += int((np.abs(held - self.target) <= self.stability_window).sum())
+
+        x = (held_times - self.hold_first) / 3600.0
+        y = held - self.target
+        self._sx += float(x.sum())
+        self._sy += float(y.sum())
+        self._sxx += float((x * x).sum())
+        self._sxy += float((x * y).sum())
+
+    def summary(self, source: str) -> dict:
+        overshoot = math.nan
+        if self.first_actual is not None:
+            if self.first_actual < self.target:
+                overshoot = max(0.0, self.max_actual - self.target)
+            else:
+                overshoot = max(0.0, self.target - self.min_actual)
+
+        drift = math.nan
+        n = self.hold_count
+        denominator = n * self._sxx - self._sx * self._sx
+        if n >= 2 and denominator > 0:
+            drift = (n * self._sxy - self._sx * self._sy) / denominator
+
+        return {
+            "file": source,
+            "step": self.step,
+            "target": self.target,
+            "readings": self.readings,
+            "time_to_stable": (self.stable_time - self.start_time) if self.stable_time is not None else math.nan,
+            "overshoot": overshoot,
+            "hold_mean": self.hold_mean if n else math.nan,
+            "hold_std": math.sqrt(self.hold_m2 / n) if n else math.nan,
+            "drift_per_hour": drift,
+            "hold_duration": (self.hold_last - self.hold_first) if n else math.nan,
+            "hold_compliance": self.hold_within / n if n else math.nan,
+        }
+
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[tuple]:
+    """
+    Yield ``(times, steps, targets, actual, holding, intervals)`` arrays per chunk.
+
+    ``intervals`` is all NaN for logs written before the Interval column existed.
+    """
+    with open(path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        if header is None:
+            return
+        if header[:5] != LOG_HEADER[:5]:
+            raise ValueError(f"{path} is not an experiment log (header {header})")
+        has_interval = len(header) > 5
+        while True:
+            columns = ([], [], [], [], [], [])
+            for row in reader:
+                if len(row) < 5:
+                    continue
+                for column, value in zip(columns, row):
+                    column.append(value)
+                if has_interval and len(row) < 6:
+                    columns[5].append("")
+                if len(columns[0]) >= chunk_rows:
+                    break
+            if not columns[0]:
+                return
+            if has_interval:
+                intervals = np.array([float(value) if value else math.nan for value in columns[5]])
+            else:
+                intervals = np.full(len(columns[0]), math.nan)
+            yield (np.array(columns[0], dtype='datetime64[s]').astype(np.float64),
+                   np.array(columns[1], dtype=np.int64),
+                   np.array(columns[2], dtype=np.float64),
+                   np.array(columns[3], dtype=np.float64),
+                   np.array([status.startswith("Stable") for status in columns[4]]),
+                   intervals)
+
+
+def _waiting_twins(times, steps, actual, holding, intervals) -> np.ndarray:
+    """
+    Mark rows followed by their own "Holding" copy.
+
+    Once a step is stable the GUI logs each reading twice, first as "Waiting
+    for stability" and then with the holding status; the holding row is kept.
+    Entry i refers to row i; the last row can only be judged with the next chunk.
+    """
+    twin = np.zeros(len(times), dtype=bool)
+    twin[:-1] = (holding[1:] & ~holding[:-1] & (steps[1:] == steps[:-1]) & (actual[1:] == actual[:-1])
+                 & (times[1:] - times[:-1] <= 1.0)
+                 & ((intervals[1:] == intervals[:-1]) | (np.isnan(intervals[1:]) & np.isnan(intervals[:-1]))))
+    return twin
+
+
+def analyze_file(path: str, stability_window: float = 0.05, chunk_rows: int = CHUNK_ROWS) -> List[dict]:
+    """
+    Compute the per-step metrics of one CSV log.
+
+    Returns:
+        list: One summary dict per step (keys SUMMARY_FIELDS)
+    """
+    source = os.path.basename(path)
+    summaries = []
+    current: Optional[StepStats] = None
+
+    def process(times, steps, targets, actual, holding):
+        nonlocal current
+        boundaries = np.flatnonzero(np.diff(steps)) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(steps)]):
+            if current is None or current.step != steps[start]:
+                if current is not None:
+                    summaries.append(current.summary(source))
+                current = StepStats(int(steps[start]), float(targets[start]), stability_window)
+            current.update(times[start:end], actual[start:end], holding[start:end])
+
+    # The last row of each chunk is held back until the next row is known
+    carry = None
+    for chunk in read_chunks(path, chunk_rows):
+        if carry is not None:
+            chunk = tuple(np.concatenate((held, new)) for held, new in zip(carry, chunk))
+        keep = ~_waiting_twins(chunk[0], chunk[1], chunk[3], chunk[4], chunk[5])
+        keep[-1] = False
+        carry = tuple(column[-1:] for column in chunk)
+        if keep.any():
+            process(*(column[keep] for column in chunk[:5]))
+    if carry is not None:
+        process(*carry[:5])
+    if current is not None:
+        summaries.append(current.summary(source))
+    return summaries
+
+
+def _analyze_safely(path: str, stability_window: float) -> tuple:
+    try:
+        return path, analyze_file(path, stability_window), None
+    except (OSError, ValueError) as e:
+        return path, [], str(e)
+
+
+def analyze_logs(paths: List[str], stability_window: float = 0.05,
+                 workers: Optional[int] = None) -> List[dict]:
+    """Analyse several logs in a process pool; unreadable files are reported and skipped."""
+    workers = min(workers or os.cpu_count() or 1, max(1, len(paths)))
+    if workers <= 1:
+        outcomes = [_analyze_safely(path, stability_window) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(_analyze_safely, paths, [stability_window] * len(paths)))
+
+    summaries = []
+    for path, file_summaries, error in outcomes:
+        if error:
+            print(f"Skipping {path}: {error}")
+        summaries.extend(file_summaries)
+    return summaries
+
+
+def _expand(paths: List[str]) -> List[str]:
+    """Expand directories to the CSV logs they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            files.append(path)
+    return files
+
+
+def _fmt(value: float, spec: str, suffix: str = "") -> str:
+    return "-" if isinstance(value, float) and math.isnan(value) else format(value, spec) + suffix
+
+
+def print_table(summaries: List[dict]):
+    print(f"{'file':<32} {'step':>4} {'target':>7} {'TTS min':>8} {'over °C':>8} {'mean':>8} "
+          f"{'std':>7} {'drift/h':>8} {'hold min':>8} {'in win':>7}")
+    for row in summaries:
+        name = row["file"] if len(row["file"]) <= 32 else "..." + row["file"][-29:]
+        print(f"{name:<32} {row['step']:>4} {row['target']:>7.2f} "
+              f"{_fmt(row['time_to_stable'] / 60, '.1f'):>8} {_fmt(row['overshoot'], '.3f'):>8} "
+              f"{_fmt(row['hold_mean'], '.3f'):>8} {_fmt(row['hold_std'], '.4f'):>7} "
+              f"{_fmt(row['drift_per_hour'], '+.4f'):>8} {_fmt(row['hold_duration'] / 60, '.1f'):>8} "
+              f"{_fmt(row['hold_compliance'] * 100, '.1f', '%'):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-step metrics for experiment CSV logs")
+    parser.add_argument("logs", nargs="+", help="CSV logs or directories containing them")
+    parser.add_argument("--window", type=float, default=0.05,
+                        help="Stability window in °C for hold compliance (default: 0.05)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--csv", help="Also write the summary table to this CSV file")
+    args = parser.parse_args()
+
+    paths = _expand(args.logs)
+    start = time.perf_counter()
+    summaries = analyze_logs(paths, args.window, args.workers)
+    print_table(summaries)
+    print(f"\n{len(summaries)} steps from {len(paths)} files in {time.perf_counter() - start:.1f} s")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(summaries)
+        print(f"Summary written to: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark for the live plot's downsampling pyramid.
+
+Measures the per-reading cost of MinMaxPyramid.append and the time to fetch
+one redraw worth of buckets (one per pixel of an 800 px wide plot) for traces
+from 10k to 10M readings. A 7-day run at 1 Hz is about 600k readings.
+
+Usage:
+    python benchmarks/bench_downsample.py [--max-points N]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import MinMaxPyramid
+
+TRACE_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+PLOT_WIDTH = 800
+
+
+def bench(size: int, repeats: int = 20) -> dict:
+    """Fill a pyramid with ``size`` readings and time appends and full-range queries."""
+    pyramid = MinMaxPyramid()
+    start = time.perf_counter()
+    for i in range(size):
+        pyramid.append(float(i), 25.0 + math.sin(i / 5000.0) + random.gauss(0.0, 0.01))
+    append_us = (time.perf_counter() - start) / size * 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        buckets = pyramid.query(pyramid.first_time, pyramid.last_time, PLOT_WIDTH)
+    query_ms = (time.perf_counter() - start) / repeats * 1000
+    return {"size": size, "append_us": append_us, "query_ms": query_ms, "buckets": len(buckets)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the plot downsampling pyramid")
+    parser.add_argument("--max-points", type=int, default=TRACE_SIZES[-1], help="Largest trace size to test")
+    args = parser.parse_args()
+
+    print(f"{'readings':>10} {'append (us)':>12} {'query (ms)':>11} {'buckets':>8}")
+    for size in TRACE_SIZES:
+        if size > args.max_points:
+            break
+        row = bench(size)
+        print(f"{row['size']:>10} {row['append_us']:>12.3f} {row['query_ms']:>11.3f} {row['buckets']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of the columnar readings store against the CSV log.
+
+Writes the same synthetic run (7 days at 1 Hz by default, 604,800 readings)
+as a CSV log and as a readings store, then compares file size and the time
+to load the temperatures back and compute their mean.
+
+Usage:
+    python benchmarks/bench_readings_store.py [--days N] [--rate HZ] [--keep DIR]
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_logger import LOG_HEADER
+from readings_store import ReadingsStore, STATUS_HOLDING, STATUS_WAITING, export_csv, load_readings
+
+HOLD_TIME = 3600.0
+STEP_DURATION = 4 * 3600.0
+
+
+def generate(count: int, interval: float):
+    """Yield ``(timestamp, step, target, actual, status, remaining)`` for a stepped run."""
+    start = time.time()
+    for i in range(count):
+        elapsed = i * interval
+        step = int(elapsed // STEP_DURATION) + 1
+        in_step = elapsed % STEP_DURATION
+        target = 20.0 + 5.0 * (step % 4)
+        actual = target + 2.0 * math.exp(-in_step / 900.0) + random.gauss(0.0, 0.01)
+        remaining = STEP_DURATION - in_step
+        if remaining <= HOLD_TIME:
+            yield start + elapsed, step, target, actual, STATUS_HOLDING, remaining
+        else:
+            yield start + elapsed, step, target, actual, STATUS_WAITING, None
+
+
+def write_files(directory: str, count: int, interval: float):
+    csv_path = os.path.join(directory, "run.csv")
+    store_path = os.path.join(directory, "run.readings")
+    store = ReadingsStore(store_path, flush_rows=4096)
+    with open(csv_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(LOG_HEADER)
+        for timestamp, step, target, actual, status, remaining in generate(count, interval):
+            if status == STATUS_HOLDING:
+                status_text = f"Stable - Holding ({int(remaining)}s remaining)"
+            else:
+                status_text = "Waiting for stability"
+            writer.writerow([datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+                             step, target, actual, status_text, interval])
+            store.append(timestamp, step, target, actual, status, remaining, interval)
+    store.close()
+    return csv_path, store_path
+
+
+def load_csv(csv_path: str) -> float:
+    """Parse the CSV log the way analysis scripts do and return the mean temperature."""
+    timestamps, actuals = [], []
+    with open(csv_path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        for row in reader:
+            timestamps.append(datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp())
+            actuals.append(float(row[3]))
+    return sum(actuals) / len(actuals)
+
+
+def load_store(store_path: str) -> float:
+    columns = load_readings(store_path)
+    return float(columns["actual"].mean())
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the readings store with the CSV log")
+    parser.add_argument("--days", type=float, default=7.0, help="Run length in days")
+    parser.add_argument("--rate", type=float, default=1.0, help="Readings per second")
+    parser.add_argument("--keep", help="Write the files to this directory and keep them")
+    args = parser.parse_args()
+
+    count = int(args.days * 86400 * args.rate)
+    directory = args.keep or tempfile.mkdtemp(prefix="bench_readings_")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        print(f"Writing {count} readings to {directory} ...")
+        csv_path, store_path = write_files(directory, count, 1.0 / args.rate)
+
+        csv_size = os.path.getsize(csv_path)
+        store_size = directory_size(store_path)
+        csv_load = min(timed(load_csv, csv_path) for _ in range(3))
+        store_load = min(timed(load_store, store_path) for _ in range(3))
+        export_time = timed(export_csv, store_path, os.path.join(directory, "export.csv"))
+
+        print(f"{'format':<10} {'size (MB)':>10} {'load (s)':>10}")
+        print(f"{'csv':<10} {csv_size / 1e6:>10.1f} {csv_load:>10.3f}")
+        print(f"{'readings':<10} {store_size / 1e6:>10.1f} {store_load:>10.3f}")
+        print(f"Size ratio: {csv_size / store_size:.1f}x smaller, load speedup: {csv_load / store_load:.0f}x")
+        print(f"CSV export from store: {export_time:.2f} s")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark for the stability check.
+
+Compares the per-reading cost of the incremental ``StabilityTracker`` with the
+previous approach of recomputing mean/std over ``temperatures[-min_readings:]``
+on every cycle, for window sizes from 10 to 100k readings.
+
+Usage:
+    python benchmarks/bench_stability.py [--updates N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stability import StabilityTracker
+
+WINDOW_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def bench_tracker(window: int, updates: int) -> float:
+    """Return the mean cost in seconds of one add + is_stable call."""
+    tracker = StabilityTracker(window, 0.05)
+    readings = [25.0 + random.gauss(0, 0.02) for _ in range(updates)]
+    start = time.perf_counter()
+    for temp in readings:
+        tracker.add(temp)
+        tracker.is_stable(25.0)
+    return (time.perf_counter() - start) / updates
+
+
+def bench_recompute(window: int, updates: int) -> float:
+    """Return the mean cost in seconds of the old append + slice + mean/std check."""
+    temperatures = [25.0 + random.gauss(0, 0.02) for _ in range(window)]
+    start = time.perf_counter()
+    for _ in range(updates):
+        temperatures.append(25.0 + random.gauss(0, 0.02))
+        recent = temperatures[-window:]
+        avg = sum(recent) / len(recent)
+        std = (sum((x - avg) ** 2 for x in recent) / len(recent)) ** 0.5
+        (std <= 0.05) and (abs(avg - 25.0) <= 0.05)
+    return (time.perf_counter() - start) / updates
+
+
+def run(updates: int = 20000) -> list:
+    """Run the benchmark for every window size and return result rows."""
+    results = []
+    for window in WINDOW_SIZES:
+        # The recompute baseline is O(window); keep its iteration count bounded
+        recompute_updates = max(10, min(updates, 2_000_000 // window))
+        results.append({
+            "window": window,
+            "tracker_us": bench_tracker(window, updates) * 1e6,
+            "recompute_us": bench_recompute(window, recompute_updates) * 1e6,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stability check per update")
+    parser.add_argument("--updates", type=int, default=20000, help="Readings per window size")
+    args = parser.parse_args()
+
+    print(f"{'window':>8} {'tracker (us)':>14} {'recompute (us)':>16}")
+    for row in run(args.updates):
+        print(f"{row['window']:>8} {row['tracker_us']:>14.3f} {row['recompute_us']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Stop and resume latency of the experiment engine.
+
+Runs ExperimentEngine against the bath simulator and measures how long it
+takes from ``stop()`` until the experiment thread has finished, both while
+the engine waits between readings (long ``reading_interval``) and while it
+is blocked on a slow serial reply. It also measures the time from
+``resume()`` to the next reading, and how long ``cancel_read()`` (called by
+``stop()``) takes to wake a ``read_until`` blocked on a silent port.
+
+The script exits with status 1 if any scenario exceeds ``--max-ms``
+(default 100 ms), so it can be used as a regression check.
+
+Before the engine waited on a condition variable, a stop took effect only
+after the current reading interval and serial timeout had run out, and
+pause/resume were polled every 0.5 s.
+
+Usage:
+    python benchmarks/bench_stop_latency.py [--repeat N] [--interval S] [--max-ms MS]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tty
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from engine import ExperimentEngine
+from simulator import BathModel, BathSimulator
+from transport import SerialTransport
+
+# Stop and resume must take effect well within one reading, however long the interval
+MAX_LATENCY_MS = 100.0
+
+
+def _settings(port: str, reading_interval: float) -> dict:
+    import configparser
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Communication": {"port": port, "baudrate": "2400", "timeout": "2"},
+        "Temperature": {"setpoints": "30"},
+        "Stability": {"hold_time": "3600", "reading_interval": str(reading_interval), "timeout": "7200"},
+        "Logging": {"transcript": "false"},
+        "Metrics": {"enabled": "false"},
+    })
+    return main.get_settings(config)
+
+
+def _start_engine(log_dir: str, settings: dict, on_reading=None) -> ExperimentEngine:
+    """Start an experiment and return once its first reading has been taken."""
+    first_reading = threading.Event()
+
+    def reading(t, actual, target):
+        first_reading.set()
+        if on_reading:
+            on_reading(t, actual, target)
+
+    engine = ExperimentEngine(log_dir=log_dir, on_message=lambda text: None, on_reading=reading,
+                              checkpoint=False)
+    engine.start(settings, "bench_stop")
+    if not first_reading.wait(10):
+        raise RuntimeError("No reading from the simulator")
+    return engine
+
+
+def _stop_latency(engine: ExperimentEngine) -> float:
+    start = time.perf_counter()
+    engine.stop()
+    if not engine.wait(timeout=30):
+        raise RuntimeError("Engine did not stop")
+    return time.perf_counter() - start
+
+
+def bench_stop_idle(log_dir: str, interval: float) -> float:
+    """Stop while waiting between readings."""
+    simulator = BathSimulator(BathModel(initial_temp=25.0), latency=0.01, baudrate=None)
+    simulator.start()
+    try:
+        engine = _start_engine(log_dir, _settings(simulator.port, interval))
+        time.sleep(0.2)
+        return _stop_latency(engine)
+    finally:
+        simulator.stop()
+
+
+def bench_stop_in_read(log_dir: str) -> float:
+    """Stop while a poll is waiting for a slow reply."""
+    simulator = BathSimulator(BathModel(initial_temp=25.0), latency=1.5, baudrate=None)
+    simulator.start()
+    try:
+        engine = _start_engine(log_dir, _settings(simulator.port, 0.0))
+        # The next poll goes out right after the first reading; stop halfway through its reply
+        time.sleep(0.7)
+        return _stop_latency(engine)
+    finally:
+        simulator.stop()
+
+
+def bench_stop_in_read_until() -> float:
+    """Time for cancel_read() to wake a read_until blocked on a port that never answers."""
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    ser = main.initialize_serial(port=os.ttyname(slave), timeout=30)
+    transport = SerialTransport(ser, poll_slice=30)
+    returned = threading.Event()
+
+    def read():
+        ser.read_until()
+        returned.set()
+
+    try:
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        transport.cancel_read()
+        if not returned.wait(30):
+            raise RuntimeError("read_until was not cancelled")
+        return time.perf_counter() - start
+    finally:
+        ser.close()
+        os.close(master)
+        os.close(slave)
+
+
+def bench_resume(log_dir: str, interval: float) -> float:
+    """Time from resume() to the next reading."""
+    simulator = BathSimulator(BathModel(initial_temp=25.0), latency=0.01, baudrate=None)
+    simulator.start()
+    readings = []
+    got_reading = threading.Condition()
+
+    def on_reading(t, actual, target):
+        with got_reading:
+            readings.append(time.perf_counter())
+            got_reading.notify_all()
+
+    try:
+        engine = _start_engine(log_dir, _settings(simulator.port, interval), on_reading)
+        engine.pause()
+        time.sleep(0.2)
+        with got_reading:
+            count = len(readings)
+            start = time.perf_counter()
+            engine.resume()
+            got_reading.wait_for(lambda: len(readings) > count, timeout=10)
+        latency = readings[-1] - start if len(readings) > count else float("nan")
+        _stop_latency(engine)
+        return latency
+    finally:
+        simulator.stop()
+
+
+def run(repeat: int = 3, interval: float = 60.0) -> list:
+    """Run each scenario ``repeat`` times and return result rows (milliseconds)."""
+    results = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, bench in (("stop while waiting", lambda: bench_stop_idle(log_dir, interval)),
+                            ("stop during serial read", lambda: bench_stop_in_read(log_dir)),
+                            ("stop during read_until", bench_stop_in_read_until),
+                            ("resume to next reading", lambda: bench_resume(log_dir, interval))):
+            samples = [bench() * 1000 for _ in range(repeat)]
+            results.append({"scenario": name, "mean_ms": sum(samples) / len(samples), "max_ms": max(samples)})
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark stop and resume latency of the experiment engine")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--interval", type=float, default=60.0, help="Reading interval in seconds")
+    parser.add_argument("--max-ms", type=float, default=MAX_LATENCY_MS,
+                        help="Fail if any scenario takes longer (milliseconds)")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<26} {'mean (ms)':>10} {'max (ms)':>10}")
+    failures = []
+    for row in run(args.repeat, args.interval):
+        print(f"{row['scenario']:<26} {row['mean_ms']:>10.1f} {row['max_ms']:>10.1f}")
+        # NaN (no reading after resume) fails as well
+        if not row["max_ms"] <= args.max_ms:
+            failures.append(row["scenario"])
+    if failures:
+        print(f"Over {args.max_ms:.0f} ms: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"All scenarios within {args.max_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
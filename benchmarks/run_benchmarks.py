@@ -0,0 +1,373 @@
+"""
+Benchmark suite for the acquisition and control loop.
+
+Each stage runs in its own subprocess so that its peak RSS is measured in
+isolation. Results are written as JSON so that runs on different commits can
+be compared:
+
+    python benchmarks/run_benchmarks.py                      # all stages
+    python benchmarks/run_benchmarks.py --stages parse csv   # a subset
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json
+
+Stages:
+    round_trip   't' query through SerialTransport against the simulator
+    parse        parse_temperature on bath replies
+    stability    StabilityTracker add + is_stable
+    tk_dispatch  MainWindow.log_message into Tk (skipped without a display)
+    csv          CsvLogWriter row throughput including the final fsync
+    end_to_end   maintain_temperature_setpoints against the simulator
+    replay       engine run recorded against the simulator and replayed on the
+                 virtual clock; fails unless every recorded command is matched
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+class SkipStage(Exception):
+    """Raised by a stage that cannot run in this environment."""
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies: list, elapsed: float) -> dict:
+    """Turn per-operation latencies (seconds) into the reported metrics."""
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "seconds": elapsed,
+        "readings_per_s": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _start_simulator(args, time_scale: float = 1.0):
+    from simulator import BathModel, BathSimulator
+    model = BathModel(initial_temp=25.0, heating_tau=30.0, cooling_tau=30.0,
+                      noise=0.002, time_scale=time_scale)
+    simulator = BathSimulator(model, latency=args.sim_latency, baudrate=args.baudrate or None)
+    simulator.start()
+    return simulator
+
+
+def stage_round_trip(args) -> dict:
+    import main
+    from transport import SerialTransport
+    simulator = _start_simulator(args)
+    try:
+        transport = SerialTransport(main.initialize_serial(port=simulator.port, baudrate=args.baudrate or 2400))
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.iterations // 100 or 1):
+            transport.query("t")
+            latencies.append(transport.last_latency)
+        elapsed = time.perf_counter() - start
+        transport.close()
+    finally:
+        simulator.stop()
+    return _summarize(latencies, elapsed)
+
+
+def stage_parse(args) -> dict:
+    from transport import parse_temperature
+    replies = [f"t: {25.0 + random.gauss(0, 0.5):.2f} C" for _ in range(args.iterations)]
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for reply in replies:
+        t0 = clock()
+        parse_temperature(reply)
+        latencies.append(clock() - t0)
+    return _summarize(latencies, clock() - start)
+
+
+def stage_stability(args) -> dict:
+    from stability import StabilityTracker
+    tracker = StabilityTracker(10, 0.05)
+    readings = [25.0 + random.gauss(0, 0.02) for _ in range(args.iterations)]
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for temp in readings:
+        t0 = clock()
+        tracker.add(temp)
+        tracker.is_stable(25.0)
+        latencies.append(clock() - t0)
+    return _summarize(latencies, clock() - start)
+
+
+def stage_tk_dispatch(args) -> dict:
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        raise SkipStage(f"Tk unavailable: {e}")
+    root.withdraw()
+    import gui
+    latencies = []
+    clock = time.perf_counter
+    count = min(args.iterations, 5000)
+    # Keep the index and message logs out of the repository and leave the serial ports alone
+    with tempfile.TemporaryDirectory() as tmp:
+        app = gui.MainWindow(root, base_dir=tmp, watch_ports=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = clock()
+            for i in range(count):
+                t0 = clock()
+                app.log_message(f"Current: 25.000, Avg: 25.000, Std: 0.001, Stable: True ({i})")
+                latencies.append(clock() - t0)
+            # Include the batched insert the main loop performs on its next tick
+            app._apply_ui_updates()
+            root.update_idletasks()
+            elapsed = clock() - start
+        root.destroy()
+        app.experiment_index.close()
+        app.message_log.close()
+    return _summarize(latencies, elapsed)
+
+
+def stage_csv(args) -> dict:
+    from csv_logger import CsvLogWriter
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = CsvLogWriter(os.path.join(tmp, "bench.csv"))
+        latencies = []
+        clock = time.perf_counter
+        start = clock()
+        for i in range(args.iterations):
+            t0 = clock()
+            writer.write_row(["2024-01-01 00:00:00", 1, 25.0, 25.0 + i * 1e-6, "Waiting for stability", 1.0])
+            latencies.append(clock() - t0)
+        writer.close()
+        elapsed = clock() - start
+    return _summarize(latencies, elapsed)
+
+
+def _timed_transport(ser):
+    """Return a SerialTransport that records the start time of every 't' query."""
+    from transport import SerialTransport
+
+    class TimedTransport(SerialTransport):
+        poll_times = []
+
+        def query(self, command, *args, **kwargs):
+            if command == "t":
+                self.poll_times.append(time.perf_counter())
+            return super().query(command, *args, **kwargs)
+
+    return TimedTransport(ser)
+
+
+def stage_end_to_end(args) -> dict:
+    import main
+    simulator = _start_simulator(args, time_scale=args.time_scale)
+    try:
+        transport = _timed_transport(main.initialize_serial(port=simulator.port, baudrate=args.baudrate or 2400))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.maintain_temperature_setpoints(transport, [25.5, 25.0],
+                                                hold_time=1,
+                                                stability_window=0.05,
+                                                reading_interval=0.0,
+                                                timeout=60,
+                                                min_readings=10)
+        elapsed = time.perf_counter() - start
+        transport.close()
+    finally:
+        simulator.stop()
+    # Latency of a control cycle = spacing between consecutive polls
+    polls = transport.poll_times
+    cycles = [b - a for a, b in zip(polls, polls[1:])]
+    return _summarize(cycles, elapsed)
+
+
+def stage_replay(args) -> dict:
+    import configparser
+    import main
+    import transcript
+    from engine import ExperimentEngine
+    simulator = _start_simulator(args, time_scale=args.time_scale)
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "Communication": {"port": simulator.port, "baudrate": str(args.baudrate or 2400), "timeout": "2"},
+        "Temperature": {"setpoints": "25.5, 25.0"},
+        # The hold ends between readings (0.9 s / 1.2 s), not on one, so sub-millisecond
+        # lateness in the recording cannot change which reading completes it
+        "Stability": {"hold_time": "1", "reading_interval": "0.3", "min_readings": "5", "timeout": "60"},
+        "Metrics": {"enabled": "false"},
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        settings = main.get_settings(config)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recorder = ExperimentEngine(log_dir=tmp, on_message=lambda text: None, checkpoint=False)
+            recorder.start(settings, "record")
+            recorder.wait()
+            path = f"{recorder.log_base_path}.trc"
+        finally:
+            simulator.stop()
+
+        start = time.perf_counter()
+        replay = transcript.replay_engine(path, settings, tmp, on_message=lambda text: None)
+        elapsed = time.perf_counter() - start
+        if replay.commands_matched != replay.commands_recorded or replay.commands_unmatched:
+            raise RuntimeError(f"Replay diverged: {replay.commands_matched} of {replay.commands_recorded} "
+                               f"recorded commands matched, {replay.commands_unmatched} unmatched")
+    # Replay cost per recorded exchange
+    return _summarize([elapsed / replay.commands_matched] * replay.commands_matched, elapsed)
+
+
+STAGES = {
+    "round_trip": stage_round_trip,
+    "parse": stage_parse,
+    "stability": stage_stability,
+    "tk_dispatch": stage_tk_dispatch,
+    "csv": stage_csv,
+    "end_to_end": stage_end_to_end,
+    "replay": stage_replay,
+}
+
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_stage_inline(name: str, args) -> dict:
+    """Run one stage in this process and return its result dict."""
+    try:
+        result = STAGES[name](args)
+        result["status"] = "ok"
+    except SkipStage as e:
+        result = {"status": "skipped", "reason": str(e)}
+    result["peak_rss_kb"] = _peak_rss_kb()
+    return result
+
+
+def run_stage_subprocess(name: str, args) -> dict:
+    """Run one stage in a fresh interpreter so its peak RSS is isolated."""
+    command = [sys.executable, os.path.abspath(__file__), "--stage", name,
+               "--iterations", str(args.iterations),
+               "--baudrate", str(args.baudrate),
+               "--sim-latency", str(args.sim_latency),
+               "--time-scale", str(args.time_scale)]
+    proc = subprocess.run(command, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"status": "error", "reason": proc.stderr.strip().splitlines()[-1:] or ["unknown"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+# p99 differences below this are timer noise for the in-memory stages
+P99_NOISE_MS = 0.01
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Return a list of regression messages (throughput drop or p99 increase beyond threshold)."""
+    regressions = []
+    for name, result in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or result.get("status") != "ok" or old.get("status") != "ok":
+            continue
+        if old["readings_per_s"] and result["readings_per_s"] < old["readings_per_s"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {old['readings_per_s']:.1f} -> {result['readings_per_s']:.1f} /s")
+        if (result["p99_ms"] > old["p99_ms"] * (1 + threshold)
+                and result["p99_ms"] - old["p99_ms"] > P99_NOISE_MS):
+            regressions.append(f"{name}: p99 {old['p99_ms']:.3f} -> {result['p99_ms']:.3f} ms")
+    return regressions
+
+
+def print_table(report: dict):
+    print(f"{'stage':<12} {'status':<8} {'count':>8} {'readings/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak RSS MB':>12}")
+    for name, result in report["stages"].items():
+        if result.get("status") != "ok":
+            print(f"{name:<12} {result.get('status', '?'):<8} {result.get('reason', '')}")
+            continue
+        print(f"{name:<12} {'ok':<8} {result['count']:>8} {result['readings_per_s']:>12.1f} "
+              f"{result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} {result['peak_rss_kb'] / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition and control loop")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Stages to run (default: all)")
+    parser.add_argument("--stage", choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument("--iterations", type=int, default=100000, help="Operations per in-memory stage")
+    parser.add_argument("--baudrate", type=int, default=2400, help="Simulated line speed (0 = instant)")
+    parser.add_argument("--sim-latency", type=float, default=0.05, help="Simulated bath reply delay (s)")
+    parser.add_argument("--time-scale", type=float, default=20.0, help="Simulated seconds per real second (end_to_end)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Baseline result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression (default 0.10)")
+    args = parser.parse_args()
+
+    if args.stage:
+        # Child mode: run a single stage and print its result as JSON
+        print(json.dumps(run_stage_inline(args.stage, args)))
+        return
+
+    report = {
+        "commit": _git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {"iterations": args.iterations, "baudrate": args.baudrate,
+                       "sim_latency": args.sim_latency, "time_scale": args.time_scale},
+        "stages": {},
+    }
+    for name in args.stages:
+        report["stages"][name] = run_stage_subprocess(name, args)
+
+    print_table(report)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{report['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Regressions against", args.compare)
+            for message in regressions:
+                print("  " + message)
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Crash-safe checkpoint of a running experiment.
+
+The experiment engine rewrites a small JSON file whenever the run changes
+state (new step, hold started, stability lost) and once a minute while a
+step is running. It holds everything needed to pick the run up again after
+a reboot or crash: the settings and config file, the step index, the phase
+(settling or holding), how long the step and the hold have been running
+and the readings in the current stability window.
+
+Writes go to a temporary file that is fsync'ed and then renamed over the
+checkpoint, so the file on disk is always either the previous or the new
+checkpoint, never a torn one. The checkpoint is removed when a run completes
+or is stopped by the user; after an error or a crash it is kept so the run
+can be resumed. Starting a new run instead archives it (see
+archive_checkpoint) rather than writing over it.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+CHECKPOINT_NAME = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+# Refresh the checkpoint (readings window) at least this often during a step (seconds)
+CHECKPOINT_INTERVAL = 60.0
+
+PHASE_SETTLING = "settling"
+PHASE_HOLDING = "holding"
+
+
+def save_checkpoint(path: str, state: dict):
+    """Atomically replace the checkpoint at ``path`` with ``state``."""
+    state = dict(state, version=CHECKPOINT_VERSION, saved_at=time.time())
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[dict]:
+    """Return the saved checkpoint, or None if there is none or it cannot be read."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable checkpoint {path}: {str(e)}")
+        return None
+    if state.get("version") != CHECKPOINT_VERSION:
+        print(f"Ignoring checkpoint {path} with unsupported version {state.get('version')}")
+        return None
+    return state
+
+
+def clear_checkpoint(path: str):
+    """Remove the checkpoint (no error if there is none)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def archive_checkpoint(path: str) -> Optional[str]:
+    """
+    Move the checkpoint aside as ``checkpoint_interrupted_<time>.json``.
+
+    Returns:
+        str: The archived file, or None if there was no checkpoint
+    """
+    base, ext = os.path.splitext(path)
+    archived = f"{base}_interrupted_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+    try:
+        os.replace(path, archived)
+    except FileNotFoundError:
+        return None
+    return archived
+
+
+def describe_checkpoint(state: dict) -> str:
+    """One-line description for resume prompts."""
+    steps = len(state["settings"]["setpoints"])
+    index = state["current_setpoint_index"]
+    setpoint = state["settings"]["setpoints"][index]
+    saved = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state["saved_at"]))
+    return (f"{state['experiment_name']}: step {index + 1}/{steps} ({setpoint}°C, {state['phase']}), "
+            f"saved {saved}")
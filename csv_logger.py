@@ -0,0 +1,127 @@
+import csv
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+LOG_HEADER = ["Timestamp", "Step", "Target Temperature", "Actual Temperature", "Status", "Interval"]
+
+_CLOSE = object()
+
+
+class CsvLogWriter:
+    """
+    Streaming CSV writer running in a background thread.
+
+    Rows are appended to the file as they are produced instead of being kept
+    in memory until the end of the experiment. Writes are batched and flushed
+    when ``flush_rows`` rows are pending or ``flush_interval`` seconds have
+    passed, and the file is fsync'ed at most every ``fsync_interval`` seconds,
+    so a power cut loses at most that much data. Pending rows are held in a
+    bounded queue; producers block if the disk falls that far behind.
+    """
+
+    def __init__(self, path: str,
+                 header: Optional[List[str]] = None,
+                 flush_rows: int = 50,
+                 flush_interval: float = 5.0,
+                 fsync_interval: float = 30.0,
+                 max_pending: int = 10000):
+        """
+        Args:
+            path: CSV file to append to (created with a header on first write)
+            header: Column names (defaults to LOG_HEADER)
+            flush_rows: Flush once this many rows are pending
+            flush_interval: Flush at least this often while rows are pending (seconds)
+            fsync_interval: Minimum time between fsync calls (seconds, 0 = every flush)
+            max_pending: Maximum number of rows queued before write_row blocks
+        """
+        self.path = path
+        self.header = header or LOG_HEADER
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._writer = None
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._thread = threading.Thread(target=self._run, name="csv-log-writer", daemon=True)
+        self._thread.start()
+
+    def write_row(self, row: list):
+        """Queue one row for writing."""
+        self._queue.put(row)
+
+    def close(self):
+        """Write all pending rows, fsync and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+    def _open(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(self.header)
+
+    def _write_batch(self, batch: list, force_sync: bool = False):
+        if batch:
+            if self._file is None:
+                self._open()
+            self._writer.writerows(batch)
+            self.rows_written += len(batch)
+            batch.clear()
+        if self._file is None:
+            return
+        self._file.flush()
+        self._unsynced = True
+        now = time.monotonic()
+        if force_sync or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self._unsynced = False
+
+    def _run(self):
+        batch = []
+        batch_started = None
+        closing = False
+        try:
+            while not closing:
+                # Wake up for the next due flush, or for a deferred fsync
+                deadlines = []
+                if batch:
+                    deadlines.append(batch_started + self.flush_interval)
+                if self._unsynced:
+                    deadlines.append(self._last_fsync + self.fsync_interval)
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                    if item is _CLOSE:
+                        closing = True
+                    else:
+                        if not batch:
+                            batch_started = time.monotonic()
+                        batch.append(item)
+                except queue.Empty:
+                    pass
+
+                if closing:
+                    self._write_batch(batch, force_sync=True)
+                elif batch and (len(batch) >= self.flush_rows or
+                                time.monotonic() - batch_started >= self.flush_interval):
+                    self._write_batch(batch)
+                elif not batch and self._unsynced:
+                    self._write_batch(batch)
+        except Exception as e:
+            # Keep draining so producers never block on a dead writer
+            self.error = e
+            while self._queue.get() is not _CLOSE:
+                pass
+        finally:
+            if self._file is not None:
+                self._file.close()
@@ -0,0 +1,275 @@
+"""
+Headless bath controller daemon with a local HTTP control API.
+
+Runs ExperimentEngine without any GUI (tkinter is never imported), so a
+Raspberry Pi without a screen can run experiments and a GUI or script can
+attach and detach without interrupting them.
+
+    python daemon.py --config configs/experiment_1.ini [--port 8765]
+    python daemon.py --resume     # continue a run interrupted by a crash
+
+Endpoints (JSON, localhost only by default):
+
+    GET  /status                  engine state, step, temperature, ETA
+    GET  /messages?since=N        log lines after sequence number N
+    GET  /metrics                 Prometheus metrics (see metrics.py)
+    POST /load-config {"path"}    load an experiment config file
+    POST /start                   start the loaded config (optional {"path"})
+    POST /pause, /resume, /stop
+
+See daemon_client.py for a command-line client.
+"""
+import argparse
+import collections
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import main
+import metrics
+from checkpoint import describe_checkpoint
+from engine import ExperimentEngine
+from experiment_index import ExperimentIndex, DEFAULT_DB_NAME
+
+DEFAULT_PORT = 8765
+MESSAGE_BACKLOG = 1000
+
+
+class MessageBuffer:
+    """Bounded, sequence-numbered buffer of log lines for polling clients."""
+
+    def __init__(self, maxlen: int = MESSAGE_BACKLOG):
+        self._lock = threading.Lock()
+        self._lines = collections.deque(maxlen=maxlen)
+        self.next_seq = 0
+
+    def append(self, text: str):
+        with self._lock:
+            self._lines.append((self.next_seq, text))
+            self.next_seq += 1
+
+    def since(self, seq: int) -> list:
+        """Return ``(seq, text)`` pairs with a sequence number >= ``seq``."""
+        with self._lock:
+            return [(n, text) for n, text in self._lines if n >= seq]
+
+
+class ControllerDaemon:
+    """Owns one ExperimentEngine and the experiment config it runs."""
+
+    def __init__(self, log_dir: str, metrics_enabled: bool = True, config_dir: Optional[str] = None):
+        """
+        Args:
+            log_dir: Directory for the CSV logs, checkpoint and experiment index
+            metrics_enabled: Collect metrics for the runs started here
+            config_dir: GUI configs directory; its ``experiment_N.ini`` files keep
+                the experiment counter ahead of the numbers already used
+        """
+        self.messages = MessageBuffer()
+        self.metrics_enabled = metrics_enabled
+        self.index = ExperimentIndex(os.path.join(log_dir, DEFAULT_DB_NAME), config_dir=config_dir)
+        self.engine = ExperimentEngine(log_dir=log_dir, on_message=self.log_message, index=self.index)
+        self.config_path = None
+        self.settings = None
+        self.experiment_name = None
+
+    def log_message(self, message: str):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        line = f"[{timestamp}] {message}"
+        self.messages.append(line)
+        print(line)
+
+    def load_config(self, path: str) -> Optional[str]:
+        """Load an experiment config; returns an error message or None."""
+        if self.engine.running:
+            return "Stop the current experiment before loading a config file"
+        config = main.load_config(path)
+        if config is None:
+            return f"Config file {path} not found"
+        self.config_path = path
+        self.settings = main.get_settings(config)
+        if not self.metrics_enabled:
+            self.settings["metrics_enabled"] = False
+        self.experiment_name = os.path.splitext(os.path.basename(path))[0]
+        self.log_message(f"Loaded configuration from: {path}")
+        return None
+
+    def start(self) -> Optional[str]:
+        if self.settings is None:
+            return "No configuration loaded"
+        if not self.engine.start(self.settings, self.experiment_name, self.config_path):
+            return "Could not start experiment (already running or no setpoints)"
+        return None
+
+    def resume_checkpoint(self) -> Optional[str]:
+        """Resume the run left in the checkpoint; returns an error message or None."""
+        checkpoint = self.engine.pending_checkpoint()
+        if checkpoint is None:
+            return "No interrupted experiment to resume"
+        self.config_path = checkpoint.get("config_path")
+        self.settings = checkpoint["settings"]
+        if not self.metrics_enabled:
+            self.settings["metrics_enabled"] = False
+        self.experiment_name = checkpoint["experiment_name"]
+        self.log_message(f"Resuming {describe_checkpoint(checkpoint)}")
+        if not self.engine.start(self.settings, self.experiment_name, self.config_path, resume=checkpoint):
+            return "Could not resume experiment"
+        return None
+
+    def status(self) -> dict:
+        status = self.engine.status()
+        status["config"] = self.config_path
+        return status
+
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    """Maps the control API onto the ControllerDaemon stored on the server."""
+
+    def log_message(self, format, *args):
+        # Keep the console for experiment messages
+        pass
+
+    def _send_json(self, code: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        daemon = self.server.controller
+        url = urlparse(self.path)
+        if url.path == "/status":
+            self._send_json(200, daemon.status())
+        elif url.path == "/messages":
+            since = parse_qs(url.query).get("since", ["0"])[0]
+            try:
+                since = int(since)
+            except ValueError:
+                self._send_json(400, {"error": f"Invalid 'since': {since}"})
+                return
+            lines = daemon.messages.since(since)
+            self._send_json(200, {"next": daemon.messages.next_seq,
+                                  "messages": [text for _, text in lines]})
+        elif url.path == "/metrics":
+            body = metrics.REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        daemon = self.server.controller
+        path = urlparse(self.path).path
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+
+        try:
+            self._dispatch_post(daemon, path, body)
+        except Exception as e:
+            self._send_json(500, {"error": f"{path} failed: {str(e)}"})
+
+    def _dispatch_post(self, daemon: ControllerDaemon, path: str, body: dict):
+        error = None
+        if path == "/load-config":
+            if "path" not in body:
+                self._send_json(400, {"error": "Missing 'path'"})
+                return
+            error = daemon.load_config(body["path"])
+        elif path == "/start":
+            if "path" in body:
+                error = daemon.load_config(body["path"])
+            if error is None:
+                error = daemon.start()
+        elif path == "/pause":
+            if not daemon.engine.pause():
+                error = "No running experiment to pause"
+        elif path == "/resume":
+            if not daemon.engine.resume():
+                error = "No paused experiment to resume"
+        elif path == "/stop":
+            if not daemon.engine.stop():
+                error = "No running experiment to stop"
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+            return
+
+        if error:
+            self._send_json(409, {"error": error, "status": daemon.status()})
+        else:
+            self._send_json(200, daemon.status())
+
+
+def serve(daemon: ControllerDaemon, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Create the control API server (call serve_forever() on the result)."""
+    server = ThreadingHTTPServer((host, port), ControlRequestHandler)
+    server.daemon_threads = True
+    server.controller = daemon
+    return server
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Headless thermal bath controller with a local control API")
+    parser.add_argument("--config", help="Experiment config file to load at startup (.ini)")
+    parser.add_argument("--start", action="store_true", help="Start the loaded config immediately")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Control API port")
+    parser.add_argument("--log-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"),
+                        help="Directory for the CSV logs")
+    parser.add_argument("--config-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs"),
+                        help="Directory of the GUI's experiment configs (keeps experiment numbers unique)")
+    parser.add_argument("--no-metrics", action="store_true", help="Disable metrics collection")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume the experiment interrupted by a crash (from logs/checkpoint.json)")
+    args = parser.parse_args()
+
+    metrics.REGISTRY.enabled = not args.no_metrics
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    daemon = ControllerDaemon(args.log_dir, metrics_enabled=not args.no_metrics, config_dir=args.config_dir)
+    if args.resume:
+        error = daemon.resume_checkpoint()
+        if error:
+            print(error)
+    elif daemon.engine.pending_checkpoint() is not None:
+        print("An interrupted experiment can be resumed with --resume")
+    if args.config and not daemon.engine.running:
+        error = daemon.load_config(args.config)
+        if error:
+            print(error)
+        elif args.start:
+            error = daemon.start()
+            if error:
+                print(error)
+
+    server = serve(daemon, args.host, args.port)
+    print(f"Control API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Interrupted.")
+    finally:
+        server.server_close()
+        if daemon.engine.stop():
+            daemon.engine.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main_cli()
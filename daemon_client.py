@@ -0,0 +1,119 @@
+"""
+Command-line client for the controller daemon's control API.
+
+    python daemon_client.py status
+    python daemon_client.py load-config configs/experiment_1.ini
+    python daemon_client.py start [configs/experiment_1.ini]
+    python daemon_client.py pause | resume | stop
+    python daemon_client.py messages [--follow]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class DaemonClient:
+    """Thin wrapper around the daemon's HTTP endpoints."""
+
+    def __init__(self, url: str = DEFAULT_URL, timeout: float = 5.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        """
+        Send a request and decode the JSON reply.
+
+        Raises:
+            RuntimeError: If the daemon rejects the request (message from the daemon)
+            OSError: If the daemon cannot be reached
+        """
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            reply = json.loads(e.read().decode('utf-8') or "{}")
+            raise RuntimeError(reply.get("error", str(e))) from None
+
+    def status(self) -> dict:
+        return self._request("GET", "/status")
+
+    def messages(self, since: int = 0) -> dict:
+        """Return ``{"next": seq, "messages": [...]}`` with lines from ``since`` on."""
+        return self._request("GET", f"/messages?since={since}")
+
+    def load_config(self, path: str) -> dict:
+        return self._request("POST", "/load-config", {"path": os.path.abspath(path)})
+
+    def start(self, path: Optional[str] = None) -> dict:
+        return self._request("POST", "/start", {"path": os.path.abspath(path)} if path else {})
+
+    def pause(self) -> dict:
+        return self._request("POST", "/pause", {})
+
+    def resume(self) -> dict:
+        return self._request("POST", "/resume", {})
+
+    def stop(self) -> dict:
+        return self._request("POST", "/stop", {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running thermal bath daemon")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Daemon control API URL")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show the experiment status")
+    load_parser = subparsers.add_parser("load-config", help="Load an experiment config file")
+    load_parser.add_argument("path")
+    start_parser = subparsers.add_parser("start", help="Start the loaded (or given) config")
+    start_parser.add_argument("path", nargs="?")
+    subparsers.add_parser("pause", help="Pause the experiment")
+    subparsers.add_parser("resume", help="Resume the experiment")
+    subparsers.add_parser("stop", help="Stop the experiment")
+    messages_parser = subparsers.add_parser("messages", help="Print the daemon log")
+    messages_parser.add_argument("--follow", action="store_true", help="Keep printing new messages")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.url)
+    try:
+        if args.command == "messages":
+            since = 0
+            while True:
+                reply = client.messages(since)
+                for line in reply["messages"]:
+                    print(line)
+                since = reply["next"]
+                if not args.follow:
+                    break
+                time.sleep(1.0)
+            return
+        if args.command == "status":
+            result = client.status()
+        elif args.command == "load-config":
+            result = client.load_config(args.path)
+        elif args.command == "start":
+            result = client.start(args.path)
+        else:
+            result = getattr(client, args.command)()
+        print(json.dumps(result, indent=2))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Could not reach daemon at {args.url}: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max summary of a time series, built incrementally.
+
+    Level 0 holds the raw points. Each level above groups ``factor`` buckets
+    of the level below into one bucket holding the start time and the min and
+    max value. Appending a point costs amortized O(1) and a query returns at
+    most ``max_points`` buckets from the finest level that fits, so drawing
+    a trace costs the same whether it holds a thousand or millions of points.
+    """
+
+    def __init__(self, factor: int = 4, levels: int = 10):
+        """
+        Args:
+            factor: Buckets of one level merged into one bucket of the next
+            levels: Number of downsampled levels above the raw points
+        """
+        self.factor = factor
+        self._times = [array('d') for _ in range(levels + 1)]
+        self._mins = [array('d') for _ in range(levels + 1)]
+        self._maxs = [array('d') for _ in range(levels + 1)]
+        # Open (partial) bucket per level: [start time, min, max, count]
+        self._open = [None] * (levels + 1)
+
+    def __len__(self) -> int:
+        return len(self._times[0])
+
+    @property
+    def first_time(self) -> float:
+        return self._times[0][0]
+
+    @property
+    def last_time(self) -> float:
+        return self._times[0][-1]
+
+    def clear(self):
+        for level in range(len(self._times)):
+            self._times[level] = array('d')
+            self._mins[level] = array('d')
+            self._maxs[level] = array('d')
+            self._open[level] = None
+
+    def append(self, t: float, value: float):
+        """Add a point; times must be non-decreasing."""
+        self._times[0].append(t)
+        self._mins[0].append(value)
+        self._maxs[0].append(value)
+        self._feed(1, t, value, value)
+
+    def _feed(self, level: int, t: float, vmin: float, vmax: float):
+        """Merge a closed bucket of level - 1 into the open bucket of ``level``."""
+        while level < len(self._times):
+            bucket = self._open[level]
+            if bucket is None:
+                bucket = self._open[level] = [t, vmin, vmax, 0]
+            else:
+                if vmin < bucket[1]:
+                    bucket[1] = vmin
+                if vmax > bucket[2]:
+                    bucket[2] = vmax
+            bucket[3] += 1
+            if bucket[3] < self.factor:
+                return
+            # Bucket complete: close it and feed it to the next level up
+            self._times[level].append(bucket[0])
+            self._mins[level].append(bucket[1])
+            self._maxs[level].append(bucket[2])
+            self._open[level] = None
+            t, vmin, vmax = bucket[0], bucket[1], bucket[2]
+            level += 1
+
+    def query(self, t0: float, t1: float, max_points: int) -> List[Tuple[float, float, float]]:
+        """
+        Return ``(time, min, max)`` buckets covering ``[t0, t1]``.
+
+        Uses the finest level with at most ``max_points`` buckets in range.
+        """
+        for level in range(len(self._times)):
+            times = self._times[level]
+            i0 = bisect_left(times, t0)
+            # Include the bucket that starts before t0 but extends into the range
+            if level and i0 > 0:
+                i0 -= 1
+            i1 = bisect_right(times, t1)
+            # Newest points still sit in the open buckets of this and lower levels
+            pending = [self._open[k] for k in range(level, 0, -1)
+                       if self._open[k] is not None and self._open[k][0] <= t1]
+            if i1 - i0 + len(pending) <= max_points or level == len(self._times) - 1:
+                result = list(zip(times[i0:i1], self._mins[level][i0:i1], self._maxs[level][i0:i1]))
+                result.extend((bucket[0], bucket[1], bucket[2]) for bucket in pending)
+                return result
+        return []
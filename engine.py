@@ -0,0 +1,688 @@
+"""
+Headless experiment engine for one bath.
+
+Runs the setpoint sequence (set temperature, wait for stability, hold, move
+on) in a background thread and reports progress through plain callbacks, so
+the same logic drives the Tk GUIs and the headless daemon. Nothing here
+imports tkinter.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+import main
+import metrics
+from checkpoint import (CHECKPOINT_INTERVAL, CHECKPOINT_NAME, PHASE_HOLDING, PHASE_SETTLING,
+                        archive_checkpoint, clear_checkpoint, load_checkpoint, save_checkpoint)
+from csv_logger import CsvLogWriter
+from experiment_index import STEP_COMPLETED, STEP_STOPPED, STEP_TIMEOUT
+from readings_store import ReadingsStore, STATUS_HOLDING
+from sampling import AdaptiveSampler
+from scheduler import TickScheduler
+from serial_worker import SerialWorker, PRIORITY_EMERGENCY, PRIORITY_POLL, PRIORITY_QUERY, PRIORITY_SETPOINT
+from settling import SettlingEstimator, format_eta
+from stability import StabilityTracker
+from transcript import RecordingSerial
+from transport import PORT_LOCK, SerialTransport, parse_temperature
+
+# Interval between settling ETA entries in the log (seconds)
+ETA_LOG_INTERVAL = 300
+
+HOLD_STATUS_SECONDS = "Stable - Holding ({remaining_s}s remaining)"
+HOLD_STATUS_MINUTES = "Stable - Holding ({remaining_min:.1f}min remaining)"
+
+# Engine states reported by status()
+STATE_IDLE = "idle"
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+STATE_STOPPING = "stopping"
+STATE_COMPLETED = "completed"
+STATE_STOPPED = "stopped"
+STATE_ERROR = "error"
+# Index state of a run whose checkpoint was discarded instead of resumed
+STATE_INTERRUPTED = "interrupted"
+
+
+class ExperimentEngine:
+    """
+    Runs one experiment at a time on one bath.
+
+    Settings use the dict layout of ``main.get_settings``. Progress is
+    reported through the optional callbacks, which are called from the
+    experiment thread:
+
+        on_message(text)              log lines
+        on_value(name, text)          display values: "current_temp", "current_step", "settle_eta"
+        on_reading(t, actual, target) every temperature reading (epoch time)
+        on_finished()                 once the experiment thread has cleaned up
+
+    pause(), resume() and stop() wake the experiment thread through a
+    condition variable: a stop interrupts the wait between readings and the
+    serial read in progress, and a paused run sleeps without polling.
+    """
+
+    def __init__(self, log_dir: str = "logs", hold_minutes: bool = False,
+                 on_message: Optional[Callable[[str], None]] = None,
+                 on_value: Optional[Callable[[str, str], None]] = None,
+                 on_reading: Optional[Callable[[float, float, float], None]] = None,
+                 on_finished: Optional[Callable[[], None]] = None,
+                 serial_factory: Optional[Callable[[dict], object]] = None,
+                 index=None, checkpoint: bool = True,
+                 sleep: Optional[Callable[[float], None]] = None,
+                 clock: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            log_dir: Directory for the CSV logs and readings stores
+            hold_minutes: Report hold times in minutes instead of seconds
+            on_message, on_value, on_reading, on_finished: Progress callbacks
+            serial_factory: Opens the serial connection from the settings
+                (default: main.initialize_serial; transcript.py passes a replay port)
+            index: ExperimentIndex to record runs and step outcomes in (optional)
+            checkpoint: Keep a resumable checkpoint in ``log_dir/checkpoint.json``
+            sleep: Replaces the interruptible wait between readings (replays on a
+                virtual clock); pause and stop then act at the next reading
+            clock: Monotonic clock the readings are scheduled on (default
+                ``time.monotonic``; replays pass the virtual clock that ``sleep`` advances)
+        """
+        self.log_dir = log_dir
+        self.hold_minutes = hold_minutes
+        self.on_message = on_message or print
+        self.on_value = on_value
+        self.on_reading = on_reading
+        self.on_finished = on_finished
+        self.serial_factory = serial_factory
+        self.index = index
+        self.checkpoint_path = os.path.join(log_dir, CHECKPOINT_NAME) if checkpoint else None
+        self.sleep = sleep
+        self.clock = clock
+
+        # Guards running/paused; notified on every pause, resume and stop
+        self._control = threading.Condition()
+        self._start_lock = threading.Lock()
+        self.state = STATE_IDLE
+        self.running = False
+        self.paused = False
+        self.settings = None
+        self.experiment_name = None
+        self.config_path = None
+        self.current_setpoint_index = 0
+        self.error = None
+        self.serial_connection = None
+        self.transport = None
+        self.serial_worker = None
+        self.log_writer = None
+        self.readings_store = None
+        self.log_base_path = None
+        self.experiment_id = None
+        self._index_step = None
+        self._resume = None
+        self.values = {}
+        self._thread = None
+
+    def log_message(self, message: str):
+        self.on_message(message)
+
+    def _publish(self, name: str, value: str):
+        self.values[name] = value
+        if self.on_value:
+            self.on_value(name, value)
+
+    def start(self, settings: dict, experiment_name: str, config_path: Optional[str] = None,
+              resume: Optional[dict] = None) -> bool:
+        """
+        Start an experiment in a background thread.
+
+        Args:
+            settings: Settings dict as returned by main.get_settings
+            experiment_name: Name used for the log files
+            config_path: Config file the settings came from (recorded in the index)
+            resume: Checkpoint from checkpoint.load_checkpoint to continue
+                instead of starting at step 1 (its logs are appended to); a
+                new run archives any pending checkpoint instead of overwriting it
+
+        Returns:
+            bool: False if an experiment is already running or there are no setpoints
+        """
+        # Two callers (e.g. concurrent daemon requests) must not both pass the running check
+        with self._start_lock:
+            if self.running:
+                self.log_message("An experiment is already running")
+                return False
+            if not settings["setpoints"]:
+                self.log_message("No setpoints to run")
+                return False
+
+            # A new run would write over the checkpoint of an interrupted one
+            if not resume:
+                pending = self.pending_checkpoint()
+                if pending is not None:
+                    self.discard_checkpoint(pending, archive=True)
+
+            self.settings = dict(settings)
+            self.experiment_name = experiment_name
+            self.config_path = config_path
+            self.current_setpoint_index = resume["current_setpoint_index"] if resume else 0
+            self._resume = resume
+            self.error = None
+            self.values = {}
+
+            metrics.REGISTRY.enabled = settings.get("metrics_enabled", True)
+            if metrics.REGISTRY.enabled and settings.get("metrics_port"):
+                metrics.serve_metrics(settings["metrics_port"])
+
+            # Stream readings to disk as they arrive
+            self._open_log_writer(resume["log_base_path"] if resume else None)
+            self._index_step = None
+            self.experiment_id = resume.get("experiment_id") if resume else None
+            if not (resume and self._update_index("resume_experiment")):
+                self.experiment_id = None
+                self.experiment_id = self._update_index("start_experiment", experiment_name, self.settings, config_path,
+                                                        log_path=f"{self.log_base_path}.csv",
+                                                        readings_path=f"{self.log_base_path}.readings")
+
+            self.running = True
+            self.paused = False
+            self.state = STATE_RUNNING
+            if resume:
+                self.log_message(f"Experiment resumed at step {self.current_setpoint_index + 1}")
+            else:
+                self.log_message("Experiment started")
+            self._thread = threading.Thread(target=self._run_experiment, daemon=True)
+            self._thread.start()
+            return True
+
+    def pause(self) -> bool:
+        with self._control:
+            if not self.running or self.paused:
+                return False
+            self.paused = True
+            self.state = STATE_PAUSED
+            self._control.notify_all()
+        self.log_message("Experiment paused")
+        return True
+
+    def resume(self) -> bool:
+        with self._control:
+            if not self.running or not self.paused:
+                return False
+            self.paused = False
+            self.state = STATE_RUNNING
+            self._control.notify_all()
+        self.log_message("Experiment resumed")
+        return True
+
+    def pending_checkpoint(self) -> Optional[dict]:
+        """Checkpoint left behind by an interrupted run, if any."""
+        if self.checkpoint_path is None:
+            return None
+        return load_checkpoint(self.checkpoint_path)
+
+    def discard_checkpoint(self, checkpoint: dict, archive: bool = False):
+        """
+        Give up on an interrupted run and close it in the index.
+
+        Args:
+            checkpoint: The pending checkpoint
+            archive: Keep the checkpoint file under another name instead of removing it
+        """
+        if archive:
+            archived = archive_checkpoint(self.checkpoint_path)
+            if archived:
+                self.log_message(f"Archived the checkpoint of interrupted experiment "
+                                 f"{checkpoint.get('experiment_name')} to {archived}")
+        else:
+            clear_checkpoint(self.checkpoint_path)
+        if self.index is not None and checkpoint.get("experiment_id") is not None:
+            try:
+                self.index.finish_experiment(checkpoint["experiment_id"], STATE_INTERRUPTED)
+            except sqlite3.Error as e:
+                self.log_message(f"Could not update experiment index: {str(e)}")
+
+    def stop(self) -> bool:
+        """Ask the experiment thread to stop; returns immediately."""
+        with self._control:
+            if not self.running:
+                return False
+            self.running = False
+            self.state = STATE_STOPPING
+            self._control.notify_all()
+        # Don't wait out the timeout of a poll that is on the wire
+        transport = self.transport
+        if transport is not None:
+            transport.cancel_read()
+        self.log_message("Experiment stopping...")
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the experiment thread to finish; returns False on timeout."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def status(self) -> dict:
+        """Snapshot of the engine state for status displays and the control API."""
+        settings = self.settings or {}
+        setpoints = settings.get("setpoints", [])
+        index = self.current_setpoint_index
+        return {
+            "state": self.state,
+            "experiment": self.experiment_name,
+            "step": index + 1 if self.running and index < len(setpoints) else None,
+            "steps": len(setpoints),
+            "setpoint": setpoints[index] if self.running and index < len(setpoints) else None,
+            "current_temp": self.values.get("current_temp"),
+            "settle_eta": self.values.get("settle_eta"),
+            "log_path": self.log_writer.path if self.log_writer else None,
+            "error": self.error,
+        }
+
+    def send_command(self, command: str):
+        """
+        Queue a raw bath command between polls.
+
+        Settings changed by hand (commands with ``=``, e.g. ``s=20``) are
+        operator overrides and go ahead of everything the run has queued;
+        queries wait behind set-points but ahead of routine polls.
+
+        Returns:
+            Future with the reply, or None if no experiment is connected
+        """
+        worker = self.serial_worker
+        if worker is None:
+            return None
+        if "=" in command:
+            return worker.submit(command, PRIORITY_EMERGENCY, expect_reply=False)
+        return worker.submit(command, PRIORITY_QUERY)
+
+    def _open_log_writer(self, base_path: Optional[str] = None):
+        """Start streaming temperature log rows to a CSV file and readings store (new unless base_path is given)."""
+        if base_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_path = os.path.join(self.log_dir, f"{self.experiment_name}_{timestamp}")
+        self.log_base_path = base_path
+
+        self.log_writer = CsvLogWriter(f"{base_path}.csv",
+                                       flush_interval=self.settings.get("flush_interval", 5.0),
+                                       fsync_interval=self.settings.get("fsync_interval", 30.0))
+        self.readings_store = ReadingsStore(f"{base_path}.readings",
+                                            hold_status_format=self._hold_status_format())
+
+    def _update_index(self, method: str, *args, **kwargs):
+        """Call an ExperimentIndex method; index failures never stop the experiment."""
+        if self.index is None or (self.experiment_id is None and method != "start_experiment"):
+            return None
+        if method != "start_experiment":
+            args = (self.experiment_id,) + args
+        try:
+            return getattr(self.index, method)(*args, **kwargs)
+        except sqlite3.Error as e:
+            self.log_message(f"Could not update experiment index: {str(e)}")
+            return None
+
+    def _save_checkpoint(self, phase: str, step_started: float, stability_start_time: Optional[float],
+                         settled: bool, tracker: StabilityTracker):
+        """Persist the state needed to resume the current step after a crash (times are monotonic)."""
+        if self.checkpoint_path is None:
+            return
+        # Monotonic time does not survive a reboot, so store how long the step and hold have run
+        now = time.monotonic()
+        try:
+            save_checkpoint(self.checkpoint_path, {
+                "experiment_name": self.experiment_name,
+                "config_path": self.config_path,
+                "settings": self.settings,
+                "experiment_id": self.experiment_id,
+                "log_base_path": self.log_base_path,
+                "current_setpoint_index": self.current_setpoint_index,
+                "phase": phase,
+                "step_elapsed": now - step_started,
+                "hold_elapsed": None if stability_start_time is None else now - stability_start_time,
+                "settled": settled,
+                "readings": tracker.values(),
+            })
+        except OSError as e:
+            self.log_message(f"Could not save checkpoint: {str(e)}")
+
+    def _hold_status_format(self) -> str:
+        return HOLD_STATUS_MINUTES if self.hold_minutes else HOLD_STATUS_SECONDS
+
+    def save_log_data(self):
+        """Flush pending temperature log rows to disk and close the CSV file."""
+        if self.readings_store is not None:
+            self.readings_store.close()
+            self.readings_store = None
+
+        if self.log_writer is None:
+            return
+
+        log_writer = self.log_writer
+        self.log_writer = None
+        log_writer.close()
+
+        if log_writer.error:
+            self.log_message(f"Error writing log data: {str(log_writer.error)}")
+        elif log_writer.rows_written:
+            self.log_message(f"Saved log data to: {log_writer.path}")
+
+    def _run_experiment(self):
+        """Run the experiment (experiment thread)."""
+        settings = self.settings
+        setpoints = settings["setpoints"]
+        try:
+            # Initialize the serial connection
+            try:
+                self.log_message(f"Connecting to port {settings['port']}...")
+                # Waits for a port probe in progress; later probes skip this port
+                with PORT_LOCK:
+                    if self.serial_factory:
+                        self.serial_connection = self.serial_factory(settings)
+                    else:
+                        self.serial_connection = main.initialize_serial(port=settings["port"],
+                                                                        baudrate=settings["baudrate"],
+                                                                        timeout=settings["timeout"])
+                if settings.get("transcript"):
+                    transcript_path = f"{self.log_base_path}.trc"
+                    if os.path.exists(transcript_path):
+                        # Resumed run: keep the transcript up to the interruption
+                        transcript_path = f"{self.log_base_path}_resumed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.trc"
+                    self.serial_connection = RecordingSerial(self.serial_connection, transcript_path)
+                    self.log_message(f"Recording serial transcript to: {self.serial_connection.path}")
+                    self._update_index("set_transcript", self.serial_connection.path)
+                self.transport = SerialTransport(self.serial_connection)
+                self.serial_worker = SerialWorker(self.transport)
+                self.log_message("Serial connection established")
+            except Exception as e:
+                self.error = f"Could not connect to port {settings['port']}: {str(e)}"
+                self.log_message(f"Error connecting to serial port: {str(e)}")
+                return
+
+            # Get stability parameters
+            hold_time = settings["hold_time"]
+            stability_window = settings["stability_window"]
+            reading_interval = settings["reading_interval"]
+            timeout_duration = settings["timeout_duration"]
+            min_readings = settings["min_readings"]
+            hold_status_format = self._hold_status_format()
+            sampler = None
+            if settings.get("adaptive_sampling"):
+                sampler = AdaptiveSampler(settings["min_interval"], settings["max_interval"],
+                                          stability_window)
+                self.log_message(f"Adaptive sampling between {sampler.min_interval}s and {sampler.max_interval}s")
+            last_reading_time = None
+            # Readings fire on absolute monotonic deadlines, so I/O time does not stretch the interval
+            scheduler = TickScheduler(clock=self.clock, sleep=self._sleep_between_readings)
+
+            # Read initial temperature
+            current_temp = self._read_temperature()
+            if current_temp is not None:
+                self.log_message(f"Initial temperature: {current_temp}°C")
+                self._publish("current_temp", f"{current_temp:.2f}°C")
+
+            # Process each setpoint
+            while self.current_setpoint_index < len(setpoints) and self.running:
+                setpoint = setpoints[self.current_setpoint_index]
+                step_number = self.current_setpoint_index + 1
+
+                # Update current step indicator
+                self._publish("current_step", f"Step {step_number}: {setpoint:.2f}°C")
+
+                # Handle pause state
+                self._wait_while_paused()
+
+                # If we're no longer running (stopped during pause), exit
+                if not self.running:
+                    break
+
+                self.log_message(f"Step {step_number}: Setting temperature to {setpoint}°C")
+                self._set_temperature(setpoint)
+
+                # Initialize tracking variables (monotonic clock: immune to NTP steps)
+                start_time = time.monotonic()
+                stability_start_time = None
+                step_outcome = STEP_STOPPED
+                self._index_step = step_number
+                temperature_readings = StabilityTracker(min_readings, stability_window)
+                settling = SettlingEstimator(setpoint, stability_window, min_readings)
+                settle_warned = False
+                settled = False
+                eta_logged_at = None
+                resume, self._resume = self._resume, None
+                if resume and resume["current_setpoint_index"] == self.current_setpoint_index:
+                    # Continue the interrupted step; the time the controller was down does not count
+                    downtime = max(0.0, time.time() - resume["saved_at"])
+                    start_time -= resume["step_elapsed"]
+                    if resume["phase"] == PHASE_HOLDING and resume["hold_elapsed"] is not None:
+                        stability_start_time = time.monotonic() - resume["hold_elapsed"]
+                    for reading in resume["readings"]:
+                        temperature_readings.add(reading)
+                    settled = resume.get("settled", False)
+                    self.log_message(f"Resuming step {step_number} ({resume['phase']}) after {downtime / 60:.1f} min down")
+                else:
+                    self._update_index("start_step", step_number, setpoint)
+                checkpoint_phase = PHASE_HOLDING if stability_start_time is not None else PHASE_SETTLING
+                self._save_checkpoint(checkpoint_phase, start_time, stability_start_time, settled, temperature_readings)
+                checkpoint_at = time.monotonic()
+                if sampler:
+                    sampler.reset()
+                scheduler.start()
+
+                # Wait for temperature to stabilize
+                while self.running:
+                    # Handle pause state
+                    if self._wait_while_paused():
+                        scheduler.start()
+
+                    # If we're no longer running (stopped during pause), exit
+                    if not self.running:
+                        break
+
+                    current_time = time.monotonic()
+                    elapsed_time = current_time - start_time
+
+                    if elapsed_time > timeout_duration:
+                        self.log_message(f"Timeout reached while waiting for stability at {setpoint}°C")
+                        step_outcome = STEP_TIMEOUT
+                        break
+
+                    # Read current temperature
+                    temp = self._read_temperature()
+                    if temp is not None:
+                        # Time since the previous logged reading
+                        interval = None if last_reading_time is None else round(current_time - last_reading_time, 3)
+                        last_reading_time = current_time
+                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        status = "Waiting for stability"
+                        self.log_writer.write_row([timestamp, step_number, setpoint, temp, status,
+                                                   "" if interval is None else interval])
+                        self.readings_store.append(time.time(), step_number, setpoint, temp, interval=interval)
+                        temperature_readings.add(temp)
+                        settling.add(current_time, temp)
+                        self._publish("current_temp", f"{temp:.2f}°C")
+                        if self.on_reading:
+                            self.on_reading(time.time(), temp, setpoint)
+
+                    # Check if temperature is stable
+                    is_stable = self._is_temperature_stable(temperature_readings, setpoint)
+
+                    # Project the time to stability from the approach curve
+                    estimate = settling.estimate(deadline=start_time + timeout_duration)
+                    eta_text = "Stable" if is_stable else format_eta(estimate)
+                    self._publish("settle_eta", eta_text)
+                    if estimate is not None and not is_stable:
+                        if not estimate.converging and not settle_warned:
+                            self.log_message(f"Warning: step at {setpoint}°C is not expected to stabilize: {estimate.reason}")
+                            settle_warned = True
+                        elif estimate.eta is not None and (eta_logged_at is None
+                                                           or current_time - eta_logged_at >= ETA_LOG_INTERVAL):
+                            self.log_message(f"Estimated time to stability at {setpoint}°C: {eta_text}")
+                            eta_logged_at = current_time
+
+                    if is_stable:
+                        if stability_start_time is None:
+                            stability_start_time = current_time
+                            if not settled:
+                                metrics.SETTLE_TIME.observe(current_time - start_time)
+                                self._update_index("step_stable", step_number)
+                                settled = True
+                            if self.hold_minutes:
+                                self.log_message(f"Temperature stable at {setpoint}°C, holding for {hold_time / 60} minutes")
+                            else:
+                                self.log_message(f"Temperature stable at {setpoint}°C, holding for {hold_time} seconds")
+
+                        # Update status in log data
+                        remaining = hold_time - (current_time - stability_start_time)
+                        if remaining > 0:
+                            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            status = hold_status_format.format(remaining_s=int(remaining),
+                                                               remaining_min=remaining / 60)
+                            if temp is not None:
+                                self.log_writer.write_row([timestamp, step_number, setpoint, temp, status,
+                                                           "" if interval is None else interval])
+                                self.readings_store.append(time.time(), step_number, setpoint, temp,
+                                                           STATUS_HOLDING, remaining, interval)
+
+                        # Check if we've held the temperature long enough
+                        if current_time - stability_start_time >= hold_time:
+                            self.log_message(f"Completed hold time for {setpoint}°C")
+                            step_outcome = STEP_COMPLETED
+                            break
+                    else:
+                        # Reset stability timer if temperature becomes unstable
+                        stability_start_time = None
+
+                    # Checkpoint on every phase change and periodically for the readings window
+                    phase = PHASE_HOLDING if stability_start_time is not None else PHASE_SETTLING
+                    if phase != checkpoint_phase or current_time - checkpoint_at >= CHECKPOINT_INTERVAL:
+                        self._save_checkpoint(phase, start_time, stability_start_time, settled, temperature_readings)
+                        checkpoint_phase = phase
+                        checkpoint_at = current_time
+
+                    requested_interval = sampler.next_interval(temperature_readings, setpoint) if sampler else reading_interval
+                    tick = scheduler.wait(requested_interval)
+                    if tick is None:
+                        # Woken by pause or stop; handled at the top of the loop
+                        continue
+                    metrics.LOOP_JITTER.observe(tick.lateness)
+                    if tick.skipped:
+                        metrics.SKIPPED_TICKS.inc(tick.skipped)
+                        self.log_message(f"Reading loop fell behind; skipped {tick.skipped} reading(s)")
+
+                self._update_index("finish_step", step_number, step_outcome)
+                self._index_step = None
+
+                # If we're no longer running, exit the loop
+                if not self.running:
+                    break
+
+                # Move to next setpoint
+                self.current_setpoint_index += 1
+
+            if self.current_setpoint_index >= len(setpoints):
+                self.log_message("All steps completed!")
+            else:
+                self.log_message("Experiment stopped before completion")
+
+        except Exception as e:
+            self.error = str(e)
+            self.log_message(f"Error during experiment: {str(e)}")
+        finally:
+            # Close the serial connection
+            if self.serial_worker:
+                self.serial_worker.close()
+                self.log_message(f"Serial queue wait: {self.serial_worker.wait_summary()}")
+                self.serial_worker = None
+            if self.transport:
+                self.log_message(f"Serial round trip: {self.transport.latency_summary()}")
+                self.transport = None
+            if self.serial_connection and self.serial_connection.is_open:
+                self.serial_connection.close()
+                self.log_message("Serial connection closed")
+            self.serial_connection = None
+
+            # Save the log data
+            self.save_log_data()
+
+            if self.error:
+                self.state = STATE_ERROR
+            elif self.current_setpoint_index >= len(setpoints):
+                self.state = STATE_COMPLETED
+            else:
+                self.state = STATE_STOPPED
+            if self._index_step is not None:
+                self._update_index("finish_step", self._index_step, STEP_STOPPED)
+                self._index_step = None
+            self._update_index("finish_experiment", self.state, self.error)
+            # Keep the checkpoint after an error so the run can be resumed
+            if self.checkpoint_path and self.state != STATE_ERROR:
+                clear_checkpoint(self.checkpoint_path)
+            with self._control:
+                self.running = False
+                self.paused = False
+            self._publish("current_step", "--")
+            self._publish("settle_eta", "--")
+            if self.on_finished:
+                self.on_finished()
+
+    def _wait_while_paused(self) -> bool:
+        """Block while the experiment is paused; returns True if it was."""
+        with self._control:
+            if not (self.paused and self.running):
+                return False
+            paused_at = time.monotonic()
+            while self.paused and self.running:
+                self._control.wait()
+        metrics.PAUSED_SECONDS.inc(time.monotonic() - paused_at)
+        return True
+
+    def _sleep_between_readings(self, seconds: float) -> bool:
+        """Wait up to ``seconds``; returns True early if paused or stopped meanwhile."""
+        if self.sleep is not None:
+            self.sleep(seconds)
+            return self.paused or not self.running
+        with self._control:
+            return self._control.wait_for(lambda: self.paused or not self.running, seconds)
+
+    def _read_temperature(self) -> Optional[float]:
+        """Read the current temperature from the bath."""
+        try:
+            response = self.serial_worker.query("t", PRIORITY_POLL)
+
+            # Extract the temperature value from the response (e.g. "t: 25.00 C")
+            temp = parse_temperature(response)
+            if temp is None and not self.running:
+                # Read cancelled by stop()
+                return None
+            if temp is None:
+                metrics.PARSE_FAILURES.inc()
+                self.log_message(f"Could not parse temperature: {response}")
+            else:
+                metrics.READINGS.inc()
+            return temp
+
+        except Exception as e:
+            self.log_message(f"Error reading temperature: {str(e)}")
+            return None
+
+    def _set_temperature(self, temperature: float) -> bool:
+        """Set the bath temperature setpoint."""
+        try:
+            # The bath does not answer set commands, so don't wait for a reply
+            self.serial_worker.query(f"s={temperature}", PRIORITY_SETPOINT, expect_reply=False)
+            return True
+        except Exception as e:
+            self.log_message(f"Error setting temperature: {str(e)}")
+            return False
+
+    def _is_temperature_stable(self, tracker: StabilityTracker, target: float) -> bool:
+        """Check if temperature is stable."""
+        if not tracker.full:
+            return False
+
+        is_stable = tracker.is_stable(target)
+        self.log_message(tracker.status_line(target))
+
+        return is_stable
@@ -0,0 +1,283 @@
+"""
+SQLite index of experiments and their steps.
+
+Every run started by the experiment engine (GUIs and daemon) is recorded as
+it happens: settings, config file, start/stop time, final state, log file
+paths, and per step the set-point, when it became stable and how it ended.
+Experiment numbers come from an atomic counter in the same database, so two
+GUIs (or a GUI and the daemon) never hand out the same number; a number is
+only reserved when a run actually starts.
+
+The database lives at ``logs/experiments.db`` and uses WAL mode, so readers
+never block the running experiment. Queries go through indexes on the start
+time and the set-point and stay fast with tens of thousands of runs:
+
+    python experiment_index.py list --limit 20
+    python experiment_index.py runs --setpoint 35 --since 2024-05-01
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+DEFAULT_DB_NAME = "experiments.db"
+
+# Step outcomes
+STEP_RUNNING = "running"
+STEP_COMPLETED = "completed"
+STEP_TIMEOUT = "timeout"
+STEP_STOPPED = "stopped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS experiments (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    config_path TEXT,
+    settings TEXT,
+    started REAL NOT NULL,
+    stopped REAL,
+    state TEXT NOT NULL,
+    error TEXT,
+    log_path TEXT,
+    readings_path TEXT,
+    transcript_path TEXT
+);
+CREATE INDEX IF NOT EXISTS experiments_started ON experiments (started);
+CREATE INDEX IF NOT EXISTS experiments_name ON experiments (name);
+CREATE TABLE IF NOT EXISTS steps (
+    experiment_id INTEGER NOT NULL REFERENCES experiments (id),
+    step INTEGER NOT NULL,
+    setpoint REAL NOT NULL,
+    started REAL NOT NULL,
+    stable_at REAL,
+    finished REAL,
+    outcome TEXT NOT NULL,
+    PRIMARY KEY (experiment_id, step)
+);
+CREATE INDEX IF NOT EXISTS steps_setpoint ON steps (setpoint, started);
+"""
+
+
+def _scan_config_numbers(config_dir: str) -> int:
+    """Highest N among ``experiment_N.ini`` files (0 if none)."""
+    highest = 0
+    if config_dir and os.path.exists(config_dir):
+        for filename in os.listdir(config_dir):
+            if filename.startswith("experiment_") and filename.endswith(".ini"):
+                try:
+                    highest = max(highest, int(filename.split("_")[1].split(".")[0]))
+                except (IndexError, ValueError):
+                    continue
+    return highest
+
+
+class ExperimentIndex:
+    """
+    Connection to the experiment index, safe to share between threads.
+
+    Args:
+        path: Database file (created if needed)
+        config_dir: Scanned for ``experiment_N.ini`` files on every open; the
+            experiment counter is raised to the highest N found, so numbers
+            never clash with configs created while another process held
+            the database without a config_dir
+    """
+
+    def __init__(self, path: str, config_dir: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+            # Catch the counter up with the configs directory (it never goes down)
+            highest = _scan_config_numbers(config_dir)
+            self._db.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('experiment', ?)", (highest,))
+            self._db.execute("UPDATE counters SET value = MAX(value, ?) WHERE name = 'experiment'", (highest,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def peek_experiment_number(self) -> int:
+        """The number next_experiment_number() would hand out now, without reserving it."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM counters WHERE name = 'experiment'").fetchone()
+        return row[0] + 1
+
+    def next_experiment_number(self) -> int:
+        """Reserve and return the next experiment number (atomic across processes)."""
+        # UPDATE ... RETURNING needs SQLite 3.35; Raspberry Pi OS Bullseye ships 3.34.
+        # BEGIN IMMEDIATE takes the write lock first, so no other process can
+        # increment between our UPDATE and SELECT.
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE counters SET value = value + 1 WHERE name = 'experiment'")
+                row = self._db.execute("SELECT value FROM counters WHERE name = 'experiment'").fetchone()
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+        return row[0]
+
+    def start_experiment(self, name: str, settings: dict, config_path: Optional[str] = None,
+                         log_path: Optional[str] = None, readings_path: Optional[str] = None,
+                         transcript_path: Optional[str] = None, started: Optional[float] = None) -> int:
+        """Record a new run; returns its id for the other calls."""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO experiments (name, config_path, settings, started, state, log_path, "
+                "readings_path, transcript_path) VALUES (?, ?, ?, ?, 'running', ?, ?, ?)",
+                (name, config_path, json.dumps(settings), started or time.time(),
+                 log_path, readings_path, transcript_path))
+        return cursor.lastrowid
+
+    def finish_experiment(self, experiment_id: int, state: str, error: Optional[str] = None,
+                          stopped: Optional[float] = None):
+        with self._lock:
+            self._db.execute("UPDATE experiments SET state = ?, error = ?, stopped = ? WHERE id = ?",
+                             (state, error, stopped or time.time(), experiment_id))
+
+    def resume_experiment(self, experiment_id: int) -> bool:
+        """Mark an interrupted run as running again; False if it is not in the index."""
+        with self._lock:
+            cursor = self._db.execute("UPDATE experiments SET state = 'running', error = NULL, stopped = NULL "
+                                      "WHERE id = ?", (experiment_id,))
+        return cursor.rowcount > 0
+
+    def set_transcript(self, experiment_id: int, transcript_path: str):
+        with self._lock:
+            self._db.execute("UPDATE experiments SET transcript_path = ? WHERE id = ?",
+                             (transcript_path, experiment_id))
+
+    def start_step(self, experiment_id: int, step: int, setpoint: float, started: Optional[float] = None):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO steps (experiment_id, step, setpoint, started, outcome) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (experiment_id, step, setpoint, started or time.time(), STEP_RUNNING))
+
+    def step_stable(self, experiment_id: int, step: int, stable_at: Optional[float] = None):
+        """Record when a step first became stable."""
+        with self._lock:
+            self._db.execute("UPDATE steps SET stable_at = ? WHERE experiment_id = ? AND step = ? "
+                             "AND stable_at IS NULL",
+                             (stable_at or time.time(), experiment_id, step))
+
+    def finish_step(self, experiment_id: int, step: int, outcome: str, finished: Optional[float] = None):
+        with self._lock:
+            self._db.execute("UPDATE steps SET outcome = ?, finished = ? WHERE experiment_id = ? AND step = ?",
+                             (outcome, finished or time.time(), experiment_id, step))
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        """Most recent runs first."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM experiments ORDER BY started DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def steps(self, experiment_id: int) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM steps WHERE experiment_id = ? ORDER BY step",
+                                    (experiment_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_runs(self, setpoint: Optional[float] = None, since: Optional[float] = None,
+                  until: Optional[float] = None, tolerance: float = 0.005,
+                  stable_only: bool = True) -> List[dict]:
+        """
+        Find runs by set-point and time.
+
+        Args:
+            setpoint: Only runs with a step at this set-point (±tolerance)
+            since, until: Epoch range for the step start (or the run start
+                when no set-point is given)
+            tolerance: Set-point match tolerance in °C
+            stable_only: With a set-point, only steps that became stable
+
+        Returns:
+            list: Runs (experiment columns), each with the matching ``steps``
+        """
+        since = since if since is not None else 0.0
+        until = until if until is not None else float("inf")
+        with self._lock:
+            if setpoint is None:
+                rows = self._db.execute("SELECT * FROM experiments WHERE started BETWEEN ? AND ? "
+                                        "ORDER BY started", (since, until)).fetchall()
+                return [dict(row, steps=[]) for row in rows]
+
+            query = ("SELECT e.*, s.step, s.setpoint, s.started AS step_started, s.stable_at, "
+                     "s.finished AS step_finished, s.outcome FROM steps s "
+                     "JOIN experiments e ON e.id = s.experiment_id "
+                     "WHERE s.setpoint BETWEEN ? AND ? AND s.started BETWEEN ? AND ?")
+            if stable_only:
+                query += " AND s.stable_at IS NOT NULL"
+            rows = self._db.execute(query + " ORDER BY s.started",
+                                    (setpoint - tolerance, setpoint + tolerance, since, until)).fetchall()
+
+        runs = {}
+        for row in rows:
+            row = dict(row)
+            step = {key: row.pop(key) for key in ("step", "setpoint", "step_started", "stable_at",
+                                                  "step_finished", "outcome")}
+            runs.setdefault(row["id"], dict(row, steps=[]))["steps"].append(step)
+        return list(runs.values())
+
+
+def _parse_date(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    return datetime.fromisoformat(text).timestamp()
+
+
+def _format_time(epoch: Optional[float]) -> str:
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M") if epoch else "-"
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the experiment index")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs",
+                                                     DEFAULT_DB_NAME),
+                        help="Index database (default: logs/experiments.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="Show the most recent runs")
+    list_parser.add_argument("--limit", type=int, default=20)
+    runs_parser = subparsers.add_parser("runs", help="Find runs by set-point and date")
+    runs_parser.add_argument("--setpoint", type=float, help="Set-point in °C")
+    runs_parser.add_argument("--since", help="Start date (YYYY-MM-DD[ HH:MM])")
+    runs_parser.add_argument("--until", help="End date (YYYY-MM-DD[ HH:MM])")
+    runs_parser.add_argument("--all-steps", action="store_true",
+                             help="Include steps that never became stable")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No experiment index at {args.db}")
+        return
+    index = ExperimentIndex(args.db)
+    if args.command == "list":
+        runs = index.recent(args.limit)
+    else:
+        runs = index.find_runs(args.setpoint, _parse_date(args.since), _parse_date(args.until),
+                               stable_only=not args.all_steps)
+
+    for run in runs:
+        print(f"{run['id']:>6}  {run['name']:<24} {_format_time(run['started'])}  "
+              f"{run['state']:<10} {run['log_path'] or ''}")
+        for step in run.get("steps", []):
+            stable = _format_time(step["stable_at"]) if step["stable_at"] else "never stable"
+            print(f"        step {step['step']}: {step['setpoint']:.2f}°C, {step['outcome']}, stable {stable}")
+    print(f"{len(runs)} runs")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
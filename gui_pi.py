@@ -1,18 +1,35 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
+from tkinter import ttk, messagebox, scrolledtext
 import os
-import time
-import threading
-import configparser
-import csv
 from datetime import datetime
-import serial
 from typing import List, Optional
-import serial.tools.list_ports
+from engine import ExperimentEngine
+from experiment_index import ExperimentIndex, DEFAULT_DB_NAME
+from ui_queue import UiUpdateQueue
+from scrollback import MessageLogFile
+from checkpoint import describe_checkpoint
+from plot_widget import TemperaturePlot
 import platform
 
+# Interval at which queued log lines and display values are applied to Tk
+UI_REFRESH_MS = 200
+
+# Interval at which a running port probe is checked for completion
+PORT_PROBE_POLL_MS = 100
+
+# Log widget scrollback: lines kept, lines trimmed at once, lines per "Load Older" page
+LOG_SCROLLBACK_LINES = 2000
+LOG_TRIM_CHUNK = 500
+LOG_PAGE_LINES = 500
+
 class MainWindow:
-    def __init__(self, root):
+    def __init__(self, root, base_dir: Optional[str] = None, watch_ports: bool = True):
+        """
+        Args:
+            root: Tk root window
+            base_dir: Directory holding configs/ and logs/ (default: next to this script)
+            watch_ports: Re-probe the serial ports whenever an adapter is plugged in
+        """
         self.root = root
         self.root.title("Thermal Bath Controller")
         
@@ -31,21 +48,44 @@ class MainWindow:
             self.root.minsize(800, 600)
         
         # State variables
-        self.running = False
-        self.paused = False
-        self.experiment_thread = None
         self.setpoints = []
-        self.log_data = []
-        self.serial_connection = None
-        self.current_setpoint_index = 0
+        self.log_flush_interval = 5.0
+        self.log_fsync_interval = 30.0
+        self.record_transcript = True
+        self.metrics_enabled = True
+        self.metrics_port = 0
+        self.ui_updates = UiUpdateQueue()
         
         # Create directories if they don't exist
-        script_dir = os.path.dirname(os.path.abspath(__file__))
+        script_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
         self.config_dir = os.path.join(script_dir, "configs")
         self.log_dir = os.path.join(script_dir, "logs")
         os.makedirs(self.config_dir, exist_ok=True)
         os.makedirs(self.log_dir, exist_ok=True)
         
+        # Full history of the log widget, which only keeps a bounded scrollback
+        session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.message_log = MessageLogFile(os.path.join(self.log_dir, f"messages_{session_timestamp}.log"))
+        self._log_view_start = 0    # message_log line shown at the top of the widget
+        self._log_loaded_lines = 0  # older lines paged back in by the user
+        
+        # Index of all runs; also hands out experiment numbers
+        self.experiment_index = ExperimentIndex(os.path.join(self.log_dir, DEFAULT_DB_NAME),
+                                                config_dir=self.config_dir)
+        
+        # The experiment runs in the engine's thread and reports back through the update queue
+        self.engine = ExperimentEngine(log_dir=self.log_dir,
+                                       hold_minutes=True,
+                                       on_message=self.log_message,
+                                       on_value=lambda name, value: self.ui_updates.post_value(f"{name}_var", value),
+                                       on_reading=self.ui_updates.post_reading,
+                                       on_finished=self.ui_updates.post_finished,
+                                       index=self.experiment_index)
+        
+        # Finds the bath by probing the serial ports; created on first use (see _get_port_discovery)
+        self.port_discovery = None
+        self._found_baths = set()
+        
         # Get next experiment number
         self.experiment_number = self._get_next_experiment_number()
         
@@ -54,6 +94,16 @@ class MainWindow:
         
         # Update experiment name
         self._update_experiment_name()
+        
+        # Start applying queued GUI updates
+        self.root.after(UI_REFRESH_MS, self._apply_ui_updates)
+        
+        # Report start-up cost once the window is up, then offer to pick up
+        # a run that was interrupted by a crash or power cut
+        self.root.after(0, self._report_time_to_window)
+        self.root.after(0, self._offer_resume)
+        if watch_ports:
+            self.root.after(0, self._start_port_watch)
             
     def _create_ui(self):
         """Create the user interface."""
@@ -122,6 +172,12 @@ class MainWindow:
         self.timeout_var = tk.IntVar(value=2)
         ttk.Entry(serial_frame, textvariable=self.timeout_var, width=10).grid(row=1, column=1, sticky=tk.W, padx=5)
         
+        # Ad-hoc command to the bath, sent between polls while an experiment runs
+        ttk.Label(serial_frame, text="Command:").grid(row=1, column=2, sticky=tk.W, padx=5)
+        self.command_var = tk.StringVar()
+        ttk.Entry(serial_frame, textvariable=self.command_var, width=10).grid(row=1, column=3, sticky=tk.W, padx=5)
+        ttk.Button(serial_frame, text="Send", command=self.send_bath_command).grid(row=1, column=4, sticky=tk.W, padx=5)
+        
         # Set temperature frame
         temp_frame = ttk.Frame(left_frame)
         temp_frame.pack(fill=tk.X, pady=5)
@@ -159,6 +215,18 @@ class MainWindow:
         self.min_readings_var = tk.IntVar(value=10)
         ttk.Entry(stability_frame, textvariable=self.min_readings_var, width=entry_width).grid(row=2, column=1, sticky=tk.W, padx=5)
         
+        # Adaptive sampling: dense while moving, backing off during stable holds
+        self.adaptive_sampling_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(stability_frame, text="Adaptive Interval", variable=self.adaptive_sampling_var).grid(row=2, column=2, columnspan=2, sticky=tk.W, padx=5)
+        
+        ttk.Label(stability_frame, text="Min Interval (s):").grid(row=3, column=0, sticky=tk.W, padx=5)
+        self.min_interval_var = tk.DoubleVar(value=1.0)
+        ttk.Entry(stability_frame, textvariable=self.min_interval_var, width=entry_width).grid(row=3, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(stability_frame, text="Max Interval (s):").grid(row=3, column=2, sticky=tk.W, padx=5)
+        self.max_interval_var = tk.DoubleVar(value=60.0)
+        ttk.Entry(stability_frame, textvariable=self.max_interval_var, width=entry_width).grid(row=3, column=3, sticky=tk.W, padx=5)
+        
         # Right column - Setpoints and Status
         right_frame = ttk.Frame(middle_frame)
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5, 0))
@@ -200,13 +268,24 @@ class MainWindow:
         clear_btn.pack(fill=tk.X, pady=2)
         
         # Bottom section - Log and status
-        bottom_frame = ttk.LabelFrame(main_frame, text="Log", padding="5")
-        bottom_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        bottom_frame = ttk.Frame(notebook, padding="5")
+        notebook.add(bottom_frame, text="Log")
+        
+        # Live plot of actual vs target temperature
+        plot_frame = ttk.Frame(notebook, padding="5")
+        notebook.add(plot_frame, text="Plot")
+        self.temperature_plot = TemperaturePlot(plot_frame, height=150)
         
         # Status text
         status_scrollbar = ttk.Scrollbar(bottom_frame)
         status_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
+        # Page older messages back in from the on-disk log
+        ttk.Button(bottom_frame, text="Load Older", command=self.load_older_log).pack(side=tk.TOP, anchor=tk.E, pady=(0, 5))
+        
         self.status_text = scrolledtext.ScrolledText(bottom_frame, wrap=tk.WORD, height=8 if self.is_raspberry_pi else 10)
         self.status_text.pack(fill=tk.BOTH, expand=True)
         self.status_text.config(state=tk.DISABLED)
@@ -223,22 +302,15 @@ class MainWindow:
         ttk.Label(status_bar, text="   Current Step:").pack(side=tk.LEFT, padx=(10, 5))
         self.current_step_var = tk.StringVar(value="--")
         ttk.Label(status_bar, textvariable=self.current_step_var, font=("Arial", 9 if self.is_raspberry_pi else 10, "bold")).pack(side=tk.LEFT)
+        
+        # Projected time until the current step is stable
+        ttk.Label(status_bar, text="   ETA:").pack(side=tk.LEFT, padx=(10, 5))
+        self.settle_eta_var = tk.StringVar(value="--")
+        ttk.Label(status_bar, textvariable=self.settle_eta_var, font=("Arial", 9 if self.is_raspberry_pi else 10, "bold")).pack(side=tk.LEFT)
 
     def _get_next_experiment_number(self) -> int:
-        """Get the next experiment number by checking existing config files."""
-        experiment_numbers = []
-        if os.path.exists(self.config_dir):
-            for filename in os.listdir(self.config_dir):
-                if filename.startswith("experiment_") and filename.endswith(".ini"):
-                    try:
-                        num = int(filename.split("_")[1].split(".")[0])
-                        experiment_numbers.append(num)
-                    except (IndexError, ValueError):
-                        continue
-        
-        if not experiment_numbers:
-            return 1
-        return max(experiment_numbers) + 1
+        """Next experiment number from the experiment index (shown only; reserved on start)."""
+        return self.experiment_index.peek_experiment_number()
     
     def _update_experiment_name(self):
         """Update the experiment name field with the default name."""
@@ -249,14 +321,70 @@ class MainWindow:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         full_message = f"[{timestamp}] {message}\n"
         
-        self.status_text.config(state=tk.NORMAL)
-        self.status_text.insert(tk.END, full_message)
-        self.status_text.see(tk.END)
-        self.status_text.config(state=tk.DISABLED)
+        # Safe from any thread: the Tk main loop inserts it on the next refresh
+        self.ui_updates.post_log(full_message)
         
         # Also print to console
         print(full_message.strip())
     
+    def _apply_ui_updates(self):
+        """Apply queued log lines and display values (runs on the Tk main loop)."""
+        self._flush_ui_updates()
+        self.root.after(UI_REFRESH_MS, self._apply_ui_updates)
+    
+    def _flush_ui_updates(self):
+        """Apply everything queued so far to the widgets and the on-disk log."""
+        lines, values = self.ui_updates.drain()
+        
+        if lines:
+            text = "".join(lines)
+            self.message_log.append(text)
+            self.status_text.config(state=tk.NORMAL)
+            self.status_text.insert(tk.END, text)
+            self._trim_scrollback()
+            self.status_text.see(tk.END)
+            self.status_text.config(state=tk.DISABLED)
+        
+        for name, value in values.items():
+            getattr(self, name).set(value)
+        
+        for t, actual, target in self.ui_updates.drain_readings():
+            self.temperature_plot.add_reading(t, actual, target)
+        self.temperature_plot.redraw_if_needed()
+        
+        # After the run's last log lines, so an error dialog follows them
+        if self.ui_updates.take_finished():
+            self._experiment_completed()
+    
+    def _trim_scrollback(self):
+        """Drop the oldest log lines once the widget exceeds its scrollback by a chunk."""
+        line_count = int(self.status_text.index("end-1c").split(".")[0]) - 1
+        limit = LOG_SCROLLBACK_LINES + self._log_loaded_lines
+        if line_count <= limit + LOG_TRIM_CHUNK:
+            return
+        
+        remove = line_count - limit
+        self.status_text.delete("1.0", f"{remove + 1}.0")
+        self._log_view_start += remove
+        self._log_loaded_lines = max(0, self._log_loaded_lines - remove)
+    
+    def load_older_log(self):
+        """Insert the previous page of messages from the on-disk log at the top."""
+        if self._log_view_start <= 0:
+            messagebox.showinfo("Log", "No older messages.")
+            return
+        
+        start = max(0, self._log_view_start - LOG_PAGE_LINES)
+        older = self.message_log.read_lines(start, self._log_view_start)
+        
+        self.status_text.config(state=tk.NORMAL)
+        self.status_text.insert("1.0", "".join(older))
+        self.status_text.config(state=tk.DISABLED)
+        self.status_text.see("1.0")
+        
+        self._log_view_start = start
+        self._log_loaded_lines += len(older)
+    
     def add_setpoint(self):
         """Add a temperature setpoint to the list."""
         try:
@@ -362,8 +490,15 @@ class MainWindow:
         for i, setpoint in enumerate(self.setpoints):
             self.setpoints_tree.insert('', 'end', values=(i+1, f"{setpoint:.2f}"))
     
-    def create_config_file(self) -> str:
-        """Create a configuration file for the current experiment settings."""
+    def create_config_file(self) -> Optional[str]:
+        """
+        Create a configuration file for the current experiment settings.
+
+        Returns:
+            str: Path of the config file, or None if it would overwrite the
+            existing config of the experiment number just reserved
+        """
+        import configparser
         config = configparser.ConfigParser()
         
         # Communication settings
@@ -384,7 +519,23 @@ class MainWindow:
             "stability_window": str(self.stability_window_var.get()),
             "reading_interval": str(self.reading_interval_var.get()),
             "timeout": str(self.timeout_duration_var.get()),
-            "min_readings": str(self.min_readings_var.get())
+            "min_readings": str(self.min_readings_var.get()),
+            "adaptive_sampling": str(self.adaptive_sampling_var.get()),
+            "min_interval": str(self.min_interval_var.get()),
+            "max_interval": str(self.max_interval_var.get())
+        }
+        
+        # Log file persistence settings
+        config["Logging"] = {
+            "flush_interval": str(self.log_flush_interval),
+            "fsync_interval": str(self.log_fsync_interval),
+            "transcript": str(self.record_transcript).lower()
+        }
+        
+        # Metrics settings
+        config["Metrics"] = {
+            "enabled": str(self.metrics_enabled).lower(),
+            "port": str(self.metrics_port)
         }
         
         # Save to file
@@ -395,95 +546,172 @@ class MainWindow:
             
         config_path = os.path.join(self.config_dir, f"{experiment_name}.ini")
         
+        # A numbered config that already exists belongs to an earlier run
+        if experiment_name == f"experiment_{self.experiment_number}" and os.path.exists(config_path):
+            self.log_message(f"Error: {config_path} already exists, not overwriting it")
+            messagebox.showerror("Config Exists",
+                                 f"{os.path.basename(config_path)} already exists. Choose another experiment name.")
+            return None
+        
         with open(config_path, 'w') as configfile:
             config.write(configfile)
             
         self.log_message(f"Created config file: {config_path}")
         return config_path
     
-    def save_log_data(self):
-        """Save the temperature log data to a CSV file."""
-        if not self.log_data:
-            return
-            
-        experiment_name = self.experiment_name_var.get()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_path = os.path.join(self.log_dir, f"{experiment_name}_{timestamp}.csv")
-        
-        with open(log_path, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["Timestamp", "Step", "Target Temperature", "Actual Temperature", "Status"])
-            writer.writerows(self.log_data)
-            
-        self.log_message(f"Saved log data to: {log_path}")
+    def _collect_settings(self) -> dict:
+        """Gather the current settings in the layout of main.get_settings."""
+        return {
+            "port": self.port_var.get(),
+            "baudrate": self.baudrate_var.get(),
+            "timeout": self.timeout_var.get(),
+            "setpoints": list(self.setpoints),
+            "hold_time": self.hold_time_var.get() * 60,  # Convert minutes to seconds
+            "stability_window": self.stability_window_var.get(),
+            "reading_interval": self.reading_interval_var.get(),
+            "timeout_duration": self.timeout_duration_var.get(),
+            "min_readings": self.min_readings_var.get(),
+            "adaptive_sampling": self.adaptive_sampling_var.get(),
+            "min_interval": self.min_interval_var.get(),
+            "max_interval": self.max_interval_var.get(),
+            "flush_interval": self.log_flush_interval,
+            "fsync_interval": self.log_fsync_interval,
+            "transcript": self.record_transcript,
+            "metrics_enabled": self.metrics_enabled,
+            "metrics_port": self.metrics_port,
+        }
     
     def toggle_pause_resume(self):
         """Toggle between pause and resume states."""
-        if not self.running:
+        if not self.engine.running:
             return
         
-        if self.paused:
+        if self.engine.paused:
             # Resume experiment
-            self.paused = False
+            self.engine.resume()
             self.pause_resume_button.config(text="Pause")
-            self.log_message("Experiment resumed")
         else:
             # Pause experiment
-            self.paused = True
+            self.engine.pause()
             self.pause_resume_button.config(text="Resume")
-            self.log_message("Experiment paused")
     
     def start_experiment(self):
         """Start the experiment with current settings."""
-        if self.running:
+        if self.engine.running:
             return
             
         # Check if there are any setpoints
         if not self.setpoints:
             messagebox.showerror("No Setpoints", "Please add at least one temperature setpoint.")
             return
-            
+        
+        # A new run archives the checkpoint of an interrupted one, so offer to resume that first
+        checkpoint = self.engine.pending_checkpoint()
+        if checkpoint is not None:
+            try:
+                description = describe_checkpoint(checkpoint)
+            except (KeyError, IndexError, TypeError):
+                description = None
+            if description is not None:
+                answer = messagebox.askyesnocancel(
+                    "Interrupted Experiment",
+                    f"An interrupted experiment can still be resumed:\n\n{description}\n\n"
+                    "Resume it instead? Choose No to start the new experiment; "
+                    "the interrupted one's checkpoint is then archived.")
+                if answer is None:
+                    return
+                if answer:
+                    self._resume_checkpoint(checkpoint)
+                    return
+            
+        # Reserve the number only now, so sessions that never start a run leave no gaps;
+        # another GUI or the daemon may have taken the number shown meanwhile
+        if self.experiment_name_var.get() in ("", f"experiment_{self.experiment_number}"):
+            self.experiment_number = self.experiment_index.next_experiment_number()
+            self._update_experiment_name()
+        
         # Create config file
         config_path = self.create_config_file()
+        if config_path is None:
+            return
+        
+        self.temperature_plot.clear()
         
-        # Start experiment in a new thread
-        self.running = True
-        self.paused = False
-        self.current_setpoint_index = 0
+        # Start experiment in the engine's thread
+        if not self.engine.start(self._collect_settings(), self.experiment_name_var.get(), config_path):
+            return
         self.start_button.config(state=tk.DISABLED)
         self.pause_resume_button.config(state=tk.NORMAL, text="Pause")
         self.stop_button.config(state=tk.NORMAL)  # Enable the stop button
+    
+    def _report_time_to_window(self):
+        """Log the time from the launcher start until the window is shown."""
+        from launcher import record_time_to_window
+        self.root.update_idletasks()
+        elapsed = record_time_to_window(self.log_dir)
+        if elapsed is not None:
+            self.log_message(f"Time to window: {elapsed:.2f} s")
+    
+    def _offer_resume(self):
+        """Ask whether to resume the run left behind in the checkpoint, if there is one."""
+        checkpoint = self.engine.pending_checkpoint()
+        if checkpoint is None or self.engine.running:
+            return
+        try:
+            description = describe_checkpoint(checkpoint)
+        except (KeyError, IndexError, TypeError) as e:
+            self.log_message(f"Ignoring invalid checkpoint: {str(e)}")
+            self.engine.discard_checkpoint({})
+            return
         
-        self.experiment_thread = threading.Thread(target=self._run_experiment, daemon=True)
-        self.experiment_thread.start()
+        if not messagebox.askyesno("Resume Experiment",
+                                   f"An experiment was interrupted:\n\n{description}\n\n"
+                                   "Resume it at this step? Completed steps are skipped."):
+            self.engine.discard_checkpoint(checkpoint)
+            self.log_message(f"Discarded interrupted experiment {checkpoint['experiment_name']}")
+            return
+        self._resume_checkpoint(checkpoint)
+    
+    def _resume_checkpoint(self, checkpoint: dict):
+        """Resume the run saved in ``checkpoint``."""
+        # Show the resumed run; the engine uses the settings saved in the checkpoint
+        self.experiment_name_var.set(checkpoint["experiment_name"])
+        self.setpoints = list(checkpoint["settings"]["setpoints"])
+        self._update_setpoints_tree()
+        self.temperature_plot.clear()
         
-        self.log_message("Experiment started")
+        if not self.engine.start(checkpoint["settings"], checkpoint["experiment_name"],
+                                 checkpoint.get("config_path"), resume=checkpoint):
+            return
+        self.start_button.config(state=tk.DISABLED)
+        self.pause_resume_button.config(state=tk.NORMAL, text="Pause")
+        self.stop_button.config(state=tk.NORMAL)
     
     def reset_experiment(self):
         """Reset the experiment settings."""
-        if self.running:
+        if self.engine.running:
             messagebox.showinfo("Experiment Running", "Please stop the experiment before resetting.")
             return
             
-        # Save log data if any exists
-        if self.log_data:
-            self.save_log_data()
-            
-        # Increment experiment number and reset settings
+        # Show the next free experiment number and reset settings
         self.experiment_number = self._get_next_experiment_number()
         self._update_experiment_name()
         
         self.setpoints = []
         self._update_setpoints_tree()
-        self.log_data = []
-        self.current_setpoint_index = 0
         
-        # Reset status display
+        # Reset status display (pending messages still go to the on-disk log)
+        self._flush_ui_updates()
         self.current_temp_var.set("--")
         self.current_step_var.set("--")
+        self.settle_eta_var.set("--")
         self.status_text.config(state=tk.NORMAL)
         self.status_text.delete(1.0, tk.END)
         self.status_text.config(state=tk.DISABLED)
+        self._log_view_start = self.message_log.line_count
+        self._log_loaded_lines = 0
+        self.ui_updates.drain_readings()
+        self.temperature_plot.clear()
         
         # Enable start button and disable others
         self.start_button.config(state=tk.NORMAL)
@@ -492,223 +720,46 @@ class MainWindow:
         
         self.log_message("Experiment reset")
     
-    def _run_experiment(self):
-        """Run the experiment in a separate thread."""
-        try:
-            # Initialize the serial connection
-            try:
-                self.log_message(f"Connecting to port {self.port_var.get()}...")
-                self.serial_connection = serial.Serial(
-                    port=self.port_var.get(),
-                    baudrate=self.baudrate_var.get(),
-                    bytesize=serial.EIGHTBITS,
-                    stopbits=serial.STOPBITS_ONE,
-                    parity=serial.PARITY_NONE,
-                    timeout=self.timeout_var.get(),
-                    rtscts=True,
-                    xonxoff=False,
-                    dsrdtr=False
-                )
-                self.log_message("Serial connection established")
-            except Exception as e:
-                self.log_message(f"Error connecting to serial port: {str(e)}")
-                self.root.after(0, lambda: messagebox.showerror("Connection Error", 
-                                                                f"Could not connect to port {self.port_var.get()}: {str(e)}"))
-                self.root.after(0, self._experiment_completed)
-                return
-            
-            # Get stability parameters
-            hold_time = self.hold_time_var.get() * 60  # Convert minutes to seconds
-            stability_window = self.stability_window_var.get()
-            reading_interval = self.reading_interval_var.get()
-            timeout_duration = self.timeout_duration_var.get()
-            min_readings = self.min_readings_var.get()
-            
-            # Read initial temperature
-            current_temp = self._read_temperature()
-            if current_temp is not None:
-                self.log_message(f"Initial temperature: {current_temp}°C")
-                self.root.after(0, lambda t=current_temp: self.current_temp_var.set(f"{t:.2f}°C"))
-            
-            # Process each setpoint
-            while self.current_setpoint_index < len(self.setpoints) and self.running:
-                setpoint = self.setpoints[self.current_setpoint_index]
-                step_number = self.current_setpoint_index + 1
-                
-                # Update current step indicator
-                self.root.after(0, lambda s=step_number, t=setpoint: 
-                              self.current_step_var.set(f"Step {s}: {t:.2f}°C"))
-                
-                # Handle pause state
-                while self.paused and self.running:
-                    time.sleep(0.5)
-                
-                # If we're no longer running (stopped during pause), exit
-                if not self.running:
-                    break
-                    
-                self.log_message(f"Step {step_number}: Setting temperature to {setpoint}°C")
-                self._set_temperature(setpoint)
-                
-                # Initialize tracking variables
-                start_time = time.time()
-                stability_start_time = None
-                temperature_readings = []
-                
-                # Wait for temperature to stabilize
-                while self.running:
-                    # Handle pause state
-                    while self.paused and self.running:
-                        time.sleep(0.5)
-                    
-                    # If we're no longer running (stopped during pause), exit
-                    if not self.running:
-                        break
-                        
-                    current_time = time.time()
-                    elapsed_time = current_time - start_time
-                    
-                    if elapsed_time > timeout_duration:
-                        self.log_message(f"Timeout reached while waiting for stability at {setpoint}°C")
-                        break
-                        
-                    # Read current temperature
-                    temp = self._read_temperature()
-                    if temp is not None:
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        status = "Waiting for stability"
-                        self.log_data.append([timestamp, step_number, setpoint, temp, status])
-                        temperature_readings.append(temp)
-                        self.root.after(0, lambda t=temp: self.current_temp_var.set(f"{t:.2f}°C"))
-                        
-                    # Check if temperature is stable
-                    is_stable = self._is_temperature_stable(temperature_readings, 
-                                                           setpoint, 
-                                                           stability_window, 
-                                                           min_readings)
-                                                           
-                    if is_stable:
-                        if stability_start_time is None:
-                            stability_start_time = current_time
-                            hold_time_min = hold_time / 60  # Convert seconds back to minutes for display
-                            self.log_message(f"Temperature stable at {setpoint}°C, holding for {hold_time_min} minutes")
-                        
-                        # Update status in log data
-                        remaining = hold_time - (current_time - stability_start_time)
-                        if remaining > 0:
-                            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            remaining_min = remaining / 60  # Convert to minutes
-                            status = f"Stable - Holding ({remaining_min:.1f}min remaining)"
-                            if temp is not None:
-                                self.log_data.append([timestamp, step_number, setpoint, temp, status])
-                        
-                        # Check if we've held the temperature long enough
-                        if current_time - stability_start_time >= hold_time:
-                            self.log_message(f"Completed hold time for {setpoint}°C")
-                            break
-                    else:
-                        # Reset stability timer if temperature becomes unstable
-                        stability_start_time = None
-                        
-                    time.sleep(reading_interval)
-                
-                # If we're no longer running, exit the loop
-                if not self.running:
-                    break
-                    
-                # Move to next setpoint
-                self.current_setpoint_index += 1
-            
-            if self.current_setpoint_index >= len(self.setpoints):
-                self.log_message("All steps completed!")
-            else:
-                self.log_message("Experiment stopped before completion")
-            
-        except Exception as e:
-            self.log_message(f"Error during experiment: {str(e)}")
-        finally:
-            # Close the serial connection
-            if self.serial_connection and self.serial_connection.is_open:
-                self.serial_connection.close()
-                self.log_message("Serial connection closed")
-                
-            # Save the log data
-            self.save_log_data()
-                
-            # Reset the UI
-            self.root.after(0, self._experiment_completed)
-    
     def _experiment_completed(self):
         """Update UI after experiment completion."""
-        self.running = False
-        self.paused = False
         self.start_button.config(state=tk.NORMAL)
         self.pause_resume_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.DISABLED)  # Disable the stop button
-        self.current_step_var.set("--")
+        if self.engine.error:
+            messagebox.showerror("Experiment Error", self.engine.error)
     
-    def _read_temperature(self) -> Optional[float]:
-        """Read the current temperature from the bath."""
-        try:
-            self.serial_connection.write(b"t\r")
-            time.sleep(0.5)
-            response = self.serial_connection.read_until().decode('latin-1').strip()
-            
+    def send_bath_command(self):
+        """Send the command from the command field to the bath between polls."""
+        command = self.command_var.get().strip()
+        if not command:
+            return
+        def on_reply(future):
+            if future.cancelled():
+                return
             try:
-                # Try to extract the temperature value from the response
-                print(response)
-                temp = float(response.split(" ")[-2])
-                return temp
-            except ValueError:
-                self.log_message(f"Could not parse temperature: {response}")
-                return None
-                
-        except Exception as e:
-            self.log_message(f"Error reading temperature: {str(e)}")
-            return None
-    
-    def _set_temperature(self, temperature: float) -> bool:
-        """Set the bath temperature setpoint."""
+                self.log_message(f"Reply to '{command}': {future.result()}")
+            except Exception as e:
+                self.log_message(f"Error sending command '{command}': {str(e)}")
+        
         try:
-            command = f"s={temperature}\r"
-            self.serial_connection.write(command.encode())
-            time.sleep(0.5)
-            response = self.serial_connection.read_until().decode('latin-1').strip()
-            return True
-        except Exception as e:
-            self.log_message(f"Error setting temperature: {str(e)}")
-            return False
+            future = self.engine.send_command(command)
+        except RuntimeError as e:
+            self.log_message(f"Error sending command '{command}': {str(e)}")
+            return
+        if future is None:
+            messagebox.showinfo("Not Connected", "Commands can be sent while an experiment is running.")
+            return
+        future.add_done_callback(on_reply)
+        self.log_message(f"Sent command: {command}")
     
-    def _is_temperature_stable(self, temperatures: List[float], 
-                              target: float, 
-                              stability_window: float = 0.05, 
-                              min_readings: int = 10) -> bool:
-        """Check if temperature is stable."""
-        if len(temperatures) < min_readings:
-            return False
-            
-        # Use the last min_readings temperatures
-        recent = temperatures[-min_readings:]
-        
-        # Calculate moving average and standard deviation
-        avg = sum(recent) / len(recent)
-        std = (sum((x - avg) ** 2 for x in recent) / len(recent)) ** 0.5
-        
-        # Check if temperature is close to target and stable
-        is_stable = (std <= stability_window) and (abs(avg - target) <= stability_window)
-        
-        status = f"Current: {recent[-1]:.3f}, Avg: {avg:.3f}, Std: {std:.3f}, Stable: {is_stable}"
-        self.log_message(status)
-        
-        return is_stable
-
     def load_config_file(self):
         """Open a file dialog to load an existing configuration file."""
-        if self.running:
+        if self.engine.running:
             messagebox.showinfo("Experiment Running", "Please stop the current experiment before loading a config file.")
             return
             
         # Ask user to select a config file
+        from tkinter import filedialog
         config_file = filedialog.askopenfilename(
             title="Select Configuration File",
             initialdir=self.config_dir,
@@ -720,6 +771,7 @@ class MainWindow:
             
         try:
             # Load the configuration
+            import configparser
             config = configparser.ConfigParser()
             config.read(config_file)
             
@@ -753,6 +805,20 @@ class MainWindow:
                 self.reading_interval_var.set(config['Stability'].getfloat('reading_interval', 5.0))
                 self.timeout_duration_var.set(config['Stability'].getint('timeout', 3600))
                 self.min_readings_var.set(config['Stability'].getint('min_readings', 10))
+                self.adaptive_sampling_var.set(config['Stability'].getboolean('adaptive_sampling', False))
+                self.min_interval_var.set(config['Stability'].getfloat('min_interval', 1.0))
+                self.max_interval_var.set(config['Stability'].getfloat('max_interval', 60.0))
+            
+            # Load log file persistence settings
+            if 'Logging' in config:
+                self.log_flush_interval = config['Logging'].getfloat('flush_interval', 5.0)
+                self.log_fsync_interval = config['Logging'].getfloat('fsync_interval', 30.0)
+                self.record_transcript = config['Logging'].getboolean('transcript', True)
+            
+            # Load metrics settings
+            if 'Metrics' in config:
+                self.metrics_enabled = config['Metrics'].getboolean('enabled', True)
+                self.metrics_port = config['Metrics'].getint('port', 0)
             
             self.log_message(f"Loaded configuration from: {config_file}")
             
@@ -761,23 +827,78 @@ class MainWindow:
 
     def stop_experiment(self):
         """Stop the experiment completely (not just pause)."""
-        if not self.running:
+        if not self.engine.running:
             return
             
         if messagebox.askyesno("Stop Experiment", "Are you sure you want to stop the experiment? This will end the current experiment."):
-            self.running = False
-            self.log_message("Experiment stopping...")
+            self.engine.stop()
             
             # Disable pause/resume button immediately
             self.pause_resume_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.DISABLED)
 
 
+    def _get_port_discovery(self):
+        """Create the port prober on first use, keeping its import out of start-up."""
+        if self.port_discovery is None:
+            from port_discovery import PortDiscovery
+            self.port_discovery = PortDiscovery()
+        return self.port_discovery
+    
+    def _start_port_watch(self):
+        """Re-probe the serial ports whenever an adapter is plugged in or removed."""
+        self._get_port_discovery().watch(self._on_ports_changed, exclude=self._busy_ports)
+    
     def scan_com_ports(self):
-        """Scan for available COM ports and update the port selection."""
+        """Probe the serial ports for the bath in the background, then let the user pick a port."""
+        try:
+            preferred_baudrate = self.baudrate_var.get()
+        except tk.TclError:
+            preferred_baudrate = None
+        self.log_message("Probing serial ports for the bath...")
+        future = self._get_port_discovery().discover_async(extra_ports=[self.port_var.get()], exclude=self._busy_ports,
+                                                          preferred_baudrate=preferred_baudrate)
+        self.root.after(PORT_PROBE_POLL_MS, lambda: self._check_port_probe(future))
+    
+    def _check_port_probe(self, future):
+        """Show the port selection once the probe started by scan_com_ports has finished."""
+        if not future.done():
+            self.root.after(PORT_PROBE_POLL_MS, lambda: self._check_port_probe(future))
+            return
         try:
-            # Get list of available ports
-            ports = list(serial.tools.list_ports.comports())
+            baths = future.result()
+        except Exception as e:
+            self.log_message(f"Error probing serial ports: {str(e)}")
+            baths = []
+        self._found_baths = {bath.device for bath in baths}
+        self._show_port_dialog(baths)
+    
+    def _busy_ports(self) -> List[str]:
+        """Ports that must not be probed (the one a running experiment is using)."""
+        settings = self.engine.settings
+        return [settings["port"]] if self.engine.running and settings else []
+    
+    def _on_ports_changed(self, baths):
+        """Report baths that appeared or went away (called from the port watcher thread)."""
+        found = {bath.device for bath in baths}
+        for bath in baths:
+            if bath.device not in self._found_baths:
+                self.log_message(f"Bath detected on {bath.device} ({bath.baudrate} baud), use Scan to select it")
+        for device in self._found_baths - found:
+            self.log_message(f"Bath on {device} is no longer available")
+        self._found_baths = found
+    
+    def _show_port_dialog(self, baths):
+        """List the available ports, with the ones that answered as a bath marked and preselected."""
+        try:
+            # Get list of available ports (imported here: only needed when scanning)
+            import serial.tools.list_ports
+            ports = [(port.device, port.description) for port in serial.tools.list_ports.comports()]
+            
+            # Baths on ports the OS does not list (e.g. a typed-in port) are shown as well
+            bath_ports = {bath.device: bath for bath in baths}
+            listed = {device for device, _ in ports}
+            ports += [(bath.device, bath.description) for bath in baths if bath.device not in listed]
             
             if not ports:
                 self.log_message("No COM ports detected.")
@@ -820,24 +941,32 @@ class MainWindow:
             scrollbar.config(command=port_listbox.yview)
             
             # Populate listbox with ports
-            for i, port in enumerate(ports):
-                port_name = port.device
-                description = f"{port_name} - {port.description}"
+            for i, (port_name, port_description) in enumerate(ports):
+                bath = bath_ports.get(port_name)
+                if bath:
+                    description = f"{port_name} - Fluke 7320 bath ({bath.baudrate} baud)"
+                else:
+                    description = f"{port_name} - {port_description}"
                 port_listbox.insert(tk.END, description)
                 
-                # Auto-select based on platform
-                if platform.system() == "Windows" and "COM" in port_name:
+                # Preselect the first bath; if none answered, auto-select based on platform
+                if bath_ports:
+                    if bath and not port_listbox.curselection():
+                        port_listbox.selection_set(i)
+                elif platform.system() == "Windows" and "COM" in port_name:
                     port_listbox.selection_set(i)
-                elif platform.system() != "Windows" and ("USB" in port.description or "Serial" in port.description):
+                elif platform.system() != "Windows" and ("USB" in port_description or "Serial" in port_description):
                     port_listbox.selection_set(i)
             
             # Function to handle port selection
             def select_port():
                 selection = port_listbox.curselection()
                 if selection:
-                    selected_port = ports[selection[0]].device
+                    selected_port = ports[selection[0]][0]
                     self.port_var.set(selected_port)
                     self.log_message(f"Selected port: {selected_port}")
+                    if selected_port in bath_ports:
+                        self.baudrate_var.set(bath_ports[selected_port].baudrate)
                 else:
                     self.log_message("No port selected.")
                 port_window.destroy()
@@ -850,7 +979,7 @@ class MainWindow:
             ttk.Button(button_frame, text="Cancel", command=port_window.destroy).pack(side=tk.RIGHT, padx=10)
             
             # Log the scan
-            self.log_message(f"Found {len(ports)} ports")
+            self.log_message(f"Found {len(ports)} ports, {len(baths)} answering as a bath")
             
             # Center the window on parent
             port_window.update_idletasks()
@@ -0,0 +1,226 @@
+"""
+Fast start-up for the launcher scripts.
+
+``run_thermal_bath_controller.sh`` / ``.bat`` call this with the virtual
+environment's Python. It hashes ``requirements.txt`` together with the state
+of the environment (Python version and the installed distributions) and only
+runs ``pip install`` when that hash differs from the one stored after the
+last successful install, so a normal launch installs nothing. The shell
+launcher checks GitHub for updates (``git pull``) at most once a day, or on
+every launch with ``--update``; other launches do no network access at all.
+It then replaces itself with the GUI.
+
+The launch time is passed to the GUI in THERMAL_BATH_LAUNCH_TIME, and the
+GUI reports the time until its window is shown (see record_time_to_window),
+appending it to ``logs/startup_times.csv`` to track start-up cost:
+
+    python launcher.py [--force-install] [--script gui_pi.py]
+
+``--profile-startup`` prints where the start-up time of a program goes
+instead of launching it: the program's module is imported in a fresh
+interpreter with ``-X importtime`` and the cost is broken down by direct
+import, by package and by the slowest individual modules:
+
+    python launcher.py --profile-startup --script main.py
+
+The GUIs import this module, so everything not needed to report the
+time to window is imported where it is used.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+LAUNCH_TIME_ENV = "THERMAL_BATH_LAUNCH_TIME"
+STAMP_NAME = ".requirements.sha256"
+STARTUP_LOG_NAME = "startup_times.csv"
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _in_venv() -> bool:
+    return sys.prefix != sys.base_prefix
+
+
+def stamp_path() -> str:
+    """Where the hash of the last successful install is kept."""
+    if _in_venv():
+        return os.path.join(sys.prefix, STAMP_NAME)
+    return os.path.join(os.path.expanduser("~"), ".cache", "thermal_bath_controller", STAMP_NAME)
+
+
+def environment_hash(requirements: str) -> str:
+    """Hash of the requirements file, the interpreter and the installed distributions."""
+    import hashlib
+    import sysconfig
+    digest = hashlib.sha256()
+    with open(requirements, 'rb') as f:
+        digest.update(f.read())
+    digest.update(sys.version.encode())
+    digest.update(sys.prefix.encode())
+    for key in ("purelib", "platlib"):
+        site_packages = sysconfig.get_paths()[key]
+        try:
+            # Installed distributions show up as name-version.dist-info directories
+            entries = sorted(name for name in os.listdir(site_packages)
+                             if name.endswith((".dist-info", ".egg-info")))
+        except OSError:
+            entries = []
+        digest.update("\n".join(entries).encode())
+    return digest.hexdigest()
+
+
+def _read_stamp(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def ensure_requirements(requirements: str, force: bool = False) -> bool:
+    """
+    Install the requirements unless nothing changed since the last install.
+
+    Returns:
+        bool: False if an install was needed and failed (e.g. offline)
+    """
+    path = stamp_path()
+    if not force and _read_stamp(path) == environment_hash(requirements):
+        print("Requirements unchanged, skipping package installation")
+        return True
+
+    import subprocess
+    print("Installing required packages...")
+    command = [sys.executable, "-m", "pip", "install", "--disable-pip-version-check", "-r", requirements]
+    if not _in_venv():
+        command.append("--user")
+    if subprocess.call(command) != 0:
+        print("Warning: package installation failed. Continuing with the installed packages.")
+        return False
+
+    # Hash again: the install changed the environment
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(environment_hash(requirements))
+    return True
+
+
+def record_time_to_window(log_dir: str) -> Optional[float]:
+    """
+    Seconds from the launcher start to now (call once the window is shown).
+
+    Appends the measurement to ``log_dir/startup_times.csv``. Returns None
+    when the GUI was not started through the launcher.
+    """
+    launched = os.environ.pop(LAUNCH_TIME_ENV, None)
+    if not launched:
+        return None
+    try:
+        # Shells may format the launch time with a decimal comma
+        elapsed = time.time() - float(launched.replace(",", "."))
+    except ValueError:
+        return None
+    try:
+        path = os.path.join(log_dir, STARTUP_LOG_NAME)
+        new_file = not os.path.exists(path)
+        with open(path, 'a') as f:
+            if new_file:
+                f.write("Timestamp,Seconds\n")
+            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')},{elapsed:.3f}\n")
+    except OSError as e:
+        print(f"Could not record start-up time: {str(e)}")
+    return elapsed
+
+
+def _parse_importtime(output: str) -> List[tuple]:
+    """Turn ``-X importtime`` output into (self_us, cumulative_us, depth, module) rows."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+    return rows
+
+
+def profile_startup(script: str, top: int = 15):
+    """Print the import-time breakdown of ``script`` (imported, not run)."""
+    import subprocess
+    module = os.path.splitext(os.path.basename(script))[0]
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SCRIPT_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    rows = _parse_importtime(result.stderr)
+    if result.returncode != 0 or not rows:
+        print(f"Could not import {module}:\n{result.stderr.strip()[-2000:]}")
+        return
+
+    total = next((cumulative for _, cumulative, depth, name in rows if depth == 0 and name == module), 0)
+    print(f"Start-up profile of {module}: {wall * 1000:.0f} ms interpreter + import, "
+          f"{total / 1000:.1f} ms importing {module}")
+
+    # Direct imports of the program module: the rows at depth 1 that precede it
+    direct = []
+    for self_us, cumulative, depth, name in rows:
+        if depth == 0:
+            if name == module:
+                break
+            direct = []
+        elif depth == 1:
+            direct.append((cumulative, name))
+    print(f"\n{'direct import':<36} {'ms':>8}")
+    for cumulative, name in sorted(direct, reverse=True)[:top]:
+        print(f"{name:<36} {cumulative / 1000:>8.1f}")
+
+    local = {os.path.splitext(name)[0] for name in os.listdir(SCRIPT_DIR) if name.endswith(".py")}
+    packages = {}
+    for self_us, _, _, name in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    project_us = sum(us for package, us in packages.items() if package in local)
+    print(f"\n{'package (self time)':<36} {'ms':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{package + (' *' if package in local else ''):<36} {self_us / 1000:>8.1f}")
+    print(f"{'(* = this project, total)':<36} {project_us / 1000:>8.1f}")
+
+    print(f"\n{'slowest modules (self time)':<36} {'ms':>8}")
+    for self_us, _, _, name in sorted(rows, reverse=True)[:top]:
+        print(f"{name:<36} {self_us / 1000:>8.1f}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Check dependencies and start the controller GUI")
+    parser.add_argument("--force-install", action="store_true", help="Run pip even if nothing changed")
+    parser.add_argument("--script", default="gui_pi.py", help="Program to start (default: gui_pi.py)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print an import-time breakdown of the program instead of starting it")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profile_startup(args.script)
+        return
+
+    # The shell launcher sets the start time itself so venv activation is included
+    os.environ.setdefault(LAUNCH_TIME_ENV, repr(time.time()))
+    ensure_requirements(os.path.join(SCRIPT_DIR, "requirements.txt"), args.force_install)
+
+    script = os.path.join(SCRIPT_DIR, args.script)
+    print(f"Launching {args.script}...")
+    sys.stdout.flush()
+    if os.name == "nt":
+        # exec on Windows starts a new process and returns; keep the console attached instead
+        import subprocess
+        sys.exit(subprocess.call([sys.executable, script]))
+    os.execv(sys.executable, [sys.executable, script])
+
+
+if __name__ == "__main__":
+    main()
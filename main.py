@@ -1,13 +1,23 @@
 import serial
 import time
-import string
-import numpy as np
-import configparser
 import os
+import weakref
 from typing import List, Union, Optional
+import metrics
+from transport import SerialTransport, parse_temperature
+from stability import StabilityTracker
+from settling import SettlingEstimator, format_eta
+from sampling import AdaptiveSampler
+from scheduler import TickScheduler
+from transcript import RecordingSerial
+
+# Transport of each raw port passed to send_command. A new SerialTransport per
+# call would take the poll slice the previous one set as the port timeout.
+_transports = weakref.WeakKeyDictionary()
 
 def load_config(config_file="config.ini"):
     """Load configuration from file."""
+    import configparser
     config = configparser.ConfigParser()
     
     # Check if config file exists
@@ -33,31 +43,45 @@ def initialize_serial(port="COM1", baudrate=2400, timeout=2):
     )
     return ser
 
-def send_command(ser, command):
-    """Send a command and read the response."""
-    ser.write(f"{command}\r".encode())  # Ensure carriage return '\r'
-    time.sleep(0.5)  # Allow time for response
-    response = ser.read_until().decode('latin-1').strip()  # Use 'latin-1' decoding
-    print(f"Response: {response}")  # Debugging output
+def send_command(ser, command, timeout: Optional[float] = None, expect_reply: bool = True):
+    """
+    Send a command and read the response.
+
+    Args:
+        ser: SerialTransport, or an open pyserial Serial (wrapped in a
+            transport the first time and reusing it afterwards)
+        command: Command without the trailing carriage return
+        timeout: Per-command reply deadline in seconds (default: port timeout)
+        expect_reply: False for commands the bath does not answer
+    """
+    if not isinstance(ser, SerialTransport):
+        transport = _transports.get(ser)
+        if transport is None:
+            transport = _transports[ser] = SerialTransport(ser)
+        ser = transport
+    response = ser.query(command, timeout=timeout, expect_reply=expect_reply)
+    print(f"Response: {response} ({ser.last_latency * 1000:.1f} ms)")  # Debugging output
     return response
 
 def set_temperature(ser, temp):
-    """Set the temperature setpoint."""
+    """Set the temperature setpoint (``ser``: SerialTransport or pyserial Serial, see send_command)."""
     command = f"s={temp}"
-    response = send_command(ser, command)
+    # The bath does not answer set commands, so don't wait for a reply
+    response = send_command(ser, command, expect_reply=False)
     return response
     
 def read_temperature(ser) -> float:
-    """Read the current bath temperature and return as float."""
+    """Read the bath temperature as float (``ser``: SerialTransport or pyserial Serial)."""
     command = "t"
     response = send_command(ser, command)
-    try:
-        # Extract numeric value from response
-        temp = float(response)
-        return temp
-    except ValueError:
+    # Extract numeric value from response (e.g. "t: 25.00 C")
+    temp = parse_temperature(response)
+    if temp is None:
+        metrics.PARSE_FAILURES.inc()
         print(f"Could not convert temperature response to float: {response}")
-        return None
+    else:
+        metrics.READINGS.inc()
+    return temp
 
 def command(ser, command):
     response = send_command(ser, command)
@@ -83,16 +107,12 @@ def is_temperature_stable(temperatures: List[float],
         return False
         
     # Use the last min_readings temperatures
-    recent = temperatures[-min_readings:]
-    
-    # Calculate moving average and standard deviation
-    avg = np.mean(recent)
-    std = np.std(recent)
+    tracker = StabilityTracker(min_readings, stability_window)
+    for temp in temperatures[-min_readings:]:
+        tracker.add(temp)
     
-    # Check if temperature is close to target and stable
-    is_stable = (std <= stability_window) and (abs(avg - target) <= stability_window)
-    
-    print(f"Current: {recent[-1]:.3f}, Avg: {avg:.3f}, Std: {std:.3f}, Stable: {is_stable}")
+    is_stable = tracker.is_stable(target)
+    print(tracker.status_line(target))
     return is_stable
 
 def maintain_temperature_setpoints(ser, 
@@ -101,31 +121,46 @@ def maintain_temperature_setpoints(ser,
                                   stability_window: float = 0.05,
                                   reading_interval: float = 5.0,
                                   timeout: int = 3600,
-                                  min_readings: int = 10):
+                                  min_readings: int = 10,
+                                  adaptive_sampling: bool = False,
+                                  min_interval: float = 1.0,
+                                  max_interval: float = 60.0):
     """
     Maintain each temperature setpoint for the specified time after stability is reached.
     
     Args:
-        ser: Serial connection
+        ser: SerialTransport or open pyserial Serial
         setpoints: List of temperature setpoints
         hold_time: Time to maintain each setpoint after stability (seconds)
         stability_window: Maximum allowed standard deviation for stability
         reading_interval: Time between temperature readings (seconds)
         timeout: Maximum time to wait for stability at each setpoint (seconds)
         min_readings: Minimum number of readings for stability check
+        adaptive_sampling: Vary the reading interval with the control phase
+            instead of using reading_interval
+        min_interval: Shortest reading interval in adaptive mode (seconds)
+        max_interval: Longest reading interval in adaptive mode (seconds)
     """
+    sampler = AdaptiveSampler(min_interval, max_interval, stability_window) if adaptive_sampling else None
+    scheduler = TickScheduler()
     for setpoint in setpoints:
         print(f"\nSetting temperature to {setpoint}°C")
         set_temperature(ser, setpoint)
         
         # Initialize tracking variables
-        start_time = time.time()
+        start_time = time.monotonic()
         stability_start_time = None
-        temperature_readings = []
+        temperature_readings = StabilityTracker(min_readings, stability_window)
+        settling = SettlingEstimator(setpoint, stability_window, min_readings)
+        convergence_warned = False
+        settled = False
+        if sampler:
+            sampler.reset()
+        scheduler.start()
         
         # Wait for temperature to stabilize
         while True:
-            current_time = time.time()
+            current_time = time.monotonic()
             elapsed_time = current_time - start_time
             
             if elapsed_time > timeout:
@@ -135,12 +170,23 @@ def maintain_temperature_setpoints(ser,
             # Read current temperature
             temp = read_temperature(ser)
             if temp is not None:
-                temperature_readings.append(temp)
+                temperature_readings.add(temp)
+                settling.add(current_time, temp)
                 
             # Check if temperature is stable
-            if is_temperature_stable(temperature_readings, setpoint, stability_window, min_readings):
+            is_stable = temperature_readings.is_stable(setpoint)
+            estimate = settling.estimate(deadline=start_time + timeout)
+            if temperature_readings.full:
+                print(f"{temperature_readings.status_line(setpoint)}, ETA: {format_eta(estimate)}")
+            if estimate is not None and not estimate.converging and not convergence_warned:
+                print(f"Warning: step at {setpoint}°C is not expected to stabilize: {estimate.reason}")
+                convergence_warned = True
+            if is_stable:
                 if stability_start_time is None:
                     stability_start_time = current_time
+                    if not settled:
+                        metrics.SETTLE_TIME.observe(current_time - start_time)
+                        settled = True
                     print(f"Temperature stable at {setpoint}°C, holding for {hold_time} seconds")
                 
                 # Check if we've held the temperature long enough
@@ -151,13 +197,26 @@ def maintain_temperature_setpoints(ser,
                 # Reset stability timer if temperature becomes unstable
                 stability_start_time = None
                 
-            time.sleep(reading_interval)
+            # Sleep until the next reading is due, measured from when this one was due
+            tick = scheduler.wait(sampler.next_interval(temperature_readings, setpoint) if sampler else reading_interval)
+            metrics.LOOP_JITTER.observe(tick.lateness)
+            if tick.skipped:
+                metrics.SKIPPED_TICKS.inc(tick.skipped)
+                print(f"Reading loop fell behind; skipped {tick.skipped} reading(s)")
 
-def main():
-    """Main function to set up calibration and automate the process."""
-    # Load configuration
-    config = load_config()
+def get_settings(config) -> dict:
+    """
+    Extract communication, setpoint and stability settings from a config.
     
+    Args:
+        config: ConfigParser from load_config (None for all defaults)
+        
+    Returns:
+        dict: port, baudrate, timeout, setpoints, hold_time, stability_window,
+        reading_interval, timeout_duration, min_readings, adaptive_sampling,
+        min_interval, max_interval, flush_interval, fsync_interval, transcript,
+        metrics_enabled and metrics_port
+    """
     # Get communication settings
     port = "COM10"  # Default
     baudrate = 2400
@@ -168,9 +227,6 @@ def main():
         baudrate = config['Communication'].getint('baudrate', baudrate)
         timeout = config['Communication'].getint('timeout', timeout)
     
-    # Initialize serial connection
-    ser = initialize_serial(port=port, baudrate=baudrate, timeout=timeout)
-    
     # Get temperature setpoints
     setpoints = [25.0, 30.0, 35.0]  # Default
     
@@ -190,6 +246,9 @@ def main():
     reading_interval = 5.0
     timeout_duration = 3600
     min_readings = 10
+    adaptive_sampling = False
+    min_interval = 1.0
+    max_interval = 60.0
     
     if config and 'Stability' in config:
         hold_time = config['Stability'].getint('hold_time', hold_time)
@@ -197,6 +256,68 @@ def main():
         reading_interval = config['Stability'].getfloat('reading_interval', reading_interval)
         timeout_duration = config['Stability'].getint('timeout', timeout_duration)
         min_readings = config['Stability'].getint('min_readings', min_readings)
+        adaptive_sampling = config['Stability'].getboolean('adaptive_sampling', adaptive_sampling)
+        min_interval = config['Stability'].getfloat('min_interval', min_interval)
+        max_interval = config['Stability'].getfloat('max_interval', max_interval)
+    
+    # Get log file persistence settings
+    flush_interval = 5.0
+    fsync_interval = 30.0
+    transcript = True
+    
+    if config and 'Logging' in config:
+        flush_interval = config['Logging'].getfloat('flush_interval', flush_interval)
+        fsync_interval = config['Logging'].getfloat('fsync_interval', fsync_interval)
+        transcript = config['Logging'].getboolean('transcript', transcript)
+    
+    # Get metrics settings (port 0 = no endpoint of its own)
+    metrics_enabled = True
+    metrics_port = 0
+    
+    if config and 'Metrics' in config:
+        metrics_enabled = config['Metrics'].getboolean('enabled', metrics_enabled)
+        metrics_port = config['Metrics'].getint('port', metrics_port)
+    
+    return {
+        "port": port,
+        "baudrate": baudrate,
+        "timeout": timeout,
+        "setpoints": setpoints,
+        "hold_time": hold_time,
+        "stability_window": stability_window,
+        "reading_interval": reading_interval,
+        "timeout_duration": timeout_duration,
+        "min_readings": min_readings,
+        "adaptive_sampling": adaptive_sampling,
+        "min_interval": min_interval,
+        "max_interval": max_interval,
+        "flush_interval": flush_interval,
+        "fsync_interval": fsync_interval,
+        "transcript": transcript,
+        "metrics_enabled": metrics_enabled,
+        "metrics_port": metrics_port,
+    }
+
+def main():
+    """Main function to set up calibration and automate the process."""
+    # Load configuration
+    config = load_config()
+    settings = get_settings(config)
+    
+    metrics.REGISTRY.enabled = settings["metrics_enabled"]
+    if settings["metrics_enabled"] and settings["metrics_port"]:
+        if metrics.serve_metrics(settings["metrics_port"]):
+            print(f"Metrics available at http://127.0.0.1:{settings['metrics_port']}/metrics")
+    
+    # Initialize serial connection
+    connection = initialize_serial(port=settings["port"],
+                                   baudrate=settings["baudrate"],
+                                   timeout=settings["timeout"])
+    if settings["transcript"]:
+        os.makedirs("logs", exist_ok=True)
+        connection = RecordingSerial(connection, os.path.join("logs", f"transcript_{time.strftime('%Y%m%d_%H%M%S')}.trc"))
+        print(f"Recording serial transcript to: {connection.path}")
+    ser = SerialTransport(connection)
     
     try:
         # Check initial temperature
@@ -206,15 +327,19 @@ def main():
         # Run through temperature setpoints
         maintain_temperature_setpoints(
             ser, 
-            setpoints, 
-            hold_time=hold_time,
-            stability_window=stability_window,
-            reading_interval=reading_interval,
-            timeout=timeout_duration,
-            min_readings=min_readings
+            settings["setpoints"], 
+            hold_time=settings["hold_time"],
+            stability_window=settings["stability_window"],
+            reading_interval=settings["reading_interval"],
+            timeout=settings["timeout_duration"],
+            min_readings=settings["min_readings"],
+            adaptive_sampling=settings["adaptive_sampling"],
+            min_interval=settings["min_interval"],
+            max_interval=settings["max_interval"]
         )
     
     finally:
+        print(f"Serial round trip: {ser.latency_summary()}")
         ser.close()
         print("Serial connection closed.")
 
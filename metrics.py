@@ -0,0 +1,240 @@
+"""
+Process-wide counters and histograms in Prometheus text format.
+
+Metrics are plain in-memory counters updated on the hot paths (serial round
+trip, temperature parsing, reading loop) at the cost of a flag check, a
+lock and a bisect per observation. Setting ``REGISTRY.enabled = False`` (or
+``[Metrics] enabled = false`` in the config) turns every update into an
+early return.
+
+The daemon serves the metrics at ``/metrics`` on its control API; the GUIs
+and ``main.py`` can serve them on their own port with ``serve_metrics``.
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+JITTER_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SETTLE_BUCKETS = (30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders them for scraping."""
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry: MetricsRegistry):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, registry: MetricsRegistry, bounds: Tuple[float, ...]):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    """Common label handling; unlabelled metrics have a single child."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: MetricsRegistry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Export unlabelled metrics as zero before the first update
+            self.labels()
+        registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for one combination of label values (cache it on hot paths)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (name should end in ``_total``)."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._registry)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def render(self) -> list:
+        lines = self._header()
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float],
+                 labelnames: Sequence[str] = (), registry: MetricsRegistry = REGISTRY):
+        self.buckets = tuple(float(bound) for bound in buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._registry, self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self) -> list:
+        lines = self._header()
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# Serial transport
+SERIAL_ROUND_TRIP = Histogram("bath_serial_round_trip_seconds",
+                              "Serial command round-trip time by command", LATENCY_BUCKETS, ["command"])
+SERIAL_TIMEOUTS = Counter("bath_serial_timeouts_total",
+                          "Serial commands whose reply did not arrive before the deadline", ["command"])
+
+# Control loop
+PARSE_FAILURES = Counter("bath_parse_failures_total", "Temperature replies that could not be parsed")
+READINGS = Counter("bath_readings_total", "Temperature readings taken")
+LOOP_JITTER = Histogram("bath_loop_jitter_seconds",
+                        "Lateness of each reading past its scheduled deadline", JITTER_BUCKETS)
+SKIPPED_TICKS = Counter("bath_loop_skipped_ticks_total",
+                        "Readings skipped because the loop missed their deadline entirely")
+PAUSED_SECONDS = Counter("bath_paused_seconds_total", "Time the experiment spent paused")
+SETTLE_TIME = Histogram("bath_step_settle_seconds",
+                        "Time from sending a setpoint until the temperature was first stable", SETTLE_BUCKETS)
+
+
+_server = None
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """
+    Serve ``/metrics`` from a background thread (once per process).
+
+    Returns:
+        The running ThreadingHTTPServer, or None if it could not be started
+    """
+    global _server
+    if _server is not None:
+        return _server
+    # Imported here so that processes without an endpoint don't pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"Could not start metrics endpoint on {host}:{port}: {str(e)}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,346 @@
+"""
+Asyncio controller running several Fluke 7320 baths from one process.
+
+Each bath is described by a regular experiment config file (the same format
+``main.py`` reads and the GUIs write) and gets its own setpoint list,
+stability parameters and CSV log. All baths share one event loop: serial
+replies are picked up with ``loop.add_reader`` on the port's file descriptor
+and waits between readings are ``asyncio.sleep``, so there is no thread per
+bath and an idle bath costs no CPU.
+
+    python multi_bath.py configs/bath_a.ini configs/bath_b.ini
+
+POSIX only (``add_reader`` needs a selectable serial file descriptor).
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+import main
+from csv_logger import LOG_HEADER
+from stability import StabilityTracker
+from sampling import AdaptiveSampler
+from scheduler import TickScheduler
+from transport import LatencyStats, parse_temperature
+
+
+class AsyncSerialTransport:
+    """
+    Non-blocking command/reply transport driven by the event loop.
+
+    Neither reads nor writes ever block the loop: replies are picked up with
+    ``add_reader``, and a command the port cannot take at once (a bath that
+    deasserts CTS under hardware flow control) is finished with
+    ``add_writer`` within the command's deadline, so one stuck bath never
+    stalls the others.
+    """
+
+    def __init__(self, ser, timeout: float = 2.0, terminator: bytes = b"\n"):
+        """
+        Args:
+            ser: Open pyserial ``Serial`` (switched to non-blocking reads)
+            timeout: Default per-command reply deadline (seconds)
+            terminator: Byte sequence ending a reply
+        """
+        self.ser = ser
+        self.timeout = timeout
+        self.terminator = terminator
+        self.stats = LatencyStats()
+        self.last_latency = None
+        # Whether the bath echoes commands (full duplex mode); None until the first exchange shows it
+        self.echo = None
+        self._buffer = bytearray()
+        self._data_ready = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.ser.timeout = 0
+        self.ser.write_timeout = 0
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.ser.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        data = self.ser.read(self.ser.in_waiting or 1)
+        if data:
+            self._buffer += data
+            if self.terminator in self._buffer:
+                self._data_ready.set()
+
+    async def _readline(self, deadline: float) -> Optional[bytes]:
+        while self.terminator not in self._buffer:
+            self._data_ready.clear()
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._data_ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        line, _, rest = bytes(self._buffer).partition(self.terminator)
+        self._buffer[:] = rest
+        return line
+
+    async def _write(self, data: bytes, deadline: float) -> bool:
+        """Write all of ``data`` without blocking the loop; False if the deadline passed first."""
+        fd = self.ser.fileno()
+        while data:
+            # os.write on the non-blocking descriptor: pyserial's write retries
+            # EAGAIN in a loop even with write_timeout=0
+            try:
+                data = data[os.write(fd, data):]
+            except BlockingIOError:
+                pass
+            if not data:
+                break
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return False
+            writable = self._loop.create_future()
+            self._loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+            try:
+                await asyncio.wait_for(writable, remaining)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self._loop.remove_writer(fd)
+        return True
+
+    async def query(self, command: str, timeout: Optional[float] = None,
+                    expect_reply: bool = True) -> str:
+        """Send a command and return its reply ("" on timeout or no reply)."""
+        async with self._lock:
+            timeout = self.timeout if timeout is None else timeout
+            start = self._loop.time()
+            deadline = start + timeout
+
+            # Drop stale bytes (unsolicited samples, echoes of earlier commands)
+            self.ser.reset_input_buffer()
+            self._buffer.clear()
+            echo = command.encode().lower()
+            line = b""
+            if not await self._write(f"{command}\r".encode(), deadline):
+                # Don't let the rest of the command reach the bath later
+                self.ser.reset_output_buffer()
+                line = None
+            elif expect_reply:
+                line = await self._readline(deadline)
+                if line is not None and line.strip().lower() == echo:
+                    # Full duplex mode echoes the command on its own line first
+                    self.echo = True
+                    line = await self._readline(deadline)
+                elif line is not None and self.echo is None:
+                    self.echo = False
+            elif self.echo is not False:
+                # Consume the echo of a set command so the next query does not read it as its reply
+                reply = await self._readline(deadline)
+                if self.echo is None:
+                    self.echo = reply is not None and reply.strip().lower() == echo
+            self.last_latency = self._loop.time() - start
+            self.stats.add(self.last_latency, timed_out=line is None)
+            return (line or b"").decode('latin-1').strip()
+
+    def close(self):
+        self._loop.remove_reader(self.ser.fileno())
+        self.ser.close()
+
+
+class CsvSink:
+    """
+    Minimal CSV log sink for use inside the event loop.
+
+    Rows are handed to a writer thread of their own, which writes, flushes
+    every ``flush_interval`` seconds and fsyncs, so a slow SD card never
+    stalls the serial handling of any bath. A write error is raised by the
+    next write_row() or by close().
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(LOG_HEADER)
+        self._last_flush = time.monotonic()
+        # One thread keeps the rows in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="csv-sink")
+        self._error = None
+
+    def _write(self, row: list):
+        """Write one row (writer thread)."""
+        try:
+            self._writer.writerow(row)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+        except OSError as e:
+            self._error = e
+
+    def _flush(self):
+        """Flush and fsync (writer thread)."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    async def write_row(self, row: list):
+        """Queue a row; returns without waiting for the disk."""
+        if self._error:
+            raise self._error
+        self._executor.submit(self._write, list(row))
+
+    async def flush(self):
+        """Wait until every queued row is written and synced."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._flush)
+
+    async def close(self):
+        try:
+            await self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._file.close()
+        if self._error:
+            raise self._error
+
+
+class BathController:
+    """Runs the maintain_temperature_setpoints sequence for one bath."""
+
+    def __init__(self, name: str, settings: dict, log_dir: str):
+        """
+        Args:
+            name: Bath name used in console output and the log file name
+            settings: Settings dict as returned by main.get_settings
+            log_dir: Directory for the bath's CSV log
+        """
+        self.name = name
+        self.settings = settings
+        self.log_dir = log_dir
+        self.transport = None
+        self.status = "Idle"
+        self._last_reading_time = None
+
+    def log(self, message: str):
+        print(f"[{self.name}] {message}")
+
+    async def _read_temperature(self) -> Optional[float]:
+        response = await self.transport.query("t")
+        temp = parse_temperature(response)
+        if temp is None:
+            self.log(f"Could not parse temperature: {response}")
+        return temp
+
+    async def run(self):
+        """Connect to the bath and run every setpoint, then disconnect."""
+        settings = self.settings
+        ser = main.initialize_serial(port=settings["port"],
+                                     baudrate=settings["baudrate"],
+                                     timeout=settings["timeout"])
+        self.transport = AsyncSerialTransport(ser, timeout=settings["timeout"])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        sink = CsvSink(os.path.join(self.log_dir, f"{self.name}_{timestamp}.csv"))
+        try:
+            for step_index, setpoint in enumerate(settings["setpoints"]):
+                await self._run_step(step_index + 1, setpoint, sink)
+            self.status = "Completed"
+            self.log("All steps completed!")
+        finally:
+            self.log(f"Serial round trip: {self.transport.stats.summary()}")
+            await sink.close()
+            self.transport.close()
+
+    async def _run_step(self, step_number: int, setpoint: float, sink: CsvSink):
+        settings = self.settings
+        hold_time = settings["hold_time"]
+        self.log(f"Step {step_number}: Setting temperature to {setpoint}°C")
+        await self.transport.query(f"s={setpoint}", expect_reply=False)
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        # Readings are due on absolute deadlines of the loop's monotonic clock
+        scheduler = TickScheduler(clock=loop.time)
+        scheduler.start()
+        stability_start_time = None
+        tracker = StabilityTracker(settings["min_readings"], settings["stability_window"])
+        sampler = None
+        if settings["adaptive_sampling"]:
+            sampler = AdaptiveSampler(settings["min_interval"], settings["max_interval"],
+                                      settings["stability_window"])
+
+        while True:
+            current_time = loop.time()
+            if current_time - start_time > settings["timeout_duration"]:
+                self.log(f"Timeout reached while waiting for stability at {setpoint}°C")
+                return
+
+            temp = await self._read_temperature()
+            status = "Waiting for stability"
+            if temp is not None:
+                tracker.add(temp)
+
+            if tracker.is_stable(setpoint):
+                if stability_start_time is None:
+                    stability_start_time = current_time
+                    self.log(f"Temperature stable at {setpoint}°C, holding for {hold_time} seconds")
+                remaining = hold_time - (current_time - stability_start_time)
+                if remaining <= 0:
+                    self.log(f"Completed hold time for {setpoint}°C")
+                    return
+                status = f"Stable - Holding ({int(remaining)}s remaining)"
+            else:
+                stability_start_time = None
+
+            self.status = f"Step {step_number}: {status}"
+            if temp is not None:
+                row_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                # Time since the previous logged reading
+                interval = "" if self._last_reading_time is None else round(current_time - self._last_reading_time, 3)
+                self._last_reading_time = current_time
+                await sink.write_row([row_time, step_number, setpoint, temp, status, interval])
+
+            reading_interval = sampler.next_interval(tracker, setpoint) if sampler else settings["reading_interval"]
+            deadline, _ = scheduler.advance(reading_interval)
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+
+async def run_baths(controllers: List[BathController]) -> list:
+    """Run all bath controllers concurrently; returns one result/exception per bath."""
+    results = await asyncio.gather(*(controller.run() for controller in controllers),
+                                   return_exceptions=True)
+    for controller, result in zip(controllers, results):
+        if isinstance(result, Exception):
+            controller.status = f"Error: {result}"
+            controller.log(f"Error during experiment: {result}")
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Run several thermal baths from one process")
+    parser.add_argument("configs", nargs="+", help="Experiment config file per bath (.ini)")
+    parser.add_argument("--log-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"),
+                        help="Directory for the per-bath CSV logs")
+    args = parser.parse_args()
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    controllers = []
+    for config_file in args.configs:
+        config = main.load_config(config_file)
+        if config is None:
+            continue
+        name = os.path.splitext(os.path.basename(config_file))[0]
+        controllers.append(BathController(name, main.get_settings(config), args.log_dir))
+
+    if not controllers:
+        print("No bath configurations loaded.")
+        return
+
+    try:
+        asyncio.run(run_baths(controllers))
+    except KeyboardInterrupt:
+        print("Interrupted.")
+
+
+if __name__ == "__main__":
+    main_cli()
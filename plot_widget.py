@@ -0,0 +1,139 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_right
+
+from downsample import MinMaxPyramid
+
+# Redraw budget per frame; the number of drawn buckets adapts to stay under it
+REDRAW_BUDGET_MS = 40.0
+MIN_DRAW_POINTS = 50
+
+
+class TemperaturePlot:
+    """
+    Live plot of actual vs target temperature on a Tk canvas.
+
+    Readings go into a MinMaxPyramid, and each redraw asks it for at most one
+    bucket per horizontal pixel. The actual trace is drawn as a min/max
+    envelope, so spikes stay visible at any zoom level. Redraw cost is bounded
+    by the canvas width rather than the number of readings, and the number
+    of drawn buckets shrinks automatically if a frame exceeds
+    REDRAW_BUDGET_MS (e.g. on a Raspberry Pi).
+    """
+
+    def __init__(self, parent, width: int = 600, height: int = 200):
+        self.frame = ttk.Frame(parent)
+        self.frame.pack(fill=tk.BOTH, expand=True)
+
+        controls = ttk.Frame(self.frame)
+        controls.pack(fill=tk.X)
+        self.current_step_only_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(controls, text="Current step only", variable=self.current_step_only_var,
+                        command=self.request_redraw).pack(side=tk.LEFT)
+        self.info_var = tk.StringVar(value="No readings")
+        ttk.Label(controls, textvariable=self.info_var).pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, background="white",
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self._actual_line = self.canvas.create_line(0, 0, 0, 0, fill="#1f77b4")
+        self._target_line = self.canvas.create_line(0, 0, 0, 0, fill="#d62728", dash=(4, 2))
+        self._y_max_label = self.canvas.create_text(4, 4, anchor=tk.NW, font=("Arial", 8))
+        self._y_min_label = self.canvas.create_text(4, height - 4, anchor=tk.SW, font=("Arial", 8))
+        self.canvas.bind("<Configure>", lambda event: self.request_redraw())
+
+        self.actual = MinMaxPyramid()
+        self._target_times = []
+        self._target_values = []
+        self._step_start = None
+        self._max_points = None
+        self._dirty = False
+        self.last_redraw_ms = 0.0
+
+    def clear(self):
+        """Forget all readings (new experiment)."""
+        self.actual.clear()
+        self._target_times = []
+        self._target_values = []
+        self._step_start = None
+        self.request_redraw()
+
+    def add_reading(self, t: float, actual: float, target: float):
+        """Add one reading; ``t`` in seconds (any monotonic or epoch time base)."""
+        if not self._target_values or self._target_values[-1] != target:
+            self._target_times.append(t)
+            self._target_values.append(target)
+            self._step_start = t
+        self.actual.append(t, actual)
+        self._dirty = True
+
+    def request_redraw(self):
+        self._dirty = True
+
+    def redraw_if_needed(self):
+        """Redraw if new data arrived and the plot is visible."""
+        if self._dirty and self.canvas.winfo_ismapped():
+            self.redraw()
+
+    def redraw(self):
+        self._dirty = False
+        start = time.perf_counter()
+        width = max(self.canvas.winfo_width(), 10)
+        height = max(self.canvas.winfo_height(), 10)
+        if self._max_points is None:
+            self._max_points = width
+
+        if not len(self.actual):
+            self.canvas.coords(self._actual_line, 0, 0, 0, 0)
+            self.canvas.coords(self._target_line, 0, 0, 0, 0)
+            self.info_var.set("No readings")
+            return
+
+        t1 = self.actual.last_time
+        t0 = self._step_start if self.current_step_only_var.get() else self.actual.first_time
+        buckets = self.actual.query(t0, t1, min(self._max_points, width))
+
+        # Target segments visible in the time range
+        first = max(0, bisect_right(self._target_times, t0) - 1)
+        targets = list(zip(self._target_times[first:], self._target_values[first:]))
+
+        y_low = min(min(b[1] for b in buckets), min(v for _, v in targets))
+        y_high = max(max(b[2] for b in buckets), max(v for _, v in targets))
+        margin = max((y_high - y_low) * 0.05, 0.01)
+        y_low -= margin
+        y_high += margin
+        span = max(t1 - t0, 1e-9)
+
+        def x_of(t):
+            return (max(t, t0) - t0) / span * (width - 1)
+
+        def y_of(v):
+            return (y_high - v) / (y_high - y_low) * (height - 1)
+
+        coords = []
+        for t, vmin, vmax in buckets:
+            x = x_of(t)
+            coords.extend((x, y_of(vmin), x, y_of(vmax)))
+        if len(coords) < 4:
+            coords.extend(coords)
+        self.canvas.coords(self._actual_line, *coords)
+
+        target_coords = []
+        for i, (t, value) in enumerate(targets):
+            y = y_of(value)
+            end = targets[i + 1][0] if i + 1 < len(targets) else t1
+            target_coords.extend((x_of(t), y, x_of(end), y))
+        self.canvas.coords(self._target_line, *target_coords)
+
+        self.canvas.itemconfigure(self._y_max_label, text=f"{y_high:.2f}°C")
+        self.canvas.coords(self._y_min_label, 4, height - 4)
+        self.canvas.itemconfigure(self._y_min_label, text=f"{y_low:.2f}°C")
+        self.info_var.set(f"{len(self.actual)} readings, {span / 60:.1f} min, {len(buckets)} buckets")
+
+        # Adapt the level of detail to the redraw budget
+        self.last_redraw_ms = (time.perf_counter() - start) * 1000
+        if self.last_redraw_ms > REDRAW_BUDGET_MS:
+            self._max_points = max(MIN_DRAW_POINTS, int(self._max_points * 0.7))
+        elif self.last_redraw_ms < REDRAW_BUDGET_MS / 2:
+            self._max_points = min(width, int(self._max_points * 1.2) + 1)
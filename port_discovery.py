@@ -0,0 +1,293 @@
+"""
+Find the Fluke 7320 bath by probing serial ports.
+
+Listing ports only tells which devices exist; which one is the bath is a
+guess until an experiment fails to connect. PortDiscovery opens every
+candidate port in parallel (one thread per port), sends the identification
+query ``*ver`` and then a temperature query ``t`` at each candidate baud
+rate with a short timeout, and keeps the ports that answer like a 7320.
+Candidates are USB-serial adapters (ports with a USB vendor id) plus any
+port given explicitly; on-board UARTs and other instruments' ports are not
+written to unless asked for.
+
+Results are cached per port and hardware id, so a rescan only probes ports
+that were added or changed, and watch() re-probes automatically when a USB
+adapter is plugged in or removed:
+
+    python port_discovery.py                 # probe all ports once
+    python port_discovery.py --watch         # keep watching for hotplug changes
+    python port_discovery.py --port /dev/pts/5   # include a port that is not listed
+    python port_discovery.py --all-ports     # also probe non-USB ports
+
+Probing opens the port, which toggles DTR on most adapters; ports in use by
+a running experiment must be passed as ``exclude``. Probes hold
+``transport.PORT_LOCK``, which the experiment engine takes while it
+connects, so a run never starts in the middle of a probe.
+"""
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from transport import PORT_LOCK, parse_temperature
+
+# Baud rates tried in this order (2400 is the bath's factory setting)
+BAUD_RATES = (2400, 9600, 4800, 1200)
+
+# Reply deadline per probe command (seconds)
+PROBE_TIMEOUT = 0.3
+
+# Interval between hotplug checks in watch() (seconds)
+WATCH_INTERVAL = 2.0
+
+MAX_WORKERS = 8
+
+_VERSION_REPLY = re.compile(r"ver\.?\s*7320", re.IGNORECASE)
+_TEMPERATURE_REPLY = re.compile(r"^t:\s*[-+]?\d+(\.\d*)?\s*[CF]?$", re.IGNORECASE)
+
+
+class BathPort(NamedTuple):
+    device: str             # Port name, e.g. COM3 or /dev/ttyUSB0
+    baudrate: int           # Baud rate at which the bath answered
+    firmware: str           # Reply to *ver ("" if only the temperature query answered)
+    temperature: Optional[float]
+    description: str = ""   # Description reported by the OS
+
+
+def _read_line(ser, deadline: float) -> bytes:
+    """Read one reply line; returns what arrived by the deadline."""
+    buffer = bytearray()
+    while not buffer.endswith(b"\n") and time.monotonic() < deadline:
+        chunk = ser.read(max(1, ser.in_waiting))
+        if chunk:
+            buffer += chunk
+    return bytes(buffer)
+
+
+def _exchange(ser, command: str, timeout: float) -> str:
+    """Send a command and return its reply, skipping the echo in full duplex mode."""
+    ser.reset_input_buffer()
+    ser.write(f"{command}\r".encode())
+    deadline = time.monotonic() + timeout
+    reply = _read_line(ser, deadline)
+    if reply.strip().lower() == command.encode().lower():
+        reply = _read_line(ser, deadline)
+    return reply.decode('latin-1').strip()
+
+
+def probe_port(device: str, baudrates: Iterable[int] = BAUD_RATES, timeout: float = PROBE_TIMEOUT,
+               description: str = "") -> Optional[BathPort]:
+    """
+    Check whether a 7320 bath answers on ``device``.
+
+    Returns:
+        BathPort: The port and the baud rate it answered at, or None
+    """
+    import serial
+    import main
+
+    for baudrate in baudrates:
+        try:
+            ser = main.initialize_serial(port=device, baudrate=baudrate, timeout=min(timeout, 0.05))
+        except (serial.SerialException, OSError, ValueError):
+            # Missing or busy port: no point trying other baud rates
+            return None
+        try:
+            # With hardware flow control a dead line would block writes forever
+            ser.write_timeout = timeout
+            firmware = _exchange(ser, "*ver", timeout)
+            if not firmware:
+                continue
+            reply = _exchange(ser, "t", timeout)
+            if _VERSION_REPLY.search(firmware) or _TEMPERATURE_REPLY.match(reply):
+                if not _VERSION_REPLY.search(firmware):
+                    firmware = ""
+                return BathPort(device, baudrate, firmware, parse_temperature(reply), description)
+        except (serial.SerialException, OSError):
+            return None
+        finally:
+            ser.close()
+    return None
+
+
+def list_ports(usb_only: bool = True) -> Dict[str, tuple]:
+    """
+    Ports known to the OS as {device: (description, hwid)}.
+
+    Args:
+        usb_only: Only USB-serial adapters (ports reporting a USB vendor id)
+    """
+    import serial.tools.list_ports
+    return {port.device: (port.description, port.hwid) for port in serial.tools.list_ports.comports()
+            if port.vid is not None or not usb_only}
+
+
+class PortDiscovery:
+    """
+    Probes serial ports concurrently and caches which of them are baths.
+
+    Args:
+        baudrates: Baud rates to try; the rate a port last answered at is tried first
+        timeout: Reply deadline per probe command (seconds)
+        usb_only: Only probe USB-serial adapters among the listed ports
+    """
+
+    def __init__(self, baudrates: Iterable[int] = BAUD_RATES, timeout: float = PROBE_TIMEOUT,
+                 usb_only: bool = True):
+        self.baudrates = tuple(baudrates)
+        self.timeout = timeout
+        self.usb_only = usb_only
+        self._lock = threading.Lock()
+        # One discovery at a time, so a port is never opened by two probes
+        self._discover_lock = threading.Lock()
+        # device -> (hwid, BathPort or None)
+        self._cache: Dict[str, tuple] = {}
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="port-probe")
+        self._watch_stop = None
+
+    def _baudrates_for(self, device: str, preferred: Optional[int]) -> List[int]:
+        cached = self._cache.get(device)
+        first = [rate for rate in (cached[1].baudrate if cached and cached[1] else None, preferred) if rate]
+        return list(dict.fromkeys(first + list(self.baudrates)))
+
+    def discover(self, extra_ports: Iterable[str] = (),
+                 exclude: Union[Iterable[str], Callable[[], Iterable[str]]] = (),
+                 preferred_baudrate: Optional[int] = None, force: bool = False) -> List[BathPort]:
+        """
+        Probe the listed ports (plus ``extra_ports``) and return the baths found.
+
+        Ports whose hardware id is unchanged since the last probe are answered
+        from the cache unless ``force`` is set. Ports in ``exclude`` are never
+        opened (e.g. the port of a running experiment); pass a callable to
+        have it evaluated once PORT_LOCK is held, after any run that was
+        connecting has its port.
+        """
+        with self._discover_lock, PORT_LOCK:
+            excluded = exclude() if callable(exclude) else exclude
+            return self._discover(extra_ports, set(excluded), preferred_baudrate, force)
+
+    def _discover(self, extra_ports: Iterable[str], exclude: set, preferred_baudrate: Optional[int],
+                  force: bool) -> List[BathPort]:
+        ports = list_ports(self.usb_only)
+        for device in extra_ports:
+            if device:
+                ports.setdefault(device, ("", ""))
+
+        futures = {}
+        results = {}
+        with self._lock:
+            for device, (description, hwid) in ports.items():
+                cached = self._cache.get(device)
+                if device in exclude:
+                    if cached and cached[1]:
+                        results[device] = cached[1]
+                    continue
+                if cached and cached[0] == hwid and not force:
+                    results[device] = cached[1]
+                    continue
+                futures[device] = (hwid, self._executor.submit(
+                    probe_port, device, self._baudrates_for(device, preferred_baudrate),
+                    self.timeout, description))
+
+        for device, (hwid, future) in futures.items():
+            results[device] = future.result()
+
+        with self._lock:
+            for device, (hwid, _) in futures.items():
+                self._cache[device] = (hwid, results[device])
+            # Forget ports that disappeared
+            for device in list(self._cache):
+                if device not in ports:
+                    del self._cache[device]
+        return sorted((port for port in results.values() if port), key=lambda port: port.device)
+
+    def discover_async(self, *args, **kwargs) -> Future:
+        """Run discover() in the background; the Future resolves to its result."""
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.discover(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="port-discovery", daemon=True).start()
+        return future
+
+    def cached(self) -> List[BathPort]:
+        """Baths found by the last probes, without probing."""
+        with self._lock:
+            return sorted((entry[1] for entry in self._cache.values() if entry[1]), key=lambda port: port.device)
+
+    def watch(self, on_change: Callable[[List[BathPort]], None], interval: float = WATCH_INTERVAL,
+              exclude: Callable[[], Iterable[str]] = lambda: ()):
+        """
+        Re-probe whenever ports appear, disappear or change.
+
+        Listing ports is cheap and opens nothing; only changed ports are
+        probed, and nothing is probed until the first change. ``on_change`` is called from the watcher thread with the
+        baths found after each change; ``exclude`` returns ports not to open.
+        """
+        self.stop_watching()
+        stop = threading.Event()
+        self._watch_stop = stop
+
+        def run():
+            # Ports present when watching starts are left to discover()
+            known = list_ports(self.usb_only)
+            while not stop.wait(interval):
+                try:
+                    current = list_ports(self.usb_only)
+                    if current != known:
+                        known = current
+                        on_change(self.discover(exclude=exclude))
+                except Exception as e:
+                    print(f"Port watch error: {str(e)}")
+
+        threading.Thread(target=run, name="port-watch", daemon=True).start()
+
+    def stop_watching(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def close(self):
+        self.stop_watching()
+        self._executor.shutdown(wait=False)
+
+
+def _print_ports(baths: List[BathPort]):
+    if not baths:
+        print("No bath found")
+    for port in baths:
+        firmware = port.firmware or "no *ver reply"
+        temperature = "-" if port.temperature is None else f"{port.temperature:.2f}"
+        print(f"{port.device:<16} {port.baudrate:>6} baud  {firmware:<16} t={temperature}  {port.description}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Find Fluke 7320 baths on the serial ports")
+    parser.add_argument("--port", action="append", default=[], help="Also probe this port (repeatable)")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help="Reply deadline per command (s)")
+    parser.add_argument("--watch", action="store_true", help="Keep running and re-probe on hotplug changes")
+    parser.add_argument("--all-ports", action="store_true", help="Probe every listed port, not only USB adapters")
+    args = parser.parse_args()
+
+    discovery = PortDiscovery(timeout=args.timeout, usb_only=not args.all_ports)
+    start = time.perf_counter()
+    _print_ports(discovery.discover(extra_ports=args.port))
+    print(f"Probed in {time.perf_counter() - start:.2f} s")
+    if args.watch:
+        discovery.watch(lambda baths: (print("Ports changed:"), _print_ports(baths)))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    discovery.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Append-only columnar store for temperature readings.
+
+Each experiment gets a ``<name>.readings`` directory holding one binary file
+per column plus a small ``meta.json``:
+
+    timestamp.f64   epoch seconds (float64)
+    step.i32        step number (int32)
+    target.f64      target temperature (float64)
+    actual.f64      measured temperature (float64)
+    status.u8       status code (STATUS_WAITING / STATUS_HOLDING)
+    remaining.f64   hold time remaining in seconds (NaN while waiting)
+    interval.f64    seconds since the previous reading (NaN for the first one)
+
+The files are fixed-width little-endian arrays that load as NumPy memmaps
+without parsing. CSV in the usual log layout can be exported on demand:
+
+    python readings_store.py export logs/experiment_1_20240101_120000.readings out.csv
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from array import array
+from datetime import datetime
+from typing import Optional
+
+from csv_logger import LOG_HEADER
+
+STATUS_WAITING = 0
+STATUS_HOLDING = 1
+
+WAITING_STATUS_TEXT = "Waiting for stability"
+DEFAULT_HOLD_STATUS_FORMAT = "Stable - Holding ({remaining_s}s remaining)"
+
+# Column name -> (array typecode, NumPy dtype)
+COLUMNS = {
+    "timestamp": ("d", "<f8"),
+    "step": ("i", "<i4"),
+    "target": ("d", "<f8"),
+    "actual": ("d", "<f8"),
+    "status": ("B", "u1"),
+    "remaining": ("d", "<f8"),
+    "interval": ("d", "<f8"),
+}
+
+# Value of a column missing from a store created before it existed (columns not listed: NaN)
+FILL_VALUES = {"step": 0, "status": STATUS_WAITING}
+
+
+def _column_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.{COLUMNS[name][1].lstrip('<')}")
+
+
+class ReadingsStore:
+    """Buffered appender for the column files of one experiment."""
+
+    def __init__(self, directory: str, hold_status_format: str = DEFAULT_HOLD_STATUS_FORMAT,
+                 flush_rows: int = 64):
+        """
+        Args:
+            directory: Store directory (created if needed, appended to if present)
+            hold_status_format: Template used to rebuild the holding status text
+                on export; fields: remaining_s (int seconds), remaining_min
+            flush_rows: Rows buffered in memory before being written
+        """
+        if sys.byteorder != "little":
+            raise RuntimeError("ReadingsStore writes little-endian column files")
+        self.directory = directory
+        self.flush_rows = flush_rows
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, 'w') as f:
+                json.dump({"version": 1,
+                           "columns": {name: dtype for name, (_, dtype) in COLUMNS.items()},
+                           "hold_status_format": hold_status_format}, f, indent=2)
+        self._buffers = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        missing = [name for name in COLUMNS if not os.path.exists(_column_path(directory, name))]
+        self._files = {name: open(_column_path(directory, name), 'ab') for name in COLUMNS}
+        self._align_columns(missing)
+
+    def _align_columns(self, missing: list):
+        """
+        Bring every column to the same length before appending.
+
+        Rows cut off by a crash mid-flush are dropped from the columns that
+        have them, so no row is left with NaN readings. Columns in
+        ``missing`` (added after the store was created, e.g. ``interval`` in
+        a resumed run) are filled with FILL_VALUES.
+        """
+        present = [name for name in COLUMNS if name not in missing]
+        if not present:
+            return
+        rows = min(os.path.getsize(_column_path(self.directory, name)) // array(COLUMNS[name][0]).itemsize
+                   for name in present)
+        for name in present:
+            path = _column_path(self.directory, name)
+            size = rows * array(COLUMNS[name][0]).itemsize
+            if os.path.getsize(path) != size:
+                os.truncate(path, size)
+        for name in missing:
+            typecode = COLUMNS[name][0]
+            array(typecode, [FILL_VALUES.get(name, math.nan)] * rows).tofile(self._files[name])
+            self._files[name].flush()
+
+    def append(self, timestamp: float, step: int, target: float, actual: float,
+               status: int = STATUS_WAITING, remaining: Optional[float] = None,
+               interval: Optional[float] = None):
+        """Add one reading."""
+        buffers = self._buffers
+        buffers["timestamp"].append(timestamp)
+        buffers["step"].append(step)
+        buffers["target"].append(target)
+        buffers["actual"].append(actual)
+        buffers["status"].append(status)
+        buffers["remaining"].append(math.nan if remaining is None else remaining)
+        buffers["interval"].append(math.nan if interval is None else interval)
+        if len(buffers["timestamp"]) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows to the column files."""
+        for name, buffer in self._buffers.items():
+            if buffer:
+                buffer.tofile(self._files[name])
+                del buffer[:]
+            self._files[name].flush()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+
+def load_readings(directory: str) -> dict:
+    """
+    Map the column files of a store as read-only NumPy arrays.
+
+    Only rows present in every column are returned, so a store cut off
+    mid-write loses its incomplete last rows. A column file that does not
+    exist (a column added after the store was created) reads as NaN, or as
+    FILL_VALUES for the integer columns. An empty store gives empty arrays.
+    """
+    import numpy as np
+
+    sizes = {}
+    for name, (_, dtype) in COLUMNS.items():
+        path = _column_path(directory, name)
+        if os.path.exists(path):
+            sizes[name] = os.path.getsize(path) // np.dtype(dtype).itemsize
+    rows = min(sizes.values()) if sizes else 0
+
+    columns = {}
+    for name, (_, dtype) in COLUMNS.items():
+        if name not in sizes:
+            columns[name] = np.full(rows, FILL_VALUES.get(name, np.nan), dtype=dtype)
+        elif rows:
+            columns[name] = np.memmap(_column_path(directory, name), dtype=dtype, mode='r', shape=(rows,))
+        else:
+            columns[name] = np.empty(0, dtype=dtype)
+    return columns
+
+
+def export_csv(directory: str, csv_path: str):
+    """Write the store as a CSV file in the standard log layout."""
+    with open(os.path.join(directory, "meta.json")) as f:
+        hold_status_format = json.load(f).get("hold_status_format", DEFAULT_HOLD_STATUS_FORMAT)
+    columns = load_readings(directory)
+
+    with open(csv_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(LOG_HEADER)
+        for timestamp, step, target, actual, status, remaining, interval in zip(
+                columns["timestamp"].tolist(), columns["step"].tolist(), columns["target"].tolist(),
+                columns["actual"].tolist(), columns["status"].tolist(), columns["remaining"].tolist(),
+                columns["interval"].tolist()):
+            if status == STATUS_HOLDING:
+                status_text = hold_status_format.format(remaining_s=int(remaining),
+                                                        remaining_min=remaining / 60)
+            else:
+                status_text = WAITING_STATUS_TEXT
+            writer.writerow([datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+                             step, target, actual, status_text, "" if math.isnan(interval) else interval])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar readings store tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export a store to CSV")
+    export_parser.add_argument("directory", help="Store directory (*.readings)")
+    export_parser.add_argument("csv_path", help="Output CSV file")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_csv(args.directory, args.csv_path)
+        print(f"Exported {args.directory} to {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,15 +29,9 @@ if not exist venv\ (
 rem Activate virtual environment
 call venv\Scripts\activate.bat
 
-rem Install requirements
-echo Installing required packages...
-pause
-pip install -r requirements.txt
-pause
-
-rem Launch the application
+rem Install requirements only if requirements.txt or the venv changed, then launch the application
 echo Launching Thermal Bath Controller...
-python gui_pi.py
+python launcher.py --script gui_pi.py
 
 rem Deactivate virtual environment when done
 call venv\Scripts\deactivate.bat
\ No newline at end of file
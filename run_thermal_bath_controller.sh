@@ -1,5 +1,13 @@
 #!/bin/bash
 
+# Start time for the time-to-window report (see launcher.py); EPOCHREALTIME
+# uses the locale's decimal separator (e.g. 1760000000,123456)
+LAUNCH_TIME="${EPOCHREALTIME:-$(date +%s)}"
+export THERMAL_BATH_LAUNCH_TIME="${LAUNCH_TIME/,/.}"
+
+# Check GitHub for updates at most once a day (--update checks now)
+UPDATE_CHECK_MINUTES=1440
+
 # Display script banner
 echo "========================================"
 echo "  Thermal Bath Controller Launcher      "
@@ -12,8 +20,11 @@ SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
 cd "$SCRIPT_DIR"
 
 # Check for Git and update from repository if available
-echo "Checking for updates from GitHub..."
-if command -v git &> /dev/null; then
+if [ "$1" != "--update" ] && [ -n "$(find .git/FETCH_HEAD -mmin -$UPDATE_CHECK_MINUTES 2>/dev/null)" ]; then
+    # FETCH_HEAD is touched by every pull, so a recent one means we are up to date enough
+    echo "Checked for updates less than a day ago, skipping (use --update to check now)."
+elif command -v git &> /dev/null; then
+    echo "Checking for updates from GitHub..."
     if [ -d ".git" ]; then
         # Repository already exists, pull latest changes
         echo "Pulling latest changes..."
@@ -89,15 +100,6 @@ if [ $USE_VENV -eq 1 ]; then
     source venv/bin/activate
 fi
 
-# Install required packages
-echo "Installing required packages..."
-if [ $USE_VENV -eq 1 ]; then
-    pip install --upgrade pip
-    pip install -r requirements.txt
-else
-    pip3 install --user -r requirements.txt
-fi
-
 # On Raspberry Pi, ensure tkinter is installed
 if [ -f /sys/firmware/devicetree/base/model ] && grep -q "Raspberry Pi" /sys/firmware/devicetree/base/model; then
     echo "Raspberry Pi detected, checking tkinter installation..."
@@ -111,15 +113,10 @@ fi
 mkdir -p "$SCRIPT_DIR/configs"
 mkdir -p "$SCRIPT_DIR/logs"
 
-# Launch the application
+# Install required packages only if requirements.txt or the venv changed, then launch the application
 echo "Launching Thermal Bath Controller..."
 if [ $USE_VENV -eq 1 ]; then
-    python gui_pi.py
+    exec python launcher.py --script gui_pi.py
 else
-    python3 gui_pi.py
+    exec python3 launcher.py --script gui_pi.py
 fi
-
-# Deactivate virtual environment when done
-if [ $USE_VENV -eq 1 ]; then
-    deactivate
-fi
\ No newline at end of file
@@ -0,0 +1,51 @@
+from stability import StabilityTracker
+
+# Stability margin (fraction of the stability window) below which a reading counts as comfortably stable
+STABLE_MARGIN = 0.5
+
+
+class AdaptiveSampler:
+    """
+    Chooses the delay before the next reading from the control phase.
+
+    While the stability window is still filling, the temperature is moving
+    or it sits near the edge of the stability criterion, readings are taken
+    every ``min_interval`` seconds. Once the window mean and standard
+    deviation are both well inside ``stability_window`` (below
+    STABLE_MARGIN of it), the interval grows by ``backoff`` per reading up to
+    ``max_interval``, and drops straight back to ``min_interval`` as soon as
+    the margin shrinks.
+    """
+
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 60.0,
+                 stability_window: float = 0.05, backoff: float = 1.5):
+        """
+        Args:
+            min_interval: Shortest delay between readings (seconds)
+            max_interval: Longest delay between readings during stable holds (seconds)
+            stability_window: Stability window of the tracker (°C)
+            backoff: Factor applied to the interval per comfortably stable reading
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Need 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.stability_window = stability_window
+        self.backoff = backoff
+        self.interval = min_interval
+
+    def reset(self):
+        """Go back to dense sampling (e.g. after a new setpoint)."""
+        self.interval = self.min_interval
+
+    def next_interval(self, tracker: StabilityTracker, target: float) -> float:
+        """Return the delay before the next reading given the current stability window."""
+        if not tracker.full:
+            self.interval = self.min_interval
+            return self.interval
+        margin = max(abs(tracker.mean - target), tracker.std) / self.stability_window
+        if margin < STABLE_MARGIN:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        return self.interval
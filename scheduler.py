@@ -0,0 +1,97 @@
+"""
+Drift-free scheduling of the temperature polling loop.
+
+Sleeping for the reading interval after each reading makes the real period
+interval + serial I/O + logging, so samples drift later and later over a
+run, and wall-clock time (``time.time()``) jumps when NTP corrects the
+clock. TickScheduler instead fires on absolute ``time.monotonic()``
+deadlines: tick n is due at ``start + n * interval`` however long the work
+in between took. If a tick is missed entirely (a serial timeout longer than
+the interval, say) it is skipped rather than fired late in a burst, and the
+lateness of every tick is recorded.
+
+The interval may change from tick to tick (adaptive sampling); the next
+deadline is then the previous deadline plus the new interval.
+"""
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class Tick(NamedTuple):
+    deadline: float     # When the tick was due (scheduler clock)
+    lateness: float     # How long after the deadline it actually fired (seconds)
+    skipped: int        # Ticks dropped before this one because they were missed entirely
+
+
+class TickScheduler:
+    """
+    Waits for absolute, evenly spaced deadlines.
+
+    Args:
+        clock: Monotonic clock (e.g. ``loop.time`` for asyncio); by default
+            ``time.monotonic``, looked up on every call so that
+            ``transcript.use_clock`` can swap in a virtual clock
+        sleep: Called with the seconds to wait (default ``time.sleep``, looked
+            up the same way); returning True means the wait was interrupted
+            and ``wait`` gives up
+    """
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None,
+                 sleep: Optional[Callable[[float], Optional[bool]]] = None):
+        self._clock = clock
+        self._sleep = sleep
+        self.deadline = None
+        self.ticks = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+
+    def _now(self) -> float:
+        return self._clock() if self._clock is not None else time.monotonic()
+
+    def start(self):
+        """Start a new schedule at the current time (call when taking the first reading)."""
+        self.deadline = self._now()
+
+    def advance(self, interval: float) -> tuple:
+        """
+        Move to the next deadline without waiting (for callers that sleep themselves).
+
+        Returns:
+            tuple: (deadline, skipped)
+        """
+        now = self._now()
+        if self.deadline is None:
+            # Not started: fire right away
+            self.deadline = now
+            return now, 0
+        deadline = self.deadline + interval
+        skipped = 0
+        if interval > 0 and now - deadline >= interval:
+            # Whole periods have passed: drop them but stay on the original grid
+            skipped = int((now - deadline) // interval)
+            deadline += skipped * interval
+        self.deadline = deadline
+        self.skipped += skipped
+        return deadline, skipped
+
+    def record(self, deadline: float, skipped: int) -> Tick:
+        """Note that the tick due at ``deadline`` is firing now."""
+        lateness = max(0.0, self._now() - deadline)
+        self.ticks += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        return Tick(deadline, lateness, skipped)
+
+    def wait(self, interval: float) -> Optional[Tick]:
+        """
+        Sleep until the next deadline ``interval`` after the previous one.
+
+        Returns:
+            Tick: The tick that fired, or None if the sleep was interrupted
+        """
+        deadline, skipped = self.advance(interval)
+        while True:
+            remaining = deadline - self._now()
+            if remaining <= 0:
+                return self.record(deadline, skipped)
+            if (self._sleep or time.sleep)(remaining):
+                return None
@@ -0,0 +1,69 @@
+import os
+from typing import List
+
+
+class MessageLogFile:
+    """
+    Append-only on-disk copy of the GUI log, readable back by line number.
+
+    The log widget only keeps a bounded scrollback; this file keeps the full
+    history. A sparse index of byte offsets (one entry every ``index_stride``
+    lines) lets older pages be read back without scanning the whole file.
+    """
+
+    def __init__(self, path: str, index_stride: int = 1000):
+        """
+        Args:
+            path: File to append messages to (created on first write)
+            index_stride: Number of lines between indexed byte offsets
+        """
+        self.path = path
+        self.index_stride = index_stride
+        self.line_count = 0
+        self._size = 0
+        self._offsets = [0]
+        self._file = None
+
+    def append(self, text: str):
+        """Append one or more newline-terminated lines."""
+        if not text:
+            return
+        data = text.encode('utf-8')
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, 'ab')
+            # Line numbers count from what this instance wrote
+            self._size = self._file.tell()
+            self._offsets = [self._size]
+
+        position = data.find(b"\n")
+        while position != -1:
+            self.line_count += 1
+            if self.line_count % self.index_stride == 0:
+                self._offsets.append(self._size + position + 1)
+            position = data.find(b"\n", position + 1)
+
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def read_lines(self, start: int, end: int) -> List[str]:
+        """Return lines ``start`` (inclusive) to ``end`` (exclusive), newline included."""
+        start = max(0, start)
+        end = min(end, self.line_count)
+        if start >= end or self._file is None:
+            return []
+        block = start // self.index_stride
+        lines = []
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[block])
+            for _ in range(start - block * self.index_stride):
+                f.readline()
+            for _ in range(end - start):
+                lines.append(f.readline().decode('utf-8', errors='replace'))
+        return lines
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
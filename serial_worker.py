@@ -0,0 +1,122 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from transport import LatencyStats, SerialTransport
+
+# Lower value = served first
+PRIORITY_EMERGENCY = 0
+PRIORITY_SETPOINT = 1
+PRIORITY_QUERY = 2
+PRIORITY_POLL = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_EMERGENCY: "emergency",
+    PRIORITY_SETPOINT: "setpoint",
+    PRIORITY_QUERY: "query",
+    PRIORITY_POLL: "poll",
+}
+
+# Sorts ahead of every command priority
+_STOP_PRIORITY = PRIORITY_EMERGENCY - 1
+
+
+class SerialWorker:
+    """
+    Single owner of a serial port, serving commands from a priority queue.
+
+    Every exchange with the bath goes through one worker thread, so callers
+    on different threads (experiment loop, GUI) can never interleave their
+    writes and replies. Commands are served lowest priority value first and
+    in submission order within a priority; the reply is delivered through a
+    ``concurrent.futures.Future``.
+    """
+
+    def __init__(self, transport: SerialTransport):
+        """
+        Args:
+            transport: Transport for the port; the worker becomes its only user
+        """
+        self.transport = transport
+        self.max_depth = 0
+        self.wait_stats = {priority: LatencyStats() for priority in PRIORITY_NAMES}
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._closed = False
+        # Makes the closed check and the put in submit() atomic with close()
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="serial-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of commands waiting to be sent."""
+        return self._queue.qsize()
+
+    def submit(self, command: str, priority: int = PRIORITY_QUERY,
+               timeout: Optional[float] = None, expect_reply: bool = True) -> Future:
+        """
+        Queue a command and return a Future resolving to its reply.
+
+        Args:
+            command: Command without the trailing carriage return
+            priority: One of the PRIORITY_* constants
+            timeout: Per-command reply deadline (default: transport timeout)
+            expect_reply: False for commands the bath does not answer
+        """
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Serial worker is closed")
+            self._queue.put((priority, next(self._sequence), time.monotonic(),
+                             command, timeout, expect_reply, future))
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return future
+
+    def query(self, command: str, priority: int = PRIORITY_QUERY,
+              timeout: Optional[float] = None, expect_reply: bool = True) -> str:
+        """Submit a command and block until its reply arrives."""
+        return self.submit(command, priority, timeout, expect_reply).result()
+
+    def close(self):
+        """Stop the worker after the command in progress; pending commands are cancelled."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put((_STOP_PRIORITY, next(self._sequence), time.monotonic(),
+                             None, None, False, None))
+        self._thread.join()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future = item[-1]
+            if future is not None:
+                future.cancel()
+
+    def _run(self):
+        while True:
+            priority, _, queued_at, command, timeout, expect_reply, future = self._queue.get()
+            if future is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.wait_stats[priority].add(time.monotonic() - queued_at)
+            try:
+                reply = self.transport.query(command, timeout=timeout, expect_reply=expect_reply)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(reply)
+
+    def wait_summary(self) -> str:
+        """Return queue wait times per priority and the deepest queue seen."""
+        parts = [f"{PRIORITY_NAMES[priority]}: {stats.summary()}"
+                 for priority, stats in self.wait_stats.items() if stats.count]
+        parts.append(f"max depth={self.max_depth}")
+        return "; ".join(parts)
@@ -0,0 +1,189 @@
+import math
+from typing import NamedTuple, Optional
+
+
+class SettlingEstimate(NamedTuple):
+    """Projection of when the current step will meet the stability criterion."""
+    eta: Optional[float]       # Seconds after the latest reading (None if not converging)
+    converging: bool           # False once the step is judged unable to settle
+    final_temp: float          # Fitted asymptotic temperature (NaN without an exponential fit)
+    tau: float                 # Fitted time constant in seconds (NaN without an exponential fit)
+    offset: float              # final_temp - target
+    reason: str                # Short explanation when not converging
+
+
+class SettlingEstimator:
+    """
+    Online fit of a first-order (exponential) approach to the setpoint.
+
+    A bath settling towards ``T_final`` with time constant ``tau`` follows
+    ``dT/dt = (T_final - T) / tau``, a straight line in the (T, dT/dt) plane.
+    Readings are averaged in blocks of ``block_size`` to tame sensor noise;
+    the slope between consecutive blocks is regressed against their mean
+    temperature with running weighted sums, so each reading costs O(1). Older
+    blocks are exponentially forgotten, which lets the fit follow the curve
+    when the early approach is rate-limited rather than exponential.
+
+    From the fit the estimator projects when the readings will be within
+    ``stability_window`` of the target (plus the time to fill the stability
+    window) and flags steps that cannot converge: the fitted final
+    temperature lies outside the window, the temperature is moving away from
+    the target, or the projection lands after the step deadline.
+    """
+
+    def __init__(self, target: float, stability_window: float = 0.05, min_readings: int = 10,
+                 block_size: int = 5, min_blocks: int = 4, forgetting: float = 0.9,
+                 flag_after: int = 3):
+        """
+        Args:
+            target: Setpoint temperature
+            stability_window: Allowed deviation from the target (as in StabilityTracker)
+            min_readings: Readings in the stability window
+            block_size: Readings averaged into one block
+            min_blocks: Block slopes needed before estimating
+            forgetting: Weight kept by older blocks each time a block is added
+            flag_after: Consecutive failing estimates before flagging non-convergence
+        """
+        self.stability_window = stability_window
+        self.min_readings = min_readings
+        self.block_size = block_size
+        self.min_blocks = min_blocks
+        self.forgetting = forgetting
+        self.flag_after = flag_after
+        self.reset(target)
+
+    def reset(self, target: float):
+        """Start a new step (call right after the setpoint is sent)."""
+        self.target = target
+        self.count = 0
+        self._first_time = None
+        self._last_time = None
+        self._block_t = 0.0
+        self._block_temp = 0.0
+        self._block_n = 0
+        self._prev_block = None
+        self._pairs = 0
+        self._sw = self._sww = self._sx = self._sy = self._sxx = self._sxy = self._syy = 0.0
+        self._failures = 0
+        self._estimate = None
+        self._deadline = None
+
+    def add(self, t: float, temp: float):
+        """Add a reading taken at time ``t`` (seconds)."""
+        if self._first_time is None:
+            self._first_time = t
+        self._last_time = t
+        self.count += 1
+        self._block_t += t
+        self._block_temp += temp
+        self._block_n += 1
+        if self._block_n < self.block_size:
+            return
+
+        block = (self._block_t / self._block_n, self._block_temp / self._block_n)
+        self._block_t = self._block_temp = 0.0
+        self._block_n = 0
+        if self._prev_block is not None:
+            dt = block[0] - self._prev_block[0]
+            if dt > 0:
+                x = (block[1] + self._prev_block[1]) / 2
+                y = (block[1] - self._prev_block[1]) / dt
+                # Slope noise scales with 1/dt, so weight by dt^2
+                w = dt * dt
+                k = self.forgetting
+                self._sw = self._sw * k + w
+                self._sww = self._sww * k * k + w * w
+                self._sx = self._sx * k + w * x
+                self._sy = self._sy * k + w * y
+                self._sxx = self._sxx * k + w * x * x
+                self._sxy = self._sxy * k + w * x * y
+                self._syy = self._syy * k + w * y * y
+                self._pairs += 1
+        self._prev_block = block
+        self._estimate = None
+
+    def estimate(self, deadline: Optional[float] = None) -> Optional[SettlingEstimate]:
+        """
+        Project the time to stability.
+
+        Args:
+            deadline: Time (same clock as ``add``) after which the step times out
+
+        Returns:
+            SettlingEstimate, or None until enough readings have been collected
+        """
+        if self._pairs < self.min_blocks:
+            return None
+        if self._estimate is not None and deadline == self._deadline:
+            return self._estimate
+        self._deadline = deadline
+
+        window = self.stability_window
+        current = self._prev_block[1]
+        deviation = current - self.target
+        fill_time = self.min_readings * (self._last_time - self._first_time) / max(self.count - 1, 1)
+
+        mean_x = self._sx / self._sw
+        mean_y = self._sy / self._sw
+        var_x = self._sxx / self._sw - mean_x * mean_x
+        cov_xy = self._sxy / self._sw - mean_x * mean_y
+        var_y = self._syy / self._sw - mean_y * mean_y
+        # Effective number of blocks behind the weighted sums
+        n_eff = self._sw * self._sw / self._sww
+
+        final_temp = tau = math.nan
+        eta = None
+        reason = ""
+        if var_x > (window / 4) ** 2 and cov_xy < 0:
+            # Exponential approach: dT/dt = (T_final - T) / tau
+            b = cov_xy / var_x
+            tau = -1.0 / b
+            final_temp = mean_x - mean_y / b
+            offset = final_temp - self.target
+            # Standard error of the fitted final temperature (where the line crosses dT/dt = 0)
+            residual = max(var_y - cov_xy * cov_xy / var_x, 0.0) * n_eff / max(n_eff - 2, 1)
+            final_error = math.sqrt(residual * (1 + (final_temp - mean_x) ** 2 / var_x) / n_eff) / abs(b)
+            if abs(offset) - 2 * final_error >= window:
+                reason = f"settling towards {final_temp:.2f}°C, outside the stability window"
+            else:
+                remaining = current - final_temp
+                edge = window - offset if remaining > 0 else window + offset
+                # Final temperature too close to the window edge (or beyond it) to project
+                if edge > 0:
+                    eta = fill_time
+                    if abs(remaining) > edge:
+                        eta += tau * math.log(abs(remaining) / edge)
+        elif abs(deviation) <= window:
+            eta = fill_time
+        elif mean_y * deviation < 0:
+            # Still ramping: extrapolate the recent rate
+            eta = (abs(deviation) - window) / abs(mean_y) + fill_time
+        else:
+            reason = "temperature is not approaching the target"
+
+        if eta is not None and deadline is not None and self._last_time + eta > deadline:
+            reason = "projected to settle after the timeout"
+
+        offset = final_temp - self.target if not math.isnan(final_temp) else deviation
+        self._failures = self._failures + 1 if reason else 0
+        converging = self._failures < self.flag_after
+        self._estimate = SettlingEstimate(eta if not reason or converging else None,
+                                          converging, final_temp, tau, offset, reason)
+        return self._estimate
+
+
+def format_eta(estimate: Optional[SettlingEstimate]) -> str:
+    """Short human-readable form of an estimate for status lines."""
+    if estimate is None:
+        return "estimating..."
+    if not estimate.converging:
+        return f"not converging ({estimate.reason})"
+    if estimate.eta is None:
+        return "estimating..."
+    minutes, seconds = divmod(int(estimate.eta), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,233 @@
+"""
+Fluke 7320 bath simulator on a pseudo-terminal.
+
+Opens a pty pair and answers the 7320 serial command set on the slave side,
+so ``main.py`` and the GUIs can be pointed at it like a real bath:
+
+    python simulator.py --heating-tau 120 --cooling-tau 240
+    # -> Simulated 7320 bath on /dev/pts/5
+
+The bath temperature follows a first-order approach to the set-point with
+separate heating and cooling time constants plus Gaussian measurement noise.
+Linux/macOS only (requires pseudo-terminals).
+"""
+import argparse
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+from typing import Optional
+
+FIRMWARE_VERSION = "ver.7320,1.00"
+
+
+class BathModel:
+    """First-order thermal model of the bath."""
+
+    def __init__(self, initial_temp: float = 25.0,
+                 heating_tau: float = 300.0,
+                 cooling_tau: float = 600.0,
+                 noise: float = 0.005,
+                 time_scale: float = 1.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            initial_temp: Starting bath temperature and set-point (°C)
+            heating_tau: Time constant when the set-point is above the bath (s)
+            cooling_tau: Time constant when the set-point is below the bath (s)
+            noise: Standard deviation of the measurement noise (°C)
+            time_scale: Simulated seconds per real second (e.g. 60 = 1 min/s)
+            clock: Monotonic time source
+        """
+        self.temperature = initial_temp
+        self.setpoint = initial_temp
+        self.heating_tau = heating_tau
+        self.cooling_tau = cooling_tau
+        self.noise = noise
+        self.time_scale = time_scale
+        self._clock = clock
+        self._last_update = clock()
+
+    def update(self):
+        """Advance the model to the current time."""
+        now = self._clock()
+        dt = (now - self._last_update) * self.time_scale
+        self._last_update = now
+        if dt <= 0:
+            return
+        tau = self.heating_tau if self.setpoint > self.temperature else self.cooling_tau
+        self.temperature += (self.setpoint - self.temperature) * (1.0 - math.exp(-dt / tau))
+
+    def read(self) -> float:
+        """Return a noisy measurement of the current bath temperature."""
+        self.update()
+        return self.temperature + random.gauss(0.0, self.noise)
+
+    def set_setpoint(self, setpoint: float):
+        self.update()
+        self.setpoint = setpoint
+
+
+class BathSimulator:
+    """Serves a BathModel over a pseudo-terminal using the 7320 command set."""
+
+    def __init__(self, model: Optional[BathModel] = None,
+                 latency: float = 0.05,
+                 baudrate: Optional[int] = 2400,
+                 full_duplex: bool = True,
+                 units: str = "C"):
+        """
+        Args:
+            model: Thermal model (a default BathModel if omitted)
+            latency: Processing delay before each reply (seconds)
+            baudrate: Emulated line speed used to delay replies by their
+                transmission time (None = no wire delay)
+            full_duplex: Echo each command on its own line before the reply,
+                as the bath does in its factory-default FULL duplex mode
+            units: Temperature units reported in replies ("C" or "F")
+        """
+        self.model = model or BathModel()
+        self.latency = latency
+        self.baudrate = baudrate
+        self.full_duplex = full_duplex
+        self.units = units
+        self.commands_served = 0
+        self.port = None
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> str:
+        """Open the pty pair, start answering commands and return the port name."""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="bath-simulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Stop answering commands and close the pty pair."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_command(self, command: str) -> Optional[str]:
+        """
+        Execute one command and return the reply line (None if no reply).
+
+        Follows the 7320 rules: case-insensitive, spaces ignored, commands may
+        be abbreviated, and ``name=value`` sets a parameter without a reply.
+        """
+        command = command.replace(" ", "").lower()
+        name, _, value = command.partition("=")
+        if not name:
+            return None
+
+        if "temperature".startswith(name):
+            return f"t: {self.model.read():.2f} {self.units}"
+        if "setpoint".startswith(name):
+            if value:
+                try:
+                    self.model.set_setpoint(float(value))
+                except ValueError:
+                    pass
+                return None
+            return f"set: {self.model.setpoint:.2f} {self.units}"
+        if "*version".startswith(name) and name.startswith("*ver"):
+            return FIRMWARE_VERSION
+        if "units".startswith(name):
+            if value[:1] in ("c", "f"):
+                self.units = value[:1].upper()
+                return None
+            return f"u: {self.units}"
+        if "sample".startswith(name) and name.startswith("sa"):
+            return "sa: 0"
+        return None
+
+    def _write_line(self, line: str):
+        data = f"{line}\r\n".encode("latin-1")
+        if self.baudrate:
+            # 10 bits per character on an 8N1 line
+            time.sleep(len(data) * 10.0 / self.baudrate)
+        os.write(self._master, data)
+
+    def _serve(self):
+        buffer = b""
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                buffer += os.read(self._master, 1024)
+            except OSError:
+                break
+            while b"\r" in buffer:
+                raw, buffer = buffer.split(b"\r", 1)
+                command = raw.decode("latin-1").strip()
+                if not command:
+                    continue
+                self.commands_served += 1
+                if self.full_duplex:
+                    self._write_line(command)
+                reply = self.handle_command(command)
+                if reply is not None:
+                    if self.latency:
+                        time.sleep(self.latency)
+                    self._write_line(reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a Fluke 7320 bath on a pseudo-terminal")
+    parser.add_argument("--initial-temp", type=float, default=25.0, help="Starting temperature (°C)")
+    parser.add_argument("--heating-tau", type=float, default=300.0, help="Heating time constant (s)")
+    parser.add_argument("--cooling-tau", type=float, default=600.0, help="Cooling time constant (s)")
+    parser.add_argument("--noise", type=float, default=0.005, help="Measurement noise std (°C)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Reply processing delay (s)")
+    parser.add_argument("--baudrate", type=int, default=2400, help="Emulated line speed (0 = instant)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Simulated seconds per real second")
+    parser.add_argument("--half-duplex", action="store_true",
+                        help="Do not echo commands (the bath's HALF duplex mode; default is FULL)")
+    args = parser.parse_args()
+
+    model = BathModel(initial_temp=args.initial_temp,
+                      heating_tau=args.heating_tau,
+                      cooling_tau=args.cooling_tau,
+                      noise=args.noise,
+                      time_scale=args.time_scale)
+    simulator = BathSimulator(model, latency=args.latency,
+                              baudrate=args.baudrate or None,
+                              full_duplex=not args.half_duplex)
+    port = simulator.start()
+    print(f"Simulated 7320 bath on {port}")
+    print("Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        print(f"Simulator stopped after {simulator.commands_served} commands.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from array import array
+from typing import Optional
+
+
+class StabilityTracker:
+    """
+    Incremental temperature stability detector.
+
+    Keeps the last ``min_readings`` temperatures in a preallocated ring buffer
+    and updates the window mean and sum of squared deviations (Welford) as each
+    reading arrives, so adding a reading and checking stability cost constant
+    time and memory regardless of how long a step lasts.
+
+    The stability criterion is the same as ``main.is_temperature_stable``:
+    the population standard deviation of the window and the offset of its mean
+    from the target must both be within ``stability_window``.
+    """
+
+    def __init__(self, min_readings: int = 10, stability_window: float = 0.05):
+        """
+        Args:
+            min_readings: Number of readings in the stability window
+            stability_window: Maximum allowed standard deviation and target offset
+        """
+        if min_readings < 1:
+            raise ValueError("min_readings must be at least 1")
+        self.min_readings = min_readings
+        self.stability_window = stability_window
+        self._buffer = array('d', bytes(8 * min_readings))
+        self.reset()
+
+    def reset(self):
+        """Forget all readings (e.g. when moving to a new setpoint)."""
+        self._head = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.last = None
+
+    def add(self, temp: float):
+        """Add a reading, evicting the oldest one once the window is full."""
+        if self._count < self.min_readings:
+            # Window still filling: plain Welford update
+            self._count += 1
+            delta = temp - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (temp - self._mean)
+        else:
+            # Window full: replace the oldest reading in one step
+            old = self._buffer[self._head]
+            old_mean = self._mean
+            self._mean += (temp - old) / self._count
+            self._m2 += (temp - old) * (temp - self._mean + old - old_mean)
+            if self._m2 < 0.0:
+                self._m2 = 0.0
+        self._buffer[self._head] = temp
+        self._head = (self._head + 1) % self.min_readings
+        self.last = temp
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        """True once the window holds ``min_readings`` readings."""
+        return self._count >= self.min_readings
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._mean if self._count else None
+
+    @property
+    def std(self) -> Optional[float]:
+        return (self._m2 / self._count) ** 0.5 if self._count else None
+
+    def values(self) -> list:
+        """Return the readings currently in the window, oldest first."""
+        if self._count < self.min_readings:
+            return list(self._buffer[:self._count])
+        return list(self._buffer[self._head:]) + list(self._buffer[:self._head])
+
+    def is_stable(self, target: float) -> bool:
+        """Check whether the current window satisfies the stability criterion."""
+        if not self.full:
+            return False
+        return (self.std <= self.stability_window) and (abs(self._mean - target) <= self.stability_window)
+
+    def status_line(self, target: float) -> str:
+        """Return the status line printed by the controllers on each check."""
+        return (f"Current: {self.last:.3f}, Avg: {self._mean:.3f}, "
+                f"Std: {self.std:.3f}, Stable: {self.is_stable(target)}")
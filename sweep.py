@@ -0,0 +1,323 @@
+"""
+Offline sweep of the stability settings over recorded experiment logs.
+
+Replays the stability criterion of ``main.is_temperature_stable`` (window
+standard deviation and mean offset both within ``stability_window`` over the
+last ``min_readings`` readings) on every step of the given logs, for every
+combination of stability window, minimum readings and hold time, and reports
+when each step would have been declared stable and when its hold would have
+completed:
+
+    python sweep.py logs/*.csv --window 0.02,0.05,0.1 --min-readings 5:30:5 --hold 300,600
+    python sweep.py logs/run.readings --window 0.01:0.1:0.01 --csv sweep_results.csv
+
+Window means and standard deviations come from NumPy sliding-window views,
+computed once per (step, min_readings) and shared by all windows and hold
+times. Different ``min_readings`` values run in a process pool.
+
+A step can only be judged on the readings that were recorded: if the original
+run moved on (or timed out) before a combination would have become stable or
+finished its hold, that step is reported as not reached.
+"""
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from readings_store import STATUS_HOLDING, load_readings
+
+# Windows evaluated per slice, to bound the memory of the window views
+CHUNK_WINDOWS = 65536
+
+
+class Step(NamedTuple):
+    source: str
+    step: int
+    target: float
+    times: np.ndarray    # seconds since the first reading of the step
+    actual: np.ndarray
+
+
+class SweepResult(NamedTuple):
+    stability_window: float
+    min_readings: int
+    hold_time: float
+    source: str
+    step: int
+    target: float
+    time_to_stable: float   # NaN if never stable in the recorded data
+    step_duration: float    # time until the hold completed; NaN if not reached
+
+
+def _drop_hold_duplicates(times, steps, actual, holding, intervals) -> np.ndarray:
+    """
+    Mask out the second row the GUI logs for a reading taken while holding.
+
+    The experiment engine logs each reading as "Waiting for stability" and,
+    once stable, again with the holding status; only the first row is kept.
+    """
+    keep = np.ones(len(times), dtype=bool)
+    if len(times) < 2:
+        return keep
+    duplicate = (holding[1:] & ~holding[:-1] & (steps[1:] == steps[:-1])
+                 & (actual[1:] == actual[:-1]) & (times[1:] - times[:-1] <= 1.0))
+    if intervals is not None:
+        duplicate &= (intervals[1:] == intervals[:-1]) | (np.isnan(intervals[1:]) & np.isnan(intervals[:-1]))
+    keep[1:] = ~duplicate
+    return keep
+
+
+def _load_csv(path: str):
+    # Collect columns directly: much faster than transposing a list of rows
+    columns = ([], [], [], [], [], [])
+    with open(path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, None)
+        has_interval = header is not None and len(header) > 5
+        for row in reader:
+            if len(row) < 5:
+                continue
+            for column, value in zip(columns, row):
+                column.append(value)
+            if has_interval and len(row) < 6:
+                columns[5].append("")
+    if not columns[0]:
+        return None
+    times = np.array(columns[0], dtype='datetime64[s]').astype(np.float64)
+    steps = np.array(columns[1], dtype=np.int64)
+    targets = np.array(columns[2], dtype=np.float64)
+    actual = np.array(columns[3], dtype=np.float64)
+    holding = np.array([status.startswith("Stable") for status in columns[4]])
+    intervals = None
+    if has_interval:
+        intervals = np.array([float(value) if value else math.nan for value in columns[5]])
+    return times, steps, targets, actual, holding, intervals
+
+
+def _load_store(path: str):
+    columns = load_readings(path)
+    if not len(columns["step"]):
+        return None
+    return (np.array(columns["timestamp"]), np.array(columns["step"]), np.array(columns["target"]),
+            np.array(columns["actual"]), np.array(columns["status"]) == STATUS_HOLDING,
+            np.array(columns["interval"]))
+
+
+def load_steps(path: str) -> List[Step]:
+    """
+    Split a CSV log or readings store into its steps.
+
+    A CSV log with a ``.readings`` store next to it is read from the store,
+    which is much faster for long runs.
+    """
+    base, extension = os.path.splitext(path)
+    if extension.lower() == ".csv" and os.path.isdir(f"{base}.readings"):
+        path = f"{base}.readings"
+    data = _load_store(path) if os.path.isdir(path) else _load_csv(path)
+    if data is None:
+        return []
+    times, steps, targets, actual, holding, intervals = data
+    keep = _drop_hold_duplicates(times, steps, actual, holding, intervals)
+    times, steps, targets, actual = times[keep], steps[keep], targets[keep], actual[keep]
+
+    # A new step starts wherever the step number changes
+    boundaries = np.flatnonzero(np.diff(steps)) + 1
+    result = []
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(steps)]):
+        result.append(Step(os.path.basename(path), int(steps[start]), float(targets[start]),
+                           times[start:end] - times[start], actual[start:end]))
+    return result
+
+
+def _window_error(actual: np.ndarray, target: float, min_readings: int) -> np.ndarray:
+    """
+    Return max(window std, |window mean - target|) for each full window.
+
+    Entry k covers readings k .. k + min_readings - 1; a window is stable for
+    every ``stability_window`` at or above its value.
+    """
+    count = len(actual) - min_readings + 1
+    if count <= 0:
+        return np.empty(0)
+    windows = sliding_window_view(actual, min_readings)
+    error = np.empty(count)
+    for start in range(0, count, CHUNK_WINDOWS):
+        chunk = windows[start:start + CHUNK_WINDOWS]
+        error[start:start + len(chunk)] = np.maximum(chunk.std(axis=1), np.abs(chunk.mean(axis=1) - target))
+    return error
+
+
+def evaluate_step(step: Step, min_readings: int, stability_windows: Sequence[float],
+                  hold_times: Sequence[float]) -> List[SweepResult]:
+    """Evaluate one step for one ``min_readings`` over all windows and hold times."""
+    error = _window_error(step.actual, step.target, min_readings)
+    # Time of the reading that completes each window
+    times = step.times[min_readings - 1:]
+    results = []
+    for stability_window in stability_windows:
+        # Logged temperatures are rounded, so window stats often tie with the limit
+        stable = error <= stability_window + 1e-9
+        # Runs of consecutive stable checks (start inclusive, end inclusive)
+        edges = np.diff(stable.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        time_to_stable = float(times[starts[0]]) if len(starts) else math.nan
+        for hold_time in hold_times:
+            step_duration = math.nan
+            if len(starts):
+                done = np.searchsorted(times, times[starts] + hold_time, side='left')
+                completed = np.flatnonzero(done <= ends)
+                if len(completed):
+                    step_duration = float(times[done[completed[0]]])
+            results.append(SweepResult(stability_window, min_readings, hold_time, step.source, step.step,
+                                       step.target, time_to_stable, step_duration))
+    return results
+
+
+_worker_steps: List[Step] = []
+
+
+def _init_worker(steps: List[Step]):
+    global _worker_steps
+    _worker_steps = steps
+
+
+def _evaluate_min_readings(min_readings: int, stability_windows, hold_times) -> List[SweepResult]:
+    results = []
+    for step in _worker_steps:
+        results.extend(evaluate_step(step, min_readings, stability_windows, hold_times))
+    return results
+
+
+def run_sweep(steps: List[Step], stability_windows: Sequence[float], min_readings_values: Sequence[int],
+              hold_times: Sequence[float], workers: Optional[int] = None) -> List[SweepResult]:
+    """
+    Evaluate every parameter combination on every step.
+
+    Args:
+        steps: Steps from load_steps
+        stability_windows, min_readings_values, hold_times: Grid axes
+        workers: Worker processes (None = one per CPU; 1 = run in this process)
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(min_readings_values))
+    if workers <= 1:
+        _init_worker(steps)
+        results = []
+        for min_readings in min_readings_values:
+            results.extend(_evaluate_min_readings(min_readings, stability_windows, hold_times))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(steps,)) as executor:
+        futures = [executor.submit(_evaluate_min_readings, min_readings, stability_windows, hold_times)
+                   for min_readings in min_readings_values]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def summarize(results: List[SweepResult]) -> List[dict]:
+    """
+    Aggregate per-step results into one row per parameter combination.
+
+    Rows are sorted with the combinations completing the most steps first,
+    then by total time.
+    """
+    groups = {}
+    for result in results:
+        key = (result.stability_window, result.min_readings, result.hold_time)
+        groups.setdefault(key, []).append(result)
+
+    rows = []
+    for (stability_window, min_readings, hold_time), group in groups.items():
+        tts = np.array([r.time_to_stable for r in group])
+        durations = np.array([r.step_duration for r in group])
+        stable = ~np.isnan(tts)
+        held = ~np.isnan(durations)
+        rows.append({
+            "stability_window": stability_window,
+            "min_readings": min_readings,
+            "hold_time": hold_time,
+            "steps": len(group),
+            "stable": int(stable.sum()),
+            "held": int(held.sum()),
+            "mean_time_to_stable": float(tts[stable].mean()) if stable.any() else math.nan,
+            "max_time_to_stable": float(tts[stable].max()) if stable.any() else math.nan,
+            "total_time": float(durations[held].sum()) if held.any() else math.nan,
+        })
+    rows.sort(key=lambda row: (-row["held"], row["total_time"] if row["held"] else math.inf))
+    return rows
+
+
+def parse_grid(text: str, cast=float) -> list:
+    """Parse ``a,b,c`` or an inclusive ``start:stop:step`` range."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [cast(round(start + i * step, 10)) for i in range(count)]
+    return [cast(part) for part in text.split(",") if part.strip()]
+
+
+def _minutes(seconds: float) -> str:
+    return "-" if math.isnan(seconds) else f"{seconds / 60:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep stability settings over recorded experiment logs")
+    parser.add_argument("logs", nargs="+", help="CSV logs or .readings stores")
+    parser.add_argument("--window", default="0.02,0.05,0.1",
+                        help="Stability windows in °C (list or start:stop:step)")
+    parser.add_argument("--min-readings", default="5,10,20", help="Window lengths in readings")
+    parser.add_argument("--hold", default="300", help="Hold times in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--top", type=int, default=20, help="Number of combinations to print")
+    parser.add_argument("--csv", help="Write the per-step results to this CSV file")
+    args = parser.parse_args()
+
+    stability_windows = parse_grid(args.window)
+    min_readings_values = parse_grid(args.min_readings, int)
+    hold_times = parse_grid(args.hold)
+
+    start = time.perf_counter()
+    steps = []
+    for path in args.logs:
+        try:
+            steps.extend(load_steps(path))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {str(e)}")
+    readings = sum(len(step.actual) for step in steps)
+    loaded = time.perf_counter()
+    print(f"Loaded {len(steps)} steps ({readings} readings) from {len(args.logs)} logs in {loaded - start:.1f} s")
+    if not steps:
+        return
+
+    results = run_sweep(steps, stability_windows, min_readings_values, hold_times, args.workers)
+    combinations = len(stability_windows) * len(min_readings_values) * len(hold_times)
+    print(f"Evaluated {combinations} combinations in {time.perf_counter() - loaded:.1f} s")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(SweepResult._fields)
+            writer.writerows(results)
+        print(f"Per-step results written to: {args.csv}")
+
+    print()
+    print(f"{'window':>8} {'min_rd':>6} {'hold':>6} {'stable':>8} {'held':>8} "
+          f"{'mean TTS':>9} {'max TTS':>9} {'total':>9}   (times in minutes)")
+    for row in summarize(results)[:args.top]:
+        print(f"{row['stability_window']:>8.3f} {row['min_readings']:>6} {row['hold_time']:>6.0f} "
+              f"{row['stable']:>4}/{row['steps']:<3} {row['held']:>4}/{row['steps']:<3} "
+              f"{_minutes(row['mean_time_to_stable']):>9} {_minutes(row['max_time_to_stable']):>9} "
+              f"{_minutes(row['total_time']):>9}")
+
+
+if __name__ == "__main__":
+    main()
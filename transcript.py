@@ -0,0 +1,453 @@
+"""
+Binary serial transcripts: record every byte on the bath connection and
+replay it later, faster than real time.
+
+A transcript starts with a short header (magic, format version, wall-clock
+start time) followed by one record per event::
+
+    <d B H>  offset (s, monotonic since start), direction, payload length
+    payload  raw bytes
+
+Directions are DIR_WRITE (sent to the bath), DIR_READ (received) and
+DIR_DISCARD (bytes dropped by ``reset_input_buffer``). At 1 Hz a reading costs
+about 40 bytes, so a week-long run fits in roughly 25 MB.
+
+Recording wraps the serial connection (``[Logging] transcript = true``)::
+
+    ser = RecordingSerial(main.initialize_serial(...), "logs/run.trc")
+
+Replay answers each command with the reply recorded for the same command at
+(or after) the current virtual time, and runs the control loop on a virtual
+clock so sleeps cost nothing::
+
+    python transcript.py replay logs/run.trc --config configs/experiment_1.ini
+    python transcript.py replay logs/run.trc --config ... --engine --log-dir /tmp/replay
+    python transcript.py dump logs/run.trc
+
+The recorded bath does not react to the replayed set-points: a controller
+that changes its set-points sees the temperatures of the original run.
+"""
+import contextlib
+import os
+import struct
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b"BTRC"
+VERSION = 1
+_HEADER = struct.Struct("<4sBd")
+_RECORD = struct.Struct("<dBH")
+
+DIR_WRITE = 0
+DIR_READ = 1
+DIR_DISCARD = 2
+
+DIRECTION_NAMES = {DIR_WRITE: "write", DIR_READ: "read", DIR_DISCARD: "discard"}
+
+
+class TranscriptEnd(EOFError):
+    """Raised by ReplaySerial when a command is sent after the recording ends."""
+
+
+class RecordingSerial:
+    """
+    Pass-through wrapper around a serial connection that logs all traffic.
+
+    Implements the subset of the pyserial API used by SerialTransport. The
+    file is flushed whenever a new command is written, so a crash loses at
+    most the reply in progress.
+    """
+
+    def __init__(self, ser, path: str):
+        """
+        Args:
+            ser: Open serial connection (pyserial ``Serial`` or compatible)
+            path: Transcript file to create
+        """
+        self.ser = ser
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _record(self, direction: int, data: bytes):
+        offset = time.monotonic() - self._start
+        with self._lock:
+            if self._file is None:
+                return
+            # Split payloads larger than the length field allows
+            for start in range(0, len(data), 0xFFFF):
+                chunk = data[start:start + 0xFFFF]
+                self._file.write(_RECORD.pack(offset, direction, len(chunk)))
+                self._file.write(chunk)
+            if direction == DIR_WRITE:
+                self._file.flush()
+
+    @property
+    def timeout(self):
+        return self.ser.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.ser.timeout = value
+
+    @property
+    def in_waiting(self) -> int:
+        return self.ser.in_waiting
+
+    @property
+    def is_open(self) -> bool:
+        return self.ser.is_open
+
+    def write(self, data: bytes) -> int:
+        self._record(DIR_WRITE, bytes(data))
+        return self.ser.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.ser.read(size)
+        if data:
+            self._record(DIR_READ, data)
+        return data
+
+    def reset_input_buffer(self):
+        # Keep the dropped bytes: unsolicited output is part of the incident
+        pending = self.ser.in_waiting
+        if pending:
+            self._record(DIR_DISCARD, self.ser.read(pending))
+        self.ser.reset_input_buffer()
+
+    def flush(self):
+        self.ser.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.ser.close()
+
+
+def read_transcript(path: str) -> Tuple[float, List[Tuple[float, int, bytes]]]:
+    """
+    Load a transcript.
+
+    Returns:
+        (start_epoch, events) with events as ``(offset, direction, data)``;
+        a record truncated by a crash is dropped
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is not a serial transcript")
+    magic, version, start_epoch = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a serial transcript")
+    if version != VERSION:
+        raise ValueError(f"Unsupported transcript version {version}")
+
+    events = []
+    position = _HEADER.size
+    while position + _RECORD.size <= len(data):
+        offset, direction, length = _RECORD.unpack_from(data, position)
+        position += _RECORD.size
+        if position + length > len(data):
+            break
+        events.append((offset, direction, data[position:position + length]))
+        position += length
+    return start_epoch, events
+
+
+def _command_key(data: bytes) -> bytes:
+    """Group commands like transport latency stats: "s=25.0" and "s=30.0" match."""
+    command = data.strip()
+    name, separator, _ = command.partition(b"=")
+    return name.lower() + separator
+
+
+class VirtualClock:
+    """
+    Clock for replays: sleeping advances time instead of waiting.
+
+    With ``speed`` set, sleeps really wait ``seconds / speed`` (e.g. 60 =
+    one recorded minute per second) so a replay can be watched.
+    """
+
+    def __init__(self, start_epoch: float = 0.0, speed: Optional[float] = None):
+        self.start_epoch = start_epoch
+        self.speed = speed
+        self.offset = 0.0
+        self._lock = threading.Lock()
+
+    def advance_to(self, offset: float):
+        with self._lock:
+            if offset > self.offset:
+                self.offset = offset
+
+    def monotonic(self) -> float:
+        return self.offset
+
+    perf_counter = monotonic
+
+    def time(self) -> float:
+        return self.start_epoch + self.offset
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        if self.speed:
+            time.sleep(seconds / self.speed)
+        with self._lock:
+            self.offset += seconds
+
+
+class _ClockModule:
+    """Stand-in for the ``time`` module that reads a VirtualClock."""
+
+    def __init__(self, clock: VirtualClock):
+        self._clock = clock
+        self.time = clock.time
+        self.monotonic = clock.monotonic
+        self.perf_counter = clock.perf_counter
+        self.sleep = clock.sleep
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@contextlib.contextmanager
+def use_clock(clock: VirtualClock, *modules):
+    """Point the ``time`` name of the given modules at ``clock`` for the duration."""
+    shim = _ClockModule(clock)
+    saved = [(module, module.time) for module in modules]
+    for module in modules:
+        module.time = shim
+    try:
+        yield clock
+    finally:
+        for module, original in saved:
+            module.time = original
+
+
+class ReplaySerial:
+    """
+    Serial connection that answers from a transcript on a virtual clock.
+
+    Each written command is matched to the next recorded write of the same
+    command at or after the current virtual time; the clock jumps to that
+    moment and the recorded reply is returned with its recorded latency. A
+    command with no recorded counterpart gets no reply, which looks like a
+    timeout to SerialTransport.
+
+    Once the recording is used up, the next write calls ``on_end`` (or raises
+    TranscriptEnd if there is none).
+    """
+
+    def __init__(self, path: str, clock: Optional[VirtualClock] = None,
+                 timeout: float = 2.0, on_end=None):
+        """
+        Args:
+            path: Transcript file to replay
+            clock: Virtual clock to drive (a new one starting at the recording's start by default)
+            timeout: Read timeout, as passed to the real port
+            on_end: Called once instead of raising TranscriptEnd when the recording is used up
+        """
+        start_epoch, events = read_transcript(path)
+        self.path = path
+        self.clock = clock or VirtualClock(start_epoch)
+        self.timeout = timeout
+        self.is_open = True
+        self.commands_matched = 0
+        self.commands_unmatched = 0
+        self.on_end = on_end
+        self.ended = False
+        # Per command key: list of (offset, reply chunks as (offset, data))
+        self._exchanges = {}
+        self._cursor = {}
+        self._pending = []
+        self._index(events)
+
+    def _index(self, events: List[Tuple[float, int, bytes]]):
+        current = None
+        for offset, direction, data in events:
+            if direction == DIR_WRITE:
+                current = []
+                self._exchanges.setdefault(_command_key(data), []).append((offset, current))
+            elif direction == DIR_READ and current is not None:
+                current.append((offset, data))
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._pending[0][1]) if self._pending else 0
+
+    def write(self, data: bytes) -> int:
+        if self.exhausted:
+            self._pending = []
+            if self.on_end is None:
+                raise TranscriptEnd(f"End of transcript {self.path}")
+            if not self.ended:
+                self.ended = True
+                self.on_end()
+            return len(data)
+        key = _command_key(data)
+        exchanges = self._exchanges.get(key, [])
+        index = self._cursor.get(key, 0)
+        now = self.clock.monotonic()
+        while index < len(exchanges) and exchanges[index][0] < now:
+            index += 1
+        if index < len(exchanges):
+            offset, replies = exchanges[index]
+            self._cursor[key] = index + 1
+            self.clock.advance_to(offset)
+            self._pending = list(replies)
+            self.commands_matched += 1
+        else:
+            self._pending = []
+            self.commands_unmatched += 1
+        return len(data)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self._pending:
+            # Nothing recorded: let the reader's deadline run out
+            self.clock.sleep(self.timeout)
+            return b""
+        offset, data = self._pending[0]
+        self.clock.advance_to(offset)
+        if len(data) > size:
+            self._pending[0] = (offset, data[size:])
+            return data[:size]
+        self._pending.pop(0)
+        return data
+
+    def reset_input_buffer(self):
+        self._pending = []
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def commands_recorded(self) -> int:
+        """Number of commands in the recording (a faithful replay matches all of them)."""
+        return sum(len(exchanges) for exchanges in self._exchanges.values())
+
+    @property
+    def exhausted(self) -> bool:
+        """True once no recorded exchange lies ahead of the virtual clock."""
+        now = self.clock.monotonic()
+        return all(not exchanges or exchanges[-1][0] < now for exchanges in self._exchanges.values())
+
+
+def replay_setpoints(path: str, settings: dict, speed: Optional[float] = None) -> ReplaySerial:
+    """
+    Run main.maintain_temperature_setpoints against a transcript.
+
+    Args:
+        path: Transcript file
+        settings: Settings dict as returned by main.get_settings
+        speed: Recorded seconds per real second (None = as fast as possible)
+    """
+    import main
+    import scheduler
+    import transport
+
+    start_epoch, _ = read_transcript(path)
+    clock = VirtualClock(start_epoch, speed)
+    ser = ReplaySerial(path, clock, timeout=settings["timeout"])
+    with use_clock(clock, main, transport, scheduler), contextlib.suppress(TranscriptEnd):
+        main.maintain_temperature_setpoints(
+            transport.SerialTransport(ser),
+            settings["setpoints"],
+            hold_time=settings["hold_time"],
+            stability_window=settings["stability_window"],
+            reading_interval=settings["reading_interval"],
+            timeout=settings["timeout_duration"],
+            min_readings=settings["min_readings"],
+            adaptive_sampling=settings["adaptive_sampling"],
+            min_interval=settings["min_interval"],
+            max_interval=settings["max_interval"]
+        )
+    return ser
+
+
+def replay_engine(path: str, settings: dict, log_dir: str, experiment_name: str = "replay",
+                  speed: Optional[float] = None, on_message=None) -> ReplaySerial:
+    """
+    Run ExperimentEngine against a transcript, writing its logs to ``log_dir``.
+
+    Args:
+        path: Transcript file
+        settings: Settings dict as returned by main.get_settings
+        log_dir: Directory for the replayed CSV log and readings store
+        experiment_name: Name used for the log files
+        speed: Recorded seconds per real second (None = as fast as possible)
+        on_message: Log line callback (default: print)
+    """
+    import engine
+    import transport
+
+    start_epoch, _ = read_transcript(path)
+    clock = VirtualClock(start_epoch, speed)
+    ser = ReplaySerial(path, clock, timeout=settings["timeout"])
+    settings = dict(settings, transcript=False, metrics_port=0)
+    experiment = engine.ExperimentEngine(log_dir=log_dir, on_message=on_message,
+                                         serial_factory=lambda settings: ser, checkpoint=False,
+                                         sleep=clock.sleep, clock=clock.monotonic)
+    ser.on_end = experiment.stop
+    with use_clock(clock, engine, transport):
+        if experiment.start(settings, experiment_name):
+            experiment.wait()
+    return ser
+
+
+def dump(path: str) -> Iterator[str]:
+    """Yield one human readable line per transcript event."""
+    start_epoch, events = read_transcript(path)
+    yield f"# recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_epoch))}, {len(events)} events"
+    for offset, direction, data in events:
+        yield f"{offset:12.6f} {DIRECTION_NAMES.get(direction, direction):<8} {data!r}"
+
+
+def main_cli():
+    import argparse
+    import tempfile
+    import main
+
+    parser = argparse.ArgumentParser(description="Inspect or replay a serial transcript")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    dump_parser = subparsers.add_parser("dump", help="Print every recorded event")
+    dump_parser.add_argument("path")
+    replay_parser = subparsers.add_parser("replay", help="Replay a transcript through the control loop")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--config", help="Experiment config file (.ini) with the settings to replay")
+    replay_parser.add_argument("--speed", type=float, default=None,
+                               help="Recorded seconds per real second (default: as fast as possible)")
+    replay_parser.add_argument("--engine", action="store_true",
+                               help="Replay through the GUI/daemon experiment engine instead of main.py")
+    replay_parser.add_argument("--log-dir", help="Directory for the engine's replayed logs (default: temporary)")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        for line in dump(args.path):
+            print(line)
+        return
+
+    settings = main.get_settings(main.load_config(args.config) if args.config else None)
+    started = time.perf_counter()
+    if args.engine:
+        log_dir = args.log_dir or tempfile.mkdtemp(prefix="replay_")
+        os.makedirs(log_dir, exist_ok=True)
+        ser = replay_engine(args.path, settings, log_dir, speed=args.speed)
+    else:
+        ser = replay_setpoints(args.path, settings, speed=args.speed)
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {ser.clock.offset:.0f} s of bath time in {elapsed:.1f} s "
+          f"({ser.commands_matched} of {ser.commands_recorded} recorded commands matched, "
+          f"{ser.commands_unmatched} without a recorded reply)")
+
+
+if __name__ == "__main__":
+    main_cli()
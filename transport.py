@@ -0,0 +1,205 @@
+import re
+import threading
+import time
+from typing import Optional
+
+import metrics
+
+_REPLY = re.compile(r"^\s*(?:t|set)\s*:\s*([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)", re.IGNORECASE)
+
+# Held while an experiment opens its port and while port discovery probes,
+# so a probe never opens the port of a run that is still connecting
+PORT_LOCK = threading.Lock()
+
+
+def parse_temperature(response: str) -> Optional[float]:
+    """
+    Extract the value from a temperature or set-point reply.
+
+    Only the bath's reply format (``t: 25.00 C``, ``set: 25.00 C``) is
+    accepted, so the echo of a command in full duplex mode (``s=30.0``) is
+    never taken for a reading. Returns None for any other line.
+    """
+    match = _REPLY.match(response)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+
+class LatencyStats:
+    """Running round-trip latency statistics for one command."""
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, latency: float, timed_out: bool = False):
+        """Record one exchange."""
+        self.count += 1
+        self.total += latency
+        self.last = latency
+        if self.min is None or latency < self.min:
+            self.min = latency
+        if self.max is None or latency > self.max:
+            self.max = latency
+        if timed_out:
+            self.timeouts += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary in milliseconds."""
+        if not self.count:
+            return "no exchanges"
+        return (f"n={self.count}, mean={self.mean * 1000:.1f} ms, "
+                f"min={self.min * 1000:.1f} ms, max={self.max * 1000:.1f} ms, "
+                f"timeouts={self.timeouts}")
+
+
+class SerialTransport:
+    """
+    Command/reply transport for the Fluke 7320 serial interface.
+
+    Instead of sleeping a fixed time after each command, the reply is read as
+    soon as its line terminator arrives. Every exchange has its own deadline,
+    so a missing reply costs at most the per-command timeout.
+
+    The transport takes ownership of the port's read timeout: the port is
+    switched to a short poll slice so that reads wake up on incoming bytes and
+    the deadline can be honoured without reconfiguring the port per command.
+    """
+
+    def __init__(self, ser, timeout: Optional[float] = None,
+                 terminator: bytes = b"\n", poll_slice: float = 0.05):
+        """
+        Args:
+            ser: Open serial connection (pyserial ``Serial`` or compatible)
+            timeout: Default per-command timeout in seconds (defaults to the
+                port's own read timeout)
+            terminator: Byte sequence ending a reply (the bath sends CR LF)
+            poll_slice: Maximum time a single read blocks without data
+        """
+        self.ser = ser
+        self.timeout = timeout if timeout is not None else (ser.timeout or 2.0)
+        self.terminator = terminator
+        self.stats = {}
+        self._metrics = {}
+        self.last_latency = None
+        # Whether the bath echoes commands (full duplex mode, the factory
+        # default); None until the first exchange shows it
+        self.echo = None
+        self._cancelled = threading.Event()
+        if ser.timeout is None or ser.timeout > poll_slice:
+            ser.timeout = poll_slice
+
+    def _record(self, command: str, latency: float, timed_out: bool = False):
+        """Add an exchange to the latency stats and the process metrics."""
+        # Group by command name so that "s=25.0" and "s=30.0" share a bucket
+        key = command.split("=", 1)[0] + ("=" if "=" in command else "")
+        if key not in self.stats:
+            self.stats[key] = LatencyStats()
+            self._metrics[key] = (metrics.SERIAL_ROUND_TRIP.labels(key), metrics.SERIAL_TIMEOUTS.labels(key))
+        self.stats[key].add(latency, timed_out)
+        round_trip, timeouts = self._metrics[key]
+        round_trip.observe(latency)
+        if timed_out:
+            timeouts.inc()
+
+    def _read_reply(self, deadline: float) -> bytes:
+        """Read until the terminator arrives or the deadline passes."""
+        buffer = bytearray()
+        while not buffer.endswith(self.terminator):
+            if time.monotonic() >= deadline or self._cancelled.is_set():
+                break
+            chunk = self.ser.read(max(1, self.ser.in_waiting))
+            if chunk:
+                buffer += chunk
+        return bytes(buffer)
+
+    @staticmethod
+    def _is_echo(raw: bytes, command: str) -> bool:
+        return raw.strip().lower() == command.encode().lower()
+
+    def query(self, command: str, timeout: Optional[float] = None,
+              expect_reply: bool = True) -> str:
+        """
+        Send a command and return its reply.
+
+        Args:
+            command: Command without the trailing carriage return
+            timeout: Deadline for this command in seconds (default: self.timeout)
+            expect_reply: False for commands the bath does not answer (e.g.
+                ``s=25.0``); the call then returns once the command is sent
+                and, in full duplex mode, its echo has been read
+
+        Returns:
+            str: Decoded reply with surrounding whitespace removed; may be
+            partial or empty if the deadline expired
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        if self._cancelled.is_set():
+            return ""
+
+        # Drop stale bytes (unsolicited samples, echoes of earlier commands)
+        self.ser.reset_input_buffer()
+        self.ser.write(f"{command}\r".encode())
+
+        if not expect_reply:
+            self.ser.flush()
+            if self.echo is not False:
+                # Consume the echo now: arriving after the next command's
+                # reset_input_buffer() it would be read as that command's reply
+                echo = self._read_reply(deadline)
+                if self.echo is None and echo.endswith(self.terminator):
+                    self.echo = self._is_echo(echo, command)
+                elif self.echo is None and not self._cancelled.is_set():
+                    # Nothing within the deadline: half duplex
+                    self.echo = False
+            self.last_latency = time.monotonic() - start
+            self._record(command, self.last_latency)
+            return ""
+
+        raw = self._read_reply(deadline)
+        if self._is_echo(raw, command):
+            # Full duplex mode echoes the command on its own line first
+            self.echo = True
+            raw = self._read_reply(deadline)
+        elif self.echo is None and raw.endswith(self.terminator):
+            self.echo = False
+        timed_out = not raw.endswith(self.terminator) and not self._cancelled.is_set()
+        self.last_latency = time.monotonic() - start
+        self._record(command, self.last_latency, timed_out)
+        return raw.decode('latin-1').strip()
+
+    def cancel_read(self):
+        """
+        Abort the reply being read and refuse further commands (safe from any thread).
+
+        Used when stopping: the exchange in progress returns what has arrived
+        within one poll slice instead of waiting out its timeout.
+        """
+        self._cancelled.set()
+        cancel = getattr(self.ser, "cancel_read", None)
+        if cancel is not None:
+            try:
+                cancel()
+            except Exception:
+                pass
+
+    def close(self):
+        """Close the underlying serial connection."""
+        self.ser.close()
+
+    def latency_summary(self) -> str:
+        """Return the latency summary of every command seen so far."""
+        if not self.stats:
+            return "no exchanges"
+        return "; ".join(f"'{key}': {stats.summary()}" for key, stats in sorted(self.stats.items()))
@@ -0,0 +1,60 @@
+import threading
+from typing import Dict, List, Tuple
+
+
+class UiUpdateQueue:
+    """
+    Thread-safe mailbox of GUI updates, drained by the Tk main loop.
+
+    Worker threads never touch Tk widgets. They post log lines and display
+    values here, and the main loop applies everything on a fixed refresh tick:
+    log lines are inserted in one batch and repeated updates of the same
+    display value are coalesced so only the latest one is applied. GUI cost
+    then depends on the refresh rate, not on the sampling rate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lines = []
+        self._values = {}
+        self._readings = []
+        self._finished = False
+
+    def post_log(self, line: str):
+        """Queue a log line (including its trailing newline)."""
+        with self._lock:
+            self._lines.append(line)
+
+    def post_value(self, name: str, value):
+        """Queue a display value; replaces any pending value with the same name."""
+        with self._lock:
+            self._values[name] = value
+
+    def post_reading(self, t: float, actual: float, target: float):
+        """Queue a reading for the live plot (never coalesced)."""
+        with self._lock:
+            self._readings.append((t, actual, target))
+
+    def post_finished(self):
+        """Signal that the experiment thread has finished."""
+        with self._lock:
+            self._finished = True
+
+    def take_finished(self) -> bool:
+        """Whether the experiment finished since the last call (clears the flag)."""
+        with self._lock:
+            finished, self._finished = self._finished, False
+        return finished
+
+    def drain(self) -> Tuple[List[str], Dict[str, object]]:
+        """Take all pending log lines and display values, leaving them empty."""
+        with self._lock:
+            lines, self._lines = self._lines, []
+            values, self._values = self._values, {}
+        return lines, values
+
+    def drain_readings(self) -> List[Tuple[float, float, float]]:
+        """Take all pending plot readings as ``(time, actual, target)`` tuples."""
+        with self._lock:
+            readings, self._readings = self._readings, []
+        return readings